@@ -0,0 +1,86 @@
+"""Per-message durability cost while other workers are writing large files.
+
+Background threads stand in for concurrent encodes: each keeps rewriting a
+large file, so the host always has dirty pages. The foreground loop is one
+worker handling messages. It writes a small output, makes it durable at each
+level, and records the latency up to the point where the downstream enqueue
+would happen.
+
+Run it on the disk that holds /data; tmpfs makes every level look free.
+
+Usage:
+    uv run python benchmarks/bench_durability.py [--writers 4] [--messages 20] [--dir /data/bench]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from core.durability import DURABILITY_LEVELS, make_durable
+
+_CHUNK = os.urandom(4 * 1024 * 1024)
+
+
+def _background_writer(path: Path, file_mb: int, stop: threading.Event) -> None:
+    while not stop.is_set():
+        with path.open("wb") as handle:
+            for _ in range(max(1, file_mb // 4)):
+                if stop.is_set():
+                    break
+                handle.write(_CHUNK)
+
+
+def _message_latencies(root: Path, level: str, messages: int, output_kb: int) -> list[float]:
+    payload = os.urandom(output_kb * 1024)
+    latencies = []
+    for index in range(messages):
+        output = root / f"{level}_{index}.mp4"
+        start = time.perf_counter()
+        output.write_bytes(payload)
+        make_durable(output, level=level)
+        latencies.append((time.perf_counter() - start) * 1000)
+        output.unlink()
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--writer-file-mb", type=int, default=256)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--output-kb", type=int, default=2048)
+    parser.add_argument("--dir", default=None, help="directory on the disk under test (default: system temp)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        root = Path(tmp)
+        stop = threading.Event()
+        writers = [
+            threading.Thread(target=_background_writer, args=(root / f"writer_{index}.bin", args.writer_file_mb, stop), daemon=True)
+            for index in range(args.writers)
+        ]
+        for writer in writers:
+            writer.start()
+        time.sleep(1.0)
+        try:
+            for level in DURABILITY_LEVELS:
+                latencies = _message_latencies(root, level, args.messages, args.output_kb)
+                p95 = statistics.quantiles(latencies, n=20, method="inclusive")[-1] if len(latencies) > 1 else latencies[0]
+                print(
+                    f"{level:>5}: p50 {statistics.median(latencies):8.1f} ms, p95 {p95:8.1f} ms, "
+                    f"max {max(latencies):8.1f} ms per message ({args.writers} concurrent writers)"
+                )
+        finally:
+            stop.set()
+            for writer in writers:
+                writer.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Per-job HTTP latency: a new client per call vs one pooled `core.http` client.
+
+Each job mirrors an s2/s3 job: a JSON call to the parse/TTS API, then a
+streamed download of the generated file from the URL it returns. The stand-in
+is a local HTTPS server with a throwaway self-signed certificate (needs the
+`openssl` CLI; `--plain` serves HTTP instead), so every new connection pays a
+real TCP + TLS handshake. `--handshake-delay-ms` adds a fixed delay to each new
+connection to model a WAN round trip; keep-alive saves it on reused ones.
+
+Usage:
+    uv run --extra http python benchmarks/bench_http_pool.py [--jobs 200] [--threads 1] [--download-kb 256] [--handshake-delay-ms 0] [--plain]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import ssl
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+
+from core.http import build_http_client
+
+
+def _handler(download_bytes: bytes, handshake_delay_sec: float) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in separate writes; without this Nagle + delayed ACK adds ~40 ms.
+        disable_nagle_algorithm = True
+
+        def setup(self) -> None:
+            time.sleep(handshake_delay_sec)
+            super().setup()
+
+        def do_POST(self) -> None:
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            host, port = self.server.server_address[:2]
+            scheme = "https" if isinstance(self.connection, ssl.SSLSocket) else "http"
+            self._send(json.dumps({"url": f"{scheme}://{host}:{port}/file.mp4"}).encode(), "application/json")
+
+        def do_GET(self) -> None:
+            self._send(download_bytes, "video/mp4")
+
+        def _send(self, body: bytes, content_type: str) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *_args: object) -> None:
+            pass
+
+    return Handler
+
+
+def _self_signed(root: Path) -> tuple[Path, Path]:
+    cert, key = root / "cert.pem", root / "key.pem"
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+            "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+            "-keyout", str(key), "-out", str(cert),
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return cert, key
+
+
+def _job(client: httpx.Client, api_url: str) -> None:
+    response = client.post(api_url, json={"url": "https://example.com/video", "token": "bench"})
+    response.raise_for_status()
+    with client.stream("GET", response.json()["url"]) as download:
+        download.raise_for_status()
+        for _ in download.iter_bytes():
+            pass
+
+
+def _run(jobs: int, threads: int, job) -> list[float]:
+    latencies: list[float] = []
+
+    def timed(_: int) -> None:
+        start = time.perf_counter()
+        job()
+        latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(timed, range(jobs)))
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--download-kb", type=int, default=256)
+    parser.add_argument("--handshake-delay-ms", type=float, default=0.0)
+    parser.add_argument("--plain", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_http_pool_") as tmp:
+        server = ThreadingHTTPServer(
+            ("127.0.0.1", 0),
+            _handler(b"\0" * (args.download_kb * 1024), args.handshake_delay_ms / 1000),
+        )
+        verify: ssl.SSLContext | bool = True
+        scheme = "http"
+        if not args.plain:
+            cert, key = _self_signed(Path(tmp))
+            server_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            server_ctx.load_cert_chain(cert, key)
+            server.socket = server_ctx.wrap_socket(server.socket, server_side=True)
+            verify = ssl.create_default_context(cafile=str(cert))
+            scheme = "https"
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        api_url = f"{scheme}://127.0.0.1:{server.server_address[1]}/parse"
+
+        def per_call_job() -> None:
+            # The old worker code: a fresh client (and connection) for each call.
+            with httpx.Client(timeout=30, verify=verify) as api_client:
+                response = api_client.post(api_url, json={"url": "https://example.com/video", "token": "bench"})
+                response.raise_for_status()
+                file_url = response.json()["url"]
+            with httpx.Client(timeout=30, verify=verify, follow_redirects=True) as download_client:
+                with download_client.stream("GET", file_url) as download:
+                    download.raise_for_status()
+                    for _ in download.iter_bytes():
+                        pass
+
+        pooled = build_http_client(
+            timeout_s=30,
+            max_connections=max(20, args.threads),
+            max_keepalive_connections=max(10, args.threads),
+            keepalive_expiry_s=60,
+            verify=verify,
+        )
+
+        print(
+            f"{args.jobs} jobs, {args.threads} thread(s), {args.download_kb} KB download, {scheme}, "
+            f"+{args.handshake_delay_ms} ms per new connection"
+        )
+        print(f"{'client':>9} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'jobs/s':>9}")
+        for name, job in (("per-call", per_call_job), ("pooled", lambda: _job(pooled, api_url))):
+            job()  # warm-up: imports, and the pooled client's first connection
+            start = time.perf_counter()
+            latencies = _run(args.jobs, args.threads, job)
+            wall = time.perf_counter() - start
+            cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+            print(
+                f"{name:>9} {statistics.mean(latencies) * 1000:>9.2f} {cuts[49] * 1000:>9.2f} "
+                f"{cuts[94] * 1000:>9.2f} {args.jobs / wall:>9.1f}"
+            )
+        pooled.close()
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,20 @@
+from core.durability import (
+    DURABILITY_LEVELS,
+    Durability,
+    atomic_output,
+    make_durable,
+    temp_path_for,
+    validate_durability,
+)
 from core.logging import configure_service_logger, get_logger
 
-__all__ = ["configure_service_logger", "get_logger"]
+__all__ = [
+    "DURABILITY_LEVELS",
+    "Durability",
+    "atomic_output",
+    "configure_service_logger",
+    "get_logger",
+    "make_durable",
+    "temp_path_for",
+    "validate_durability",
+]
@@ -0,0 +1,107 @@
+"""Make a stage's output durable before the downstream message points at it.
+
+Workers used to call `os.sync()` after every message. That flushes every
+dirty page on the host, including other workers' in-flight video writes.
+These helpers fsync only the file that is handed downstream and the
+directory entry that names it.
+
+Levels (`SN_DURABILITY`):
+- `none`: rely on the page cache; a host crash can lose the last outputs.
+- `file` (default): fsync the output file and its parent directory.
+- `host`: the old behaviour, a host-wide `os.sync()`.
+
+Service settings declare the level as a `Durability` field, so an invalid
+value fails settings validation. `atomic_output` is the one write-then-rename
+helper for every stage (`media.atomic_output` re-exports it).
+"""
+
+from __future__ import annotations
+
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Literal, get_args
+from uuid import uuid4
+
+Durability = Literal["none", "file", "host"]
+DURABILITY_LEVELS: tuple[str, ...] = get_args(Durability)
+
+
+def validate_durability(level: str) -> str:
+    if level not in DURABILITY_LEVELS:
+        raise ValueError(f"Invalid durability level {level!r}; expected one of {', '.join(DURABILITY_LEVELS)}")
+    return level
+
+
+def fsync_file(path: str | Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def fsync_dir(path: str | Path) -> None:
+    """Persist the directory entries of `path` (a no-op where directories cannot be opened, e.g. Windows)."""
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def make_durable(*paths: str | Path, level: Durability = "file") -> None:
+    """Flush `paths` (and the directories naming them) according to `level`."""
+    validate_durability(level)
+    if level == "none":
+        return
+    if level == "host":
+        if hasattr(os, "sync"):
+            os.sync()
+        return
+    dirs: list[Path] = []
+    for path in paths:
+        fsync_file(path)
+        parent = Path(path).parent
+        if parent not in dirs:
+            dirs.append(parent)
+    for parent in dirs:
+        fsync_dir(parent)
+
+
+def temp_path_for(path: str | Path) -> Path:
+    """Hidden sibling of `path` with the same extension, so ffmpeg still infers the container."""
+    target = Path(path)
+    return target.with_name(f".{target.stem}.{uuid4().hex}{target.suffix}")
+
+
+@contextmanager
+def atomic_output(path: str | Path, *, fsync: Durability = "none") -> Iterator[Path]:
+    """Yield a temp sibling of `path`; it replaces `path` only if the block succeeds.
+
+    The temp file lives in the same directory, so the final `os.replace` is an
+    atomic rename: readers see either the previous file or the complete new
+    one. `fsync` flushes the file before the rename and the directory after
+    it (`file`), or runs `os.sync()` (`host`). On any exception the temp file
+    is removed and `path` is left untouched.
+    """
+    validate_durability(fsync)
+    target = Path(path)
+    tmp_path = temp_path_for(target)
+    try:
+        yield tmp_path
+        if fsync == "file":
+            fsync_file(tmp_path)
+        os.replace(tmp_path, target)
+        if fsync == "file":
+            fsync_dir(target.parent)
+        elif fsync == "host" and hasattr(os, "sync"):
+            os.sync()
+    finally:
+        tmp_path.unlink(missing_ok=True)
@@ -0,0 +1,57 @@
+"""Long-lived, connection-pooled HTTP client for workers that call external APIs.
+
+A worker builds one client at startup and shares it across all jobs and
+Dramatiq worker threads (`httpx.Client` is thread-safe), so repeat calls to the
+same host reuse an open TCP/TLS connection instead of handshaking again. HTTP/2
+is negotiated via ALPN where the server offers it.
+
+Needs the `http` extra (`httpx[http2]`, `dramatiq`); not re-exported from
+`core` so other services do not need httpx.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import ssl
+from typing import Any
+
+import dramatiq
+import httpx
+from loguru import logger
+
+
+def build_http_client(
+    *,
+    timeout_s: float,
+    max_connections: int,
+    max_keepalive_connections: int,
+    keepalive_expiry_s: float,
+    http2: bool = True,
+    follow_redirects: bool = True,
+    verify: ssl.SSLContext | bool = True,
+) -> httpx.Client:
+    """Pooled client; `timeout_s` is the default, individual requests may pass their own `timeout`."""
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1 keep-alive only")
+        http2 = False
+    return httpx.Client(
+        timeout=httpx.Timeout(timeout_s),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry_s,
+        ),
+        http2=http2,
+        follow_redirects=follow_redirects,
+        verify=verify,
+    )
+
+
+class CloseHttpClientMiddleware(dramatiq.Middleware):
+    """Close a worker process's shared client once Dramatiq has stopped its worker threads."""
+
+    def __init__(self, client: httpx.Client) -> None:
+        self.client = client
+
+    def after_worker_shutdown(self, broker: Any, worker: Any) -> None:
+        self.client.close()
@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from core import durability
+from core.durability import atomic_output, make_durable, validate_durability
+
+
+def test_unknown_level_is_rejected():
+    with pytest.raises(ValueError, match="expected one of none, file, host"):
+        validate_durability("fsync")
+
+
+def test_file_level_syncs_only_the_file_and_its_directory(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(durability, "fsync_file", lambda path: synced.append(("file", str(path))))
+    monkeypatch.setattr(durability, "fsync_dir", lambda path: synced.append(("dir", str(path))))
+    monkeypatch.setattr(os, "sync", lambda: synced.append(("host", "")))
+    first, second = tmp_path / "a.mp4", tmp_path / "b.mp3"
+
+    make_durable(first, second, level="file")
+
+    assert synced == [("file", str(first)), ("file", str(second)), ("dir", str(tmp_path))]
+
+
+def test_none_level_does_nothing(tmp_path, monkeypatch):
+    monkeypatch.setattr(durability, "fsync_file", lambda path: pytest.fail("fsync called"))
+
+    make_durable(tmp_path / "missing.mp4", level="none")
+
+
+@pytest.mark.parametrize("level", ["none", "file"])
+def test_atomic_output_renames_on_success(tmp_path, level):
+    target = tmp_path / "out.mp4"
+
+    with atomic_output(target, fsync=level) as tmp:
+        tmp.write_bytes(b"data")
+        assert not target.exists()
+
+    assert target.read_bytes() == b"data"
+    assert list(tmp_path.iterdir()) == [target]
+
+
+def test_atomic_output_keeps_previous_file_on_failure(tmp_path):
+    target = tmp_path / "out.mp4"
+    target.write_bytes(b"old")
+
+    with pytest.raises(RuntimeError):
+        with atomic_output(target, fsync="file") as tmp:
+            tmp.write_bytes(b"partial")
+            raise RuntimeError("download failed")
+
+    assert target.read_bytes() == b"old"
+    assert list(tmp_path.iterdir()) == [target]
+
+
+def test_atomic_output_file_level_flushes_before_and_after_the_rename(tmp_path, monkeypatch):
+    target = tmp_path / "out.mp4"
+    synced = []
+    monkeypatch.setattr(durability, "fsync_file", lambda path: synced.append(("file", target.exists())))
+    monkeypatch.setattr(durability, "fsync_dir", lambda path: synced.append(("dir", target.exists())))
+
+    with atomic_output(target, fsync="file") as tmp:
+        tmp.write_bytes(b"data")
+
+    assert synced == [("file", False), ("dir", True)]
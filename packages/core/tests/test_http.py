@@ -0,0 +1,82 @@
+import importlib.util
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import dramatiq
+import pytest
+from dramatiq.brokers.stub import StubBroker
+
+from core.http import CloseHttpClientMiddleware, build_http_client
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections: set[tuple] = set()
+
+    def do_GET(self):
+        _Handler.connections.add(self.client_address)
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _Handler.connections = set()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _client(**overrides):
+    kwargs = dict(timeout_s=5, max_connections=4, max_keepalive_connections=2, keepalive_expiry_s=30)
+    kwargs.update(overrides)
+    return build_http_client(**kwargs)
+
+
+def test_sequential_requests_reuse_one_connection(server):
+    with _client() as client:
+        for _ in range(5):
+            assert client.get(f"{server}/").text == "ok"
+
+    assert len(_Handler.connections) == 1
+
+
+def test_no_keepalive_opens_a_connection_per_request(server):
+    with _client(max_keepalive_connections=0) as client:
+        for _ in range(3):
+            client.get(f"{server}/")
+
+    assert len(_Handler.connections) == 3
+
+
+def test_http2_falls_back_without_h2(monkeypatch, server):
+    real_find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name: None if name == "h2" else real_find_spec(name))
+
+    with _client(http2=True) as client:
+        response = client.get(f"{server}/")
+
+    assert response.http_version == "HTTP/1.1"
+
+
+def test_middleware_closes_the_client_when_the_worker_shuts_down(server):
+    client = _client()
+    broker = StubBroker()
+    broker.add_middleware(CloseHttpClientMiddleware(client))
+    worker = dramatiq.Worker(broker, worker_threads=1)
+    worker.start()
+    assert client.get(f"{server}/").text == "ok"
+
+    worker.stop()
+    broker.close()
+
+    assert client.is_closed
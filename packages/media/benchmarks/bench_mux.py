@@ -0,0 +1,105 @@
+"""Mux throughput: a stream-copied video plus AAC-encoded audio, the s6 segment-concat shape.
+
+Compares the buffered `subprocess.run(capture_output=True)` call the services
+used before with `run_ffmpeg` (streamed progress, bounded stderr), and shows
+how many muxes `run_ffmpeg_async` completes per second when several run at
+once on one event loop.
+
+Usage:
+    uv run python benchmarks/bench_mux.py [--duration-sec 30] [--runs 5] [--parallel 4]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from media import run_ffmpeg, run_ffmpeg_async
+
+
+def _make_inputs(root: Path, duration_sec: int) -> tuple[Path, Path]:
+    video, audio = root / "video.mp4", root / "audio.wav"
+    run_ffmpeg(
+        [
+            "ffmpeg",
+            "-y",
+            "-f",
+            "lavfi",
+            "-i",
+            f"testsrc2=size=720x1280:rate=30:duration={duration_sec}",
+            "-c:v",
+            "libx264",
+            "-preset",
+            "ultrafast",
+            str(video),
+        ]
+    )
+    run_ffmpeg(["ffmpeg", "-y", "-f", "lavfi", "-i", f"sine=f=220:d={duration_sec}", str(audio)])
+    return video, audio
+
+
+def _mux_cmd(video: Path, audio: Path, output: Path) -> list[str]:
+    return [
+        "ffmpeg",
+        "-y",
+        "-i",
+        str(video),
+        "-i",
+        str(audio),
+        "-map",
+        "0:v",
+        "-map",
+        "1:a",
+        "-c:v",
+        "copy",
+        "-c:a",
+        "aac",
+        "-b:a",
+        "128k",
+        "-movflags",
+        "+faststart",
+        str(output),
+    ]
+
+
+async def _mux_parallel(video: Path, audio: Path, root: Path, count: int) -> None:
+    await asyncio.gather(*(run_ffmpeg_async(_mux_cmd(video, audio, root / f"async_{index}.mp4")) for index in range(count)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration-sec", type=int, default=30)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--parallel", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        video, audio = _make_inputs(root, args.duration_sec)
+        output = root / "muxed.mp4"
+
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            subprocess.run(_mux_cmd(video, audio, output), capture_output=True, text=True, check=True)
+        buffered_ms = (time.perf_counter() - start) * 1000 / args.runs
+
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            run_ffmpeg(_mux_cmd(video, audio, output))
+        streamed_ms = (time.perf_counter() - start) * 1000 / args.runs
+
+        start = time.perf_counter()
+        asyncio.run(_mux_parallel(video, audio, root, args.parallel))
+        parallel_sec = time.perf_counter() - start
+
+    print(f"{'subprocess.run (buffered)':>28}: {buffered_ms:8.1f} ms/mux")
+    print(f"{'run_ffmpeg (streamed)':>28}: {streamed_ms:8.1f} ms/mux")
+    print(f"{f'run_ffmpeg_async x{args.parallel}':>28}: {args.parallel / parallel_sec:8.2f} muxes/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Cost of `probe_media`: one ffprobe per file, then served from the in-process cache.
+
+Inputs are synthetic clips generated with ffmpeg's lavfi sources at a few
+durations; ffprobe reads only the container header, so the cold cost should
+stay flat as the clip grows.
+
+Usage:
+    uv run python benchmarks/bench_probe.py [--probes 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from media import ProbeCache, run_ffmpeg
+
+_DURATIONS_SEC = (5, 30, 120)
+
+
+def _make_clip(path: Path, duration_sec: int) -> None:
+    run_ffmpeg(
+        [
+            "ffmpeg",
+            "-y",
+            "-f",
+            "lavfi",
+            "-i",
+            f"testsrc2=size=720x1280:rate=30:duration={duration_sec}",
+            "-f",
+            "lavfi",
+            "-i",
+            f"sine=f=220:d={duration_sec}",
+            "-c:v",
+            "libx264",
+            "-preset",
+            "ultrafast",
+            "-c:a",
+            "aac",
+            "-shortest",
+            str(path),
+        ]
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--probes", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for duration_sec in _DURATIONS_SEC:
+            clip = Path(tmp) / f"clip_{duration_sec}s.mp4"
+            _make_clip(clip, duration_sec)
+
+            start = time.perf_counter()
+            for _ in range(args.probes):
+                ProbeCache().probe(str(clip))
+            cold_ms = (time.perf_counter() - start) * 1000 / args.probes
+
+            cache = ProbeCache()
+            cache.probe(str(clip))
+            start = time.perf_counter()
+            for _ in range(args.probes):
+                cache.probe(str(clip))
+            cached_us = (time.perf_counter() - start) * 1_000_000 / args.probes
+
+            print(f"{duration_sec:>4}s clip: cold {cold_ms:7.2f} ms/probe, cached {cached_us:7.1f} us/probe")
+
+
+if __name__ == "__main__":
+    main()
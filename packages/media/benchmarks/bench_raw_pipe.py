@@ -0,0 +1,63 @@
+"""Raw-frame pipe throughput: packed RGB frames written into ffmpeg's stdin.
+
+`-f null` measures the pipe and rawvideo demuxer alone, and `libx264
+ultrafast` shows how much headroom the pipe leaves for a real encode. The
+frame size matches the s4 talking-head output.
+
+Usage:
+    uv run python benchmarks/bench_raw_pipe.py [--frames 500] [--size 512]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from media import RawVideoPipe, rawvideo_input_args
+
+
+def _pipe_frames(frame: bytes, frames: int, cmd: list[str]) -> float:
+    start = time.perf_counter()
+    with RawVideoPipe(cmd) as pipe:
+        for _ in range(frames):
+            pipe.write(frame)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--fps", type=int, default=25)
+    args = parser.parse_args()
+
+    frame = os.urandom(args.size * args.size * 3)
+    input_args = ["ffmpeg", "-y", "-loglevel", "error", *rawvideo_input_args(width=args.size, height=args.size, fps=args.fps)]
+    with tempfile.TemporaryDirectory() as tmp:
+        outputs = {
+            "-f null": [*input_args, "-f", "null", "-"],
+            "libx264 ultrafast": [
+                *input_args,
+                "-c:v",
+                "libx264",
+                "-preset",
+                "ultrafast",
+                "-pix_fmt",
+                "yuv420p",
+                str(Path(tmp) / "out.mp4"),
+            ],
+        }
+        for name, cmd in outputs.items():
+            elapsed = _pipe_frames(frame, args.frames, cmd)
+            print(
+                f"{name:>18}: {args.frames / elapsed:8.1f} frames/s, "
+                f"{len(frame) * args.frames / elapsed / (1024 * 1024):8.1f} MiB/s, "
+                f"{args.frames / elapsed / args.fps:6.1f}x realtime"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+from media.bitrate import (
+    CONTAINER_OVERHEAD_RATIO,
+    budget_total_kbps,
+    initial_total_kbps,
+    retarget_total_kbps,
+    split_bitrate,
+)
+from media.ffmpeg import (
+    FFmpegCancelled,
+    FFmpegError,
+    FFmpegProgress,
+    FFmpegResult,
+    FFmpegTimeout,
+    ProgressParser,
+    parse_progress,
+    progress_logger,
+    run_ffmpeg,
+    run_ffmpeg_async,
+    watchdog_timeout,
+)
+from media.files import atomic_output, temp_path_for
+from media.overlay import overlay_filter_complex
+from media.pipes import RawVideoPipe, rawvideo_input_args, read_rawvideo_frames
+from media.probe import MediaInfo, ProbeCache, probe_media
+
+__all__ = [
+    "CONTAINER_OVERHEAD_RATIO",
+    "FFmpegCancelled",
+    "FFmpegError",
+    "FFmpegProgress",
+    "FFmpegResult",
+    "FFmpegTimeout",
+    "MediaInfo",
+    "ProbeCache",
+    "ProgressParser",
+    "RawVideoPipe",
+    "atomic_output",
+    "budget_total_kbps",
+    "initial_total_kbps",
+    "overlay_filter_complex",
+    "parse_progress",
+    "probe_media",
+    "progress_logger",
+    "rawvideo_input_args",
+    "read_rawvideo_frames",
+    "retarget_total_kbps",
+    "run_ffmpeg",
+    "run_ffmpeg_async",
+    "split_bitrate",
+    "temp_path_for",
+    "watchdog_timeout",
+]
@@ -0,0 +1,60 @@
+"""Size-budget bitrate math shared by the s6 compositor and the s4 render-final encode."""
+
+from __future__ import annotations
+
+import math
+
+# Muxer/container overhead (moov atom, sample tables, faststart) reserved out of the size budget.
+CONTAINER_OVERHEAD_RATIO = 0.03
+# Aim this far below the budget when retargeting from a measured size.
+RETARGET_SAFETY_RATIO = 0.95
+MIN_TOTAL_KBPS = 100
+
+
+def budget_total_kbps(max_output_size_mb: int, duration_sec: float) -> int:
+    """Highest total (video + audio) bitrate whose output still fits in `max_output_size_mb`."""
+    budget_bits = max_output_size_mb * 1024 * 1024 * 8 * (1 - CONTAINER_OVERHEAD_RATIO)
+    return int(budget_bits / max(duration_sec, 0.001) / 1000)
+
+
+def split_bitrate(total_kbps: int, audio_bitrate_kbps: int) -> tuple[int, int]:
+    """Split a total bitrate into (video_kbps, audio_kbps), keeping at least 32k audio and 100k video."""
+    audio_kbps = min(max(32, audio_bitrate_kbps), max(32, total_kbps - 100))
+    video_kbps = max(100, total_kbps - audio_kbps)
+    return video_kbps, audio_kbps
+
+
+def initial_total_kbps(
+    *,
+    source_total_kbps: int,
+    fallback_total_kbps: int,
+    min_total_kbps: int,
+    max_output_size_mb: int,
+    duration_sec: float,
+) -> int:
+    """Bitrate for the first encode: the source bitrate (or fallback), capped by the size budget."""
+    start_kbps = max(MIN_TOTAL_KBPS, source_total_kbps) if source_total_kbps > 0 else fallback_total_kbps
+    ceiling_kbps = budget_total_kbps(max_output_size_mb, duration_sec)
+    return max(min_total_kbps, min(start_kbps, ceiling_kbps))
+
+
+def retarget_total_kbps(
+    *,
+    attempt_total_kbps: int,
+    measured_bytes: int,
+    max_output_size_mb: int,
+    min_total_kbps: int,
+    min_step_kbps: int,
+) -> int | None:
+    """Next total bitrate after an oversized encode, or None when the floor is already reached.
+
+    The attempt is scaled by how far the measured size overshot the budget, so one
+    retry usually lands inside it. The result drops by at least `min_step_kbps` so
+    repeated retries always make progress.
+    """
+    if attempt_total_kbps <= min_total_kbps:
+        return None
+    max_bytes = max_output_size_mb * 1024 * 1024
+    scaled_kbps = math.floor(attempt_total_kbps * max_bytes / max(measured_bytes, 1) * RETARGET_SAFETY_RATIO)
+    next_kbps = min(scaled_kbps, attempt_total_kbps - max(1, min_step_kbps))
+    return max(min_total_kbps, next_kbps)
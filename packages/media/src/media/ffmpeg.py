@@ -0,0 +1,347 @@
+from __future__ import annotations
+
+import asyncio
+import subprocess
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from dataclasses import dataclass
+from typing import IO
+
+from loguru import logger
+
+STDERR_TAIL_LINES = 40
+# An encode slower than this multiple of realtime is treated as hung by the watchdog.
+WATCHDOG_MIN_SPEED = 0.1
+WATCHDOG_GRACE_SEC = 60.0
+# How often the sync runner's and RawVideoPipe's watchdog threads check the cancel event and deadline.
+POLL_SEC = 0.2
+
+
+@dataclass(frozen=True)
+class FFmpegProgress:
+    """One `-progress` report: frames so far, encode fps, speed vs realtime, output position."""
+
+    frame: int
+    fps: float
+    speed: float | None
+    out_time_sec: float
+    total_size: int
+    done: bool
+
+
+@dataclass(frozen=True)
+class FFmpegResult:
+    elapsed_sec: float
+    progress: FFmpegProgress | None
+    stderr_tail: str
+
+
+class FFmpegError(RuntimeError):
+    """ffmpeg exited non-zero; the message carries the last lines of its stderr."""
+
+    def __init__(self, message: str, *, returncode: int | None, stderr_tail: str) -> None:
+        super().__init__(message)
+        self.returncode = returncode
+        self.stderr_tail = stderr_tail
+
+
+class FFmpegTimeout(FFmpegError):
+    """ffmpeg ran past its watchdog deadline and was killed."""
+
+
+class FFmpegCancelled(FFmpegError):
+    """The caller cancelled the run and ffmpeg was killed."""
+
+
+def watchdog_timeout(
+    expected_duration_sec: float,
+    *,
+    min_speed: float = WATCHDOG_MIN_SPEED,
+    grace_sec: float = WATCHDOG_GRACE_SEC,
+) -> float:
+    """Wall-clock limit for producing `expected_duration_sec` of output at no less than `min_speed`."""
+    return grace_sec + max(0.0, expected_duration_sec) / min_speed
+
+
+def _int(value: str | None) -> int:
+    try:
+        return int(value or 0)
+    except ValueError:
+        return 0
+
+
+def _float(value: str | None) -> float:
+    try:
+        return float(value or 0)
+    except ValueError:
+        return 0.0
+
+
+def _progress_from_block(block: dict[str, str]) -> FFmpegProgress:
+    speed_text = block.get("speed", "").strip().rstrip("x")
+    # `out_time_ms` is also in microseconds (a long-standing ffmpeg quirk).
+    out_time_us = block.get("out_time_us") or block.get("out_time_ms")
+    return FFmpegProgress(
+        frame=_int(block.get("frame")),
+        fps=_float(block.get("fps")),
+        speed=_float(speed_text) if speed_text and speed_text != "N/A" else None,
+        out_time_sec=max(0.0, _int(out_time_us) / 1_000_000),
+        total_size=_int(block.get("total_size")),
+        done=block.get("progress") == "end",
+    )
+
+
+class ProgressParser:
+    """Incremental `-progress` parser: feed lines, get an `FFmpegProgress` at the end of each report."""
+
+    def __init__(self) -> None:
+        self._block: dict[str, str] = {}
+
+    def feed(self, line: str) -> FFmpegProgress | None:
+        key, sep, value = line.strip().partition("=")
+        if not sep:
+            return None
+        self._block[key] = value
+        if key != "progress":
+            return None
+        progress = _progress_from_block(self._block)
+        self._block = {}
+        return progress
+
+
+def parse_progress(lines: Iterable[str]) -> Iterator[FFmpegProgress]:
+    """Turn `-progress` key=value lines into one `FFmpegProgress` per report as they arrive."""
+    parser = ProgressParser()
+    for line in lines:
+        progress = parser.feed(line)
+        if progress is not None:
+            yield progress
+
+
+def progress_logger(
+    what: str,
+    *,
+    expected_duration_sec: float | None = None,
+    interval_sec: float = 10.0,
+) -> Callable[[FFmpegProgress], None]:
+    """`on_progress` callback that logs at most every `interval_sec`, plus the final report."""
+    last_logged = time.monotonic()
+
+    def _log(progress: FFmpegProgress) -> None:
+        nonlocal last_logged
+        now = time.monotonic()
+        if not progress.done and now - last_logged < interval_sec:
+            return
+        last_logged = now
+        percent = ""
+        if expected_duration_sec:
+            percent = f" ({min(100.0, progress.out_time_sec / expected_duration_sec * 100):.0f}%)"
+        logger.info(
+            "{} progress: out_time={:.1f}s{}, frame={}, fps={:.1f}, speed={}",
+            what,
+            progress.out_time_sec,
+            percent,
+            progress.frame,
+            progress.fps,
+            f"{progress.speed:.2f}x" if progress.speed is not None else "n/a",
+        )
+
+    return _log
+
+
+def progress_cmd(cmd: Sequence[str]) -> list[str]:
+    """`cmd` with `-nostats -progress pipe:1` after the executable, for `parse_progress` to read."""
+    return [cmd[0], "-nostats", "-progress", "pipe:1", *cmd[1:]]
+
+
+def _resolve_timeout(expected_duration_sec: float | None, timeout_sec: float | None) -> float | None:
+    if timeout_sec is None and expected_duration_sec is not None:
+        return watchdog_timeout(expected_duration_sec)
+    return timeout_sec
+
+
+def report_progress(
+    on_progress: Callable[[FFmpegProgress], None] | None,
+    progress: FFmpegProgress,
+    what: str,
+) -> None:
+    """Hand one report to `on_progress`, logging (not raising) if the callback fails."""
+    if on_progress is None:
+        return
+    try:
+        on_progress(progress)
+    except Exception:  # noqa: BLE001 - a failing callback must not stop draining the pipe
+        logger.exception("{} progress callback failed", what)
+
+
+def run_ffmpeg(
+    cmd: Sequence[str],
+    *,
+    what: str = "ffmpeg",
+    expected_duration_sec: float | None = None,
+    timeout_sec: float | None = None,
+    on_progress: Callable[[FFmpegProgress], None] | None = None,
+    cancel: threading.Event | None = None,
+    stderr_tail_lines: int = STDERR_TAIL_LINES,
+) -> FFmpegResult:
+    """Run an ffmpeg command, streaming its progress instead of buffering its output.
+
+    `-nostats -progress pipe:1` is added after the executable, so `cmd` must not
+    write media to stdout. Progress reports go to `on_progress` as they arrive;
+    only the last `stderr_tail_lines` lines of stderr are kept, for the error
+    message. Without an explicit `timeout_sec`, the watchdog deadline is derived
+    from `expected_duration_sec` (see `watchdog_timeout`); with neither, there
+    is no deadline. Setting `cancel` from another thread kills ffmpeg and raises
+    `FFmpegCancelled`.
+    """
+    timeout_sec = _resolve_timeout(expected_duration_sec, timeout_sec)
+    tail: deque[str] = deque(maxlen=max(1, stderr_tail_lines))
+    last_progress: list[FFmpegProgress] = []
+
+    def _collect_stderr(stream: IO[str]) -> None:
+        for line in stream:
+            tail.append(line.rstrip())
+
+    def _read_progress(stream: IO[str]) -> None:
+        for progress in parse_progress(stream):
+            last_progress[:] = [progress]
+            report_progress(on_progress, progress, what)
+
+    start = time.perf_counter()
+    deadline = None if timeout_sec is None else time.monotonic() + timeout_sec
+    process = subprocess.Popen(
+        progress_cmd(cmd),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors="replace",
+    )
+    readers = [
+        threading.Thread(target=_collect_stderr, args=(process.stderr,), name="ffmpeg-stderr", daemon=True),
+        threading.Thread(target=_read_progress, args=(process.stdout,), name="ffmpeg-progress", daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    # The watchdog kills ffmpeg from its own thread, so the caller blocks in a
+    # plain `wait()` and sees the exit without polling latency.
+    finished = threading.Event()
+    killed_for: list[str] = []
+
+    def _watch() -> None:
+        while not finished.wait(POLL_SEC):
+            if cancel is not None and cancel.is_set():
+                killed_for.append("cancel")
+            elif deadline is not None and time.monotonic() >= deadline:
+                killed_for.append("timeout")
+            else:
+                continue
+            process.kill()
+            return
+
+    watchdog = None
+    if cancel is not None or deadline is not None:
+        watchdog = threading.Thread(target=_watch, name="ffmpeg-watchdog", daemon=True)
+        watchdog.start()
+    try:
+        returncode = process.wait()
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        finished.set()
+        if watchdog is not None:
+            watchdog.join()
+        for reader in readers:
+            reader.join()
+
+    if killed_for == ["cancel"]:
+        raise FFmpegCancelled(f"{what} was cancelled", returncode=None, stderr_tail="\n".join(tail))
+    if killed_for == ["timeout"]:
+        stderr_tail = "\n".join(tail)
+        raise FFmpegTimeout(
+            f"{what} timed out after {timeout_sec:.0f}s and was killed: {stderr_tail}",
+            returncode=None,
+            stderr_tail=stderr_tail,
+        )
+    return _finish(what, returncode, tail, last_progress, start)
+
+
+async def run_ffmpeg_async(
+    cmd: Sequence[str],
+    *,
+    what: str = "ffmpeg",
+    expected_duration_sec: float | None = None,
+    timeout_sec: float | None = None,
+    on_progress: Callable[[FFmpegProgress], None] | None = None,
+    stderr_tail_lines: int = STDERR_TAIL_LINES,
+) -> FFmpegResult:
+    """`run_ffmpeg` for asyncio callers; cancelling the awaiting task kills ffmpeg."""
+    timeout_sec = _resolve_timeout(expected_duration_sec, timeout_sec)
+    tail: deque[str] = deque(maxlen=max(1, stderr_tail_lines))
+    last_progress: list[FFmpegProgress] = []
+    parser = ProgressParser()
+
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        *progress_cmd(cmd),
+        stdin=subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    assert process.stdout is not None and process.stderr is not None
+
+    async def _collect_stderr(stream: asyncio.StreamReader) -> None:
+        async for raw in stream:
+            tail.append(raw.decode("utf-8", errors="replace").rstrip())
+
+    async def _read_progress(stream: asyncio.StreamReader) -> None:
+        async for raw in stream:
+            progress = parser.feed(raw.decode("utf-8", errors="replace"))
+            if progress is not None:
+                last_progress[:] = [progress]
+                report_progress(on_progress, progress, what)
+
+    async def _kill() -> str:
+        if process.returncode is None:
+            process.kill()
+        await process.wait()
+        return "\n".join(tail)
+
+    try:
+        _, _, returncode = await asyncio.wait_for(
+            asyncio.gather(_collect_stderr(process.stderr), _read_progress(process.stdout), process.wait()),
+            timeout=timeout_sec,
+        )
+    except asyncio.TimeoutError:
+        stderr_tail = await _kill()
+        raise FFmpegTimeout(
+            f"{what} timed out after {timeout_sec:.0f}s and was killed: {stderr_tail}",
+            returncode=None,
+            stderr_tail=stderr_tail,
+        ) from None
+    except BaseException:
+        await _kill()
+        raise
+    return _finish(what, returncode, tail, last_progress, start)
+
+
+def _finish(
+    what: str,
+    returncode: int,
+    tail: deque[str],
+    last_progress: list[FFmpegProgress],
+    start: float,
+) -> FFmpegResult:
+    stderr_tail = "\n".join(tail)
+    if returncode != 0:
+        raise FFmpegError(f"{what} failed: {stderr_tail}", returncode=returncode, stderr_tail=stderr_tail)
+    return FFmpegResult(
+        elapsed_sec=time.perf_counter() - start,
+        progress=last_progress[0] if last_progress else None,
+        stderr_tail=stderr_tail,
+    )
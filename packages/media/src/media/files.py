@@ -0,0 +1,5 @@
+"""Write-then-rename outputs; the implementation is shared with non-media stages in `core.durability`."""
+
+from core.durability import atomic_output, temp_path_for
+
+__all__ = ["atomic_output", "temp_path_for"]
@@ -0,0 +1,26 @@
+"""The picture-in-picture overlay graph shared by the s6 compositor and the s4 render-final encode."""
+
+from __future__ import annotations
+
+
+def overlay_filter_complex(
+    *,
+    bg_setpts: str,
+    fg_setpts: str,
+    bg_fps: float,
+    scale_ratio: float,
+    margin_x: int,
+    margin_y: int,
+    output_filter: str = "",
+) -> str:
+    """`-filter_complex` that scales input 1 and lays it over input 0's bottom-left corner.
+
+    The background is retimed with `bg_setpts` and resampled to `bg_fps`; the
+    overlay keeps going after the foreground ends. `output_filter` (starting with
+    a comma) is appended to the overlay before the `[vout]` label.
+    """
+    return (
+        f"[0:v]setpts={bg_setpts},fps={bg_fps:.6f}:round=near[bg];"
+        f"[1:v]setpts={fg_setpts},scale=iw*{scale_ratio:.4f}:ih*{scale_ratio:.4f}[fg];"
+        f"[bg][fg]overlay={margin_x}:H-h-{margin_y}:eof_action=pass:shortest=0{output_filter}[vout]"
+    )
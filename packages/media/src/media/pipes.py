@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import subprocess
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterator, Sequence
+from pathlib import Path
+from typing import IO, Any
+
+from media.ffmpeg import (
+    POLL_SEC,
+    STDERR_TAIL_LINES,
+    FFmpegError,
+    FFmpegProgress,
+    FFmpegTimeout,
+    ProgressParser,
+    progress_cmd,
+    report_progress,
+    watchdog_timeout,
+)
+
+
+def rawvideo_input_args(*, width: int, height: int, fps: float, pix_fmt: str = "rgb24") -> list[str]:
+    """ffmpeg input arguments for packed raw frames arriving on stdin."""
+    return [
+        "-f",
+        "rawvideo",
+        "-pix_fmt",
+        pix_fmt,
+        "-s",
+        f"{width}x{height}",
+        "-r",
+        str(fps),
+        "-i",
+        "pipe:0",
+    ]
+
+
+class RawVideoPipe:
+    """An ffmpeg process fed raw frames on stdin, with streamed progress and a watchdog.
+
+    `cmd` must read one input from `pipe:0` (see `rawvideo_input_args`) and must
+    not write media to stdout: `-nostats -progress pipe:1` is added after the
+    executable and each report goes to `on_progress` and `last_progress`.
+    Writes block while ffmpeg is busy, which is the backpressure a frame
+    producer wants. Only the last `stderr_tail_lines` lines of stderr are kept
+    for the error message.
+
+    The watchdog kills ffmpeg, and `write`/`close` raise `FFmpegTimeout`, when:
+    - a `write` or `close` has been blocked for `stall_timeout_sec` without a
+      single progress report (a hung encoder rather than a slow producer);
+    - `close` runs past `watchdog_timeout` of the output still missing from
+      `expected_duration_sec` after stdin was closed.
+
+    `write` lets a plain `BrokenPipeError` through: ffmpeg closes stdin early
+    when the command caps its output (`-t`, `-frames`), and only the caller
+    knows whether that is expected.
+    """
+
+    def __init__(
+        self,
+        cmd: Sequence[str],
+        *,
+        what: str = "ffmpeg",
+        stderr_tail_lines: int = STDERR_TAIL_LINES,
+        expected_duration_sec: float | None = None,
+        stall_timeout_sec: float | None = None,
+        on_progress: Callable[[FFmpegProgress], None] | None = None,
+    ) -> None:
+        self.what = what
+        self.bytes_piped = 0
+        self.expected_duration_sec = expected_duration_sec
+        self.stall_timeout_sec = stall_timeout_sec
+        self.last_progress: FFmpegProgress | None = None
+        self._on_progress = on_progress
+        self._tail: deque[str] = deque(maxlen=max(1, stderr_tail_lines))
+        self._last_progress_at = time.monotonic()
+        self._blocked_since: float | None = None
+        self._close_deadline: float | None = None
+        self._killed_for: str | None = None
+        self._finished = threading.Event()
+        self._process = subprocess.Popen(
+            progress_cmd(cmd),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        self._readers = [
+            threading.Thread(
+                target=self._collect_stderr,
+                args=(self._process.stderr,),
+                name="ffmpeg-pipe-stderr",
+                daemon=True,
+            ),
+            threading.Thread(
+                target=self._read_progress,
+                args=(self._process.stdout,),
+                name="ffmpeg-pipe-progress",
+                daemon=True,
+            ),
+        ]
+        for reader in self._readers:
+            reader.start()
+        self._watchdog: threading.Thread | None = None
+        if stall_timeout_sec is not None or expected_duration_sec is not None:
+            self._watchdog = threading.Thread(target=self._watch, name="ffmpeg-pipe-watchdog", daemon=True)
+            self._watchdog.start()
+
+    def __enter__(self) -> RawVideoPipe:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.kill()
+
+    @property
+    def stderr_tail(self) -> str:
+        return "\n".join(self._tail)
+
+    def write(self, frames: Any) -> None:
+        """Pipe one or more packed frames (any buffer: bytes, memoryview, contiguous ndarray)."""
+        assert self._process.stdin is not None
+        view = memoryview(frames).cast("B")
+        self._blocked_since = time.monotonic()
+        try:
+            self._process.stdin.write(view)
+        except BrokenPipeError:
+            self._raise_if_killed()
+            raise
+        finally:
+            self._blocked_since = None
+        self.bytes_piped += view.nbytes
+
+    def close_stdin(self) -> None:
+        if self._process.stdin is not None and not self._process.stdin.closed:
+            try:
+                self._process.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+
+    def close(self) -> None:
+        """Signal end of input and wait for ffmpeg; raises `FFmpegError` on a non-zero exit."""
+        self._blocked_since = time.monotonic()
+        if self.expected_duration_sec is not None:
+            done_sec = self.last_progress.out_time_sec if self.last_progress is not None else 0.0
+            self._close_deadline = time.monotonic() + watchdog_timeout(self.expected_duration_sec - done_sec)
+        self.close_stdin()
+        returncode = self._process.wait()
+        self._join_threads()
+        self._raise_if_killed()
+        if returncode != 0:
+            raise FFmpegError(f"{self.what} failed: {self.stderr_tail}", returncode=returncode, stderr_tail=self.stderr_tail)
+
+    def kill(self) -> None:
+        self.close_stdin()
+        if self._process.poll() is None:
+            self._process.kill()
+        self._process.wait()
+        self._join_threads()
+
+    def _join_threads(self) -> None:
+        self._finished.set()
+        if self._watchdog is not None:
+            self._watchdog.join()
+        for reader in self._readers:
+            reader.join()
+
+    def _raise_if_killed(self) -> None:
+        if self._killed_for is None:
+            return
+        stderr_tail = self.stderr_tail
+        raise FFmpegTimeout(
+            f"{self.what} {self._killed_for} and was killed: {stderr_tail}",
+            returncode=None,
+            stderr_tail=stderr_tail,
+        )
+
+    def _watch(self) -> None:
+        while not self._finished.wait(POLL_SEC):
+            now = time.monotonic()
+            blocked_since = self._blocked_since
+            if self._close_deadline is not None and now >= self._close_deadline:
+                self._killed_for = "did not finish before its deadline"
+            elif (
+                self.stall_timeout_sec is not None
+                and blocked_since is not None
+                and now - max(blocked_since, self._last_progress_at) >= self.stall_timeout_sec
+            ):
+                self._killed_for = f"made no progress for {self.stall_timeout_sec:.0f}s"
+            else:
+                continue
+            self._process.kill()
+            return
+
+    def _collect_stderr(self, stream: IO[bytes]) -> None:
+        for line in stream:
+            self._tail.append(line.decode("utf-8", errors="replace").rstrip())
+
+    def _read_progress(self, stream: IO[bytes]) -> None:
+        parser = ProgressParser()
+        for line in stream:
+            progress = parser.feed(line.decode("utf-8", errors="replace"))
+            if progress is None:
+                continue
+            self.last_progress = progress
+            self._last_progress_at = time.monotonic()
+            report_progress(self._on_progress, progress, self.what)
+
+
+def read_rawvideo_frames(
+    path: str | Path,
+    *,
+    width: int,
+    height: int,
+    pix_fmt: str = "rgb24",
+    bytes_per_pixel: int = 3,
+    what: str = "ffmpeg decode",
+) -> Iterator[bytes]:
+    """Decode `path` with ffmpeg and yield its frames as packed raw bytes, one at a time.
+
+    The counterpart of `RawVideoPipe` for reading back what a lossless encode
+    stored. Raises `FFmpegError` on a non-zero exit or a truncated last frame;
+    closing the generator early kills ffmpeg.
+    """
+    frame_bytes = width * height * bytes_per_pixel
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin", "-i", str(path)]
+    cmd += ["-f", "rawvideo", "-pix_fmt", pix_fmt, "pipe:1"]
+    tail: deque[str] = deque(maxlen=STDERR_TAIL_LINES)
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def _collect_stderr(stream: IO[bytes]) -> None:
+        for line in stream:
+            tail.append(line.decode("utf-8", errors="replace").rstrip())
+
+    stderr_thread = threading.Thread(
+        target=_collect_stderr,
+        args=(process.stderr,),
+        name="ffmpeg-read-stderr",
+        daemon=True,
+    )
+    stderr_thread.start()
+    assert process.stdout is not None
+    try:
+        truncated = False
+        while frame := process.stdout.read(frame_bytes):
+            if len(frame) != frame_bytes:
+                truncated = True
+                break
+            yield frame
+        returncode = process.wait()
+        stderr_thread.join()
+        stderr_tail = "\n".join(tail)
+        if returncode != 0:
+            raise FFmpegError(f"{what} failed: {stderr_tail}", returncode=returncode, stderr_tail=stderr_tail)
+        if truncated:
+            raise FFmpegError(f"{what} ended mid-frame", returncode=returncode, stderr_tail=stderr_tail)
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+DEFAULT_FPS = 25.0
+_CACHE_CAPACITY = 256
+
+
+@dataclass(frozen=True)
+class MediaInfo:
+    """Container and first-stream metadata of one media file, from a single ffprobe call."""
+
+    path: str
+    duration_sec: float
+    total_kbps: int
+    fps: float
+    width: int
+    height: int
+    video_codec: str | None
+    audio_codec: str | None
+
+    @property
+    def has_video(self) -> bool:
+        return self.video_codec is not None
+
+    @property
+    def has_audio(self) -> bool:
+        return self.audio_codec is not None
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False)
+
+
+def _parse_rate(rate: str | None) -> float:
+    if not rate or rate == "0/0":
+        return 0.0
+    if "/" in rate:
+        num_str, den_str = rate.split("/", 1)
+        den = float(den_str)
+        return float(num_str) / den if den > 0 else 0.0
+    return float(rate)
+
+
+def _parse_probe(path: str, payload: dict[str, Any]) -> MediaInfo:
+    fmt = payload.get("format", {})
+    streams = payload.get("streams", [])
+    video = next((stream for stream in streams if stream.get("codec_type") == "video"), None)
+    audio = next((stream for stream in streams if stream.get("codec_type") == "audio"), None)
+
+    try:
+        duration = float(fmt.get("duration") or 0.0)
+    except ValueError:
+        duration = 0.0
+    try:
+        total_kbps = max(0, int(round(float(fmt.get("bit_rate") or 0) / 1000)))
+    except ValueError:
+        total_kbps = 0
+
+    fps = 0.0
+    if video is not None:
+        avg = _parse_rate(video.get("avg_frame_rate"))
+        fps = avg if avg > 0 else _parse_rate(video.get("r_frame_rate"))
+
+    return MediaInfo(
+        path=path,
+        duration_sec=duration,
+        total_kbps=total_kbps,
+        fps=fps if fps > 0 else DEFAULT_FPS,
+        width=int(video.get("width") or 0) if video else 0,
+        height=int(video.get("height") or 0) if video else 0,
+        video_codec=video.get("codec_name") if video else None,
+        audio_codec=audio.get("codec_name") if audio else None,
+    )
+
+
+def _run_ffprobe(path: str) -> MediaInfo:
+    cmd = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-show_entries",
+        "format=duration,bit_rate:stream=codec_type,codec_name,width,height,avg_frame_rate,r_frame_rate",
+        "-of",
+        "json",
+        path,
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed for {path}: {result.stderr}")
+    return _parse_probe(path, json.loads(result.stdout or "{}"))
+
+
+class ProbeCache:
+    """LRU of `MediaInfo` keyed by path, mtime and size.
+
+    A redelivered job or a retried encode reads the same inputs again; as long
+    as the file is unchanged, the cached metadata is returned without spawning
+    ffprobe. A rewritten file gets a new mtime/size and is probed again.
+    """
+
+    def __init__(self, capacity: int = _CACHE_CAPACITY) -> None:
+        self.capacity = max(1, capacity)
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, int, int], MediaInfo] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def probe(self, path: str) -> MediaInfo:
+        stat = Path(path).stat()
+        key = (str(Path(path).resolve()), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            info = self._entries.get(key)
+            if info is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return info
+            self.misses += 1
+
+        info = _run_ffprobe(path)
+        with self._lock:
+            self._entries[key] = info
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+        return info
+
+
+_default_cache = ProbeCache()
+
+
+def probe_media(path: str) -> MediaInfo:
+    """Probe `path` once per (path, mtime, size) for the lifetime of the worker process."""
+    return _default_cache.probe(path)
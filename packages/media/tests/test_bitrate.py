@@ -0,0 +1,50 @@
+from media.bitrate import (
+    budget_total_kbps,
+    initial_total_kbps,
+    retarget_total_kbps,
+    split_bitrate,
+)
+
+
+def test_budget_reserves_container_overhead():
+    # 30 MB over 60 s is ~4194 kbps before overhead.
+    assert budget_total_kbps(30, 60.0) == 4068
+
+
+def test_initial_bitrate_is_capped_by_budget():
+    kwargs = dict(fallback_total_kbps=600, min_total_kbps=350, max_output_size_mb=30)
+    # Short clip: the source bitrate fits and is kept.
+    assert initial_total_kbps(source_total_kbps=2000, duration_sec=30.0, **kwargs) == 2000
+    # Long clip: a high source bitrate would overshoot, so the first encode starts at the ceiling.
+    assert initial_total_kbps(source_total_kbps=2000, duration_sec=300.0, **kwargs) == budget_total_kbps(30, 300.0)
+    # Unknown source bitrate falls back; the floor wins over an impossible budget.
+    assert initial_total_kbps(source_total_kbps=0, duration_sec=60.0, **kwargs) == 600
+    assert initial_total_kbps(source_total_kbps=2000, duration_sec=3600.0, **kwargs) == 350
+
+
+def test_retarget_scales_from_measured_size():
+    max_bytes = 30 * 1024 * 1024
+    next_kbps = retarget_total_kbps(
+        attempt_total_kbps=1000,
+        measured_bytes=int(max_bytes * 1.25),
+        max_output_size_mb=30,
+        min_total_kbps=350,
+        min_step_kbps=50,
+    )
+    assert next_kbps == 760
+
+
+def test_retarget_always_makes_progress_and_stops_at_floor():
+    max_bytes = 30 * 1024 * 1024
+    kwargs = dict(max_output_size_mb=30, min_total_kbps=350, min_step_kbps=50)
+    # A barely oversized file still drops by at least the minimum step.
+    assert retarget_total_kbps(attempt_total_kbps=1000, measured_bytes=max_bytes + 1, **kwargs) <= 950
+    assert retarget_total_kbps(attempt_total_kbps=1000, measured_bytes=max_bytes // 2, **kwargs) == 950
+    assert retarget_total_kbps(attempt_total_kbps=400, measured_bytes=max_bytes * 4, **kwargs) == 350
+    assert retarget_total_kbps(attempt_total_kbps=350, measured_bytes=max_bytes * 2, **kwargs) is None
+
+
+def test_split_bitrate_keeps_audio_and_video_floors():
+    assert split_bitrate(1000, 96) == (904, 96)
+    assert split_bitrate(150, 96) == (100, 50)
+    assert split_bitrate(100, 96) == (100, 32)
@@ -0,0 +1,134 @@
+import asyncio
+import shutil
+import threading
+import time
+
+import pytest
+
+from media.ffmpeg import (
+    FFmpegCancelled,
+    FFmpegError,
+    FFmpegTimeout,
+    parse_progress,
+    run_ffmpeg,
+    run_ffmpeg_async,
+    watchdog_timeout,
+)
+
+_requires_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+_REALTIME_30S = ["ffmpeg", "-re", "-f", "lavfi", "-i", "testsrc=size=64x64:rate=25:duration=30", "-f", "null", "-"]
+
+_REPORTS = """\
+frame=48
+fps=23.95
+stream_0_0_q=28.0
+bitrate= 512.3kbits/s
+total_size=131072
+out_time_us=2000000
+out_time_ms=2000000
+out_time=00:00:02.000000
+dup_frames=0
+drop_frames=0
+speed=1.19x
+progress=continue
+frame=96
+fps=0.00
+total_size=N/A
+out_time_us=N/A
+speed=N/A
+progress=end
+"""
+
+
+def test_progress_reports_are_parsed_per_block():
+    first, last = list(parse_progress(_REPORTS.splitlines(keepends=True)))
+
+    assert (first.frame, first.fps, first.speed, first.out_time_sec, first.total_size) == (48, 23.95, 1.19, 2.0, 131072)
+    assert not first.done
+    assert (last.frame, last.speed, last.out_time_sec, last.total_size) == (96, None, 0.0, 0)
+    assert last.done
+
+
+def test_incomplete_block_is_not_reported():
+    assert list(parse_progress(["frame=1\n", "fps=2.0\n"])) == []
+
+
+def test_watchdog_scales_with_expected_duration():
+    assert watchdog_timeout(30.0, min_speed=0.5, grace_sec=10.0) == 70.0
+    assert watchdog_timeout(60.0) > watchdog_timeout(30.0)
+
+
+@_requires_ffmpeg
+def test_progress_is_streamed_and_last_report_returned():
+    seen = []
+    result = run_ffmpeg(
+        ["ffmpeg", "-f", "lavfi", "-i", "testsrc=size=64x64:rate=25:duration=2", "-f", "null", "-"],
+        expected_duration_sec=2.0,
+        on_progress=seen.append,
+    )
+
+    assert seen and seen[-1].done
+    assert result.progress == seen[-1]
+    assert result.progress.frame == 50
+
+
+@_requires_ffmpeg
+def test_failure_keeps_only_the_stderr_tail():
+    with pytest.raises(FFmpegError) as excinfo:
+        run_ffmpeg(["ffmpeg", "-i", "/nonexistent/input.mp4", "-f", "null", "-"], what="probe", stderr_tail_lines=2)
+
+    assert str(excinfo.value).startswith("probe failed: ")
+    assert excinfo.value.returncode != 0
+    assert len(excinfo.value.stderr_tail.splitlines()) <= 2
+
+
+@_requires_ffmpeg
+def test_watchdog_kills_a_stalled_encode():
+    # `-re` reads at realtime, so a 30 s source cannot finish inside a 1 s deadline.
+    with pytest.raises(FFmpegTimeout):
+        run_ffmpeg(_REALTIME_30S, timeout_sec=1.0)
+
+
+@_requires_ffmpeg
+def test_cancel_event_kills_the_encode():
+    cancel = threading.Event()
+    threading.Timer(0.5, cancel.set).start()
+    start = time.monotonic()
+
+    with pytest.raises(FFmpegCancelled):
+        run_ffmpeg(_REALTIME_30S, cancel=cancel)
+    assert time.monotonic() - start < 10
+
+
+@_requires_ffmpeg
+def test_async_runner_reports_progress():
+    seen = []
+    result = asyncio.run(
+        run_ffmpeg_async(
+            ["ffmpeg", "-f", "lavfi", "-i", "testsrc=size=64x64:rate=25:duration=2", "-f", "null", "-"],
+            on_progress=seen.append,
+        )
+    )
+
+    assert result.progress is not None and result.progress.done
+    assert result.progress.frame == 50
+
+
+@_requires_ffmpeg
+def test_cancelling_the_async_task_kills_ffmpeg():
+    async def _run():
+        task = asyncio.create_task(run_ffmpeg_async(_REALTIME_30S))
+        await asyncio.sleep(0.5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    start = time.monotonic()
+    asyncio.run(_run())
+    assert time.monotonic() - start < 10
+
+
+@_requires_ffmpeg
+def test_async_watchdog_times_out():
+    with pytest.raises(FFmpegTimeout):
+        asyncio.run(run_ffmpeg_async(_REALTIME_30S, timeout_sec=1.0))
@@ -0,0 +1,28 @@
+import pytest
+
+from media.files import atomic_output
+
+
+def test_output_appears_only_after_the_block_succeeds(tmp_path):
+    target = tmp_path / "out.mp4"
+
+    with atomic_output(target) as tmp:
+        assert tmp.parent == tmp_path and tmp.suffix == ".mp4" and tmp.name.startswith(".")
+        tmp.write_bytes(b"new")
+        assert not target.exists()
+
+    assert target.read_bytes() == b"new"
+    assert list(tmp_path.iterdir()) == [target]
+
+
+def test_failure_keeps_the_previous_output(tmp_path):
+    target = tmp_path / "out.mp4"
+    target.write_bytes(b"old")
+
+    with pytest.raises(RuntimeError):
+        with atomic_output(target) as tmp:
+            tmp.write_bytes(b"partial")
+            raise RuntimeError("encode failed")
+
+    assert target.read_bytes() == b"old"
+    assert list(tmp_path.iterdir()) == [target]
@@ -0,0 +1,32 @@
+from media.overlay import overlay_filter_complex
+
+
+def test_overlay_graph_retimes_the_background_and_pins_the_foreground_bottom_left():
+    graph = overlay_filter_complex(
+        bg_setpts="PTS*1.25000000",
+        fg_setpts="PTS-STARTPTS",
+        bg_fps=30000 / 1001,
+        scale_ratio=0.18,
+        margin_x=18,
+        margin_y=24,
+    )
+
+    assert graph == (
+        "[0:v]setpts=PTS*1.25000000,fps=29.970030:round=near[bg];"
+        "[1:v]setpts=PTS-STARTPTS,scale=iw*0.1800:ih*0.1800[fg];"
+        "[bg][fg]overlay=18:H-h-24:eof_action=pass:shortest=0[vout]"
+    )
+
+
+def test_output_filter_runs_before_the_output_label():
+    graph = overlay_filter_complex(
+        bg_setpts="PTS",
+        fg_setpts="PTS",
+        bg_fps=25,
+        scale_ratio=0.5,
+        margin_x=0,
+        margin_y=0,
+        output_filter=",scale=320:240",
+    )
+
+    assert graph.endswith("shortest=0,scale=320:240[vout]")
@@ -0,0 +1,107 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from media import pipes
+from media.ffmpeg import FFmpegError, FFmpegTimeout
+from media.pipes import RawVideoPipe, rawvideo_input_args, read_rawvideo_frames
+
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+
+
+def test_piped_frames_are_encoded_losslessly(tmp_path):
+    width, height, count = 32, 16, 10
+    frames = bytes(range(256)) * (width * height * 3 * count // 256)
+    output = tmp_path / "out.mkv"
+    cmd = ["ffmpeg", "-y", "-loglevel", "error", *rawvideo_input_args(width=width, height=height, fps=25)]
+
+    with RawVideoPipe([*cmd, "-c:v", "ffv1", str(output)]) as pipe:
+        for index in range(count):
+            frame_size = width * height * 3
+            pipe.write(frames[index * frame_size : (index + 1) * frame_size])
+    decoded = subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-i", str(output), "-f", "rawvideo", "-pix_fmt", "rgb24", "-"],
+        capture_output=True,
+        check=True,
+    ).stdout
+
+    assert pipe.bytes_piped == len(frames)
+    assert decoded == frames
+
+
+def test_encoder_failure_raises_with_stderr_tail(tmp_path):
+    cmd = ["ffmpeg", "-y", *rawvideo_input_args(width=16, height=16, fps=25), "-c:v", "no_such_codec", str(tmp_path / "x.mp4")]
+    pipe = RawVideoPipe(cmd, what="raw encode")
+
+    with pytest.raises(FFmpegError, match="raw encode failed"):
+        try:
+            pipe.write(bytes(16 * 16 * 3))
+        except BrokenPipeError:
+            pass
+        pipe.close()
+
+
+def test_progress_is_reported_while_piping(tmp_path):
+    reports = []
+    cmd = ["ffmpeg", "-y", "-loglevel", "error", *rawvideo_input_args(width=16, height=16, fps=25)]
+    with RawVideoPipe([*cmd, "-c:v", "ffv1", str(tmp_path / "out.mkv")], on_progress=reports.append) as pipe:
+        pipe.write(bytes(16 * 16 * 3 * 50))
+
+    assert reports and reports[-1].done
+    assert pipe.last_progress is reports[-1]
+    assert pipe.last_progress.frame == 50
+
+
+def _stuck_encoder_cmd(tmp_path):
+    # ffmpeg blocks opening a FIFO nobody writes to, so it never reads stdin.
+    fifo = tmp_path / "stuck.fifo"
+    os.mkfifo(fifo)
+    return [
+        "ffmpeg",
+        "-y",
+        "-i",
+        str(fifo),
+        *rawvideo_input_args(width=16, height=16, fps=25),
+        "-c:v",
+        "ffv1",
+        str(tmp_path / "out.mkv"),
+    ]
+
+
+def test_watchdog_kills_a_stalled_write(tmp_path):
+    pipe = RawVideoPipe(_stuck_encoder_cmd(tmp_path), what="raw encode", stall_timeout_sec=0.5)
+
+    with pytest.raises(FFmpegTimeout, match="raw encode made no progress"):
+        pipe.write(bytes(4 * 1024 * 1024))
+    pipe.kill()
+
+
+def test_watchdog_kills_an_encode_that_misses_its_close_deadline(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipes, "watchdog_timeout", lambda remaining_sec: 0.5)
+    pipe = RawVideoPipe(_stuck_encoder_cmd(tmp_path), what="raw encode", expected_duration_sec=2.0)
+
+    with pytest.raises(FFmpegTimeout, match="did not finish before its deadline"):
+        pipe.close()
+
+
+def test_read_rawvideo_frames_round_trips_a_lossless_encode(tmp_path):
+    width, height, count = 18, 10, 4
+    frame_size = width * height * 3
+    frames = [bytes([index * 40]) * frame_size for index in range(count)]
+    output = tmp_path / "segment.mkv"
+    cmd = ["ffmpeg", "-y", "-loglevel", "error", *rawvideo_input_args(width=width, height=height, fps=25)]
+    with RawVideoPipe([*cmd, "-c:v", "ffv1", "-pix_fmt", "gbrp", str(output)]) as pipe:
+        for frame in frames:
+            pipe.write(frame)
+
+    assert list(read_rawvideo_frames(output, width=width, height=height)) == frames
+
+
+def test_read_rawvideo_frames_raises_on_unreadable_input(tmp_path):
+    broken = tmp_path / "broken.mkv"
+    broken.write_bytes(b"not a video")
+
+    with pytest.raises(FFmpegError, match="ffmpeg decode failed"):
+        list(read_rawvideo_frames(broken, width=4, height=4))
@@ -0,0 +1,56 @@
+import json
+import os
+
+from media import probe
+from media.probe import MediaInfo, ProbeCache, _parse_probe
+
+_FFPROBE_PAYLOAD = {
+    "streams": [
+        {"codec_type": "video", "codec_name": "h264", "width": 720, "height": 1280, "avg_frame_rate": "30000/1001"},
+        {"codec_type": "audio", "codec_name": "aac", "avg_frame_rate": "0/0"},
+    ],
+    "format": {"duration": "12.480000", "bit_rate": "1534000"},
+}
+
+
+def test_parse_probe_reads_every_field_from_one_payload():
+    info = _parse_probe("bg.mp4", _FFPROBE_PAYLOAD)
+
+    assert info.duration_sec == 12.48
+    assert info.total_kbps == 1534
+    assert round(info.fps, 3) == 29.970
+    assert (info.width, info.height) == (720, 1280)
+    assert info.video_codec == "h264"
+    assert info.has_audio
+    assert json.loads(info.to_json())["audio_codec"] == "aac"
+
+
+def test_parse_probe_defaults_for_missing_streams():
+    info = _parse_probe("silent.mp4", {"streams": [], "format": {"duration": "3.0"}})
+
+    assert info.fps == probe.DEFAULT_FPS
+    assert info.total_kbps == 0
+    assert not info.has_video
+    assert not info.has_audio
+
+
+def test_probe_cache_reprobes_only_when_file_changes(tmp_path, monkeypatch):
+    calls: list[str] = []
+
+    def _fake_ffprobe(path: str) -> MediaInfo:
+        calls.append(path)
+        return _parse_probe(path, _FFPROBE_PAYLOAD)
+
+    monkeypatch.setattr(probe, "_run_ffprobe", _fake_ffprobe)
+    media = tmp_path / "bg.mp4"
+    media.write_bytes(b"v1")
+    cache = ProbeCache()
+
+    first = cache.probe(str(media))
+    assert cache.probe(str(media)) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    media.write_bytes(b"v2-longer")
+    os.utime(media, ns=(1, 1))
+    cache.probe(str(media))
+    assert len(calls) == 2
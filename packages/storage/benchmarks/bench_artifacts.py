@@ -0,0 +1,109 @@
+"""Disk usage and GC cost of the artifact store on a synthetic pipeline workload.
+
+Each record writes an s2 source (drawn from a small pool, so popular
+sources repeat across records), an s3 audio file, an s4 inference video and
+an s6 composite. s8 confirms records `--confirm-lag` records behind the
+writer, and each confirmation releases the record and runs the GC.
+
+Legacy: every stage writes its own uuid-named copy and nothing is deleted.
+Store: content-addressed objects, hardlinked references, GC after
+confirmation.
+
+Usage:
+    uv run python benchmarks/bench_artifacts.py [--records 200] [--sources 20] [--confirm-lag 10]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+from uuid import uuid4
+
+from loguru import logger
+
+from storage import ArtifactStore
+
+# Bytes per stage output, scaled down from typical production sizes.
+_STAGE_SIZES = {"s2-source": 400_000, "s3-audio": 40_000, "s4-inference": 200_000, "s6-composited": 500_000}
+
+
+def _dir_bytes(root: Path) -> int:
+    seen: set[int] = set()
+    total = 0
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            stat = (Path(dirpath) / filename).stat()
+            if stat.st_ino not in seen:
+                seen.add(stat.st_ino)
+                total += stat.st_size
+    return total
+
+
+def _payloads(args: argparse.Namespace, rng: random.Random) -> list[dict[str, bytes]]:
+    sources = [rng.randbytes(_STAGE_SIZES["s2-source"]) for _ in range(args.sources)]
+    return [
+        {
+            "s2-source": rng.choice(sources),
+            **{name: rng.randbytes(size) for name, size in _STAGE_SIZES.items() if name != "s2-source"},
+        }
+        for _ in range(args.records)
+    ]
+
+
+def _legacy(root: Path, records: list[dict[str, bytes]]) -> tuple[int, float]:
+    start = time.perf_counter()
+    for record_id, outputs in enumerate(records):
+        for name, data in outputs.items():
+            stage_dir = root / name.split("-")[0]
+            stage_dir.mkdir(parents=True, exist_ok=True)
+            (stage_dir / f"record_{record_id}_{uuid4().hex}.bin").write_bytes(data)
+    return _dir_bytes(root), time.perf_counter() - start
+
+
+def _store(root: Path, records: list[dict[str, bytes]], confirm_lag: int) -> tuple[int, int, float, float]:
+    store = ArtifactStore(root, gc_grace_sec=0)
+    peak = 0
+    gc_sec = 0.0
+    start = time.perf_counter()
+    for record_id, outputs in enumerate(records):
+        for name, data in outputs.items():
+            with store.writer(table_id="bench", record_id=record_id, name=name, suffix=".bin") as artifact:
+                artifact.write(data)
+        confirmed = record_id - confirm_lag
+        if confirmed >= 0:
+            gc_start = time.perf_counter()
+            store.release(table_id="bench", record_id=confirmed)
+            store.collect()
+            gc_sec += time.perf_counter() - gc_start
+        peak = max(peak, store.usage_bytes())
+    return peak, store.usage_bytes(), time.perf_counter() - start, gc_sec
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=200)
+    parser.add_argument("--sources", type=int, default=20)
+    parser.add_argument("--confirm-lag", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logger.disable("storage")
+    records = _payloads(args, random.Random(args.seed))
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_bytes, legacy_sec = _legacy(Path(tmp) / "legacy", records)
+        peak, final, store_sec, gc_sec = _store(Path(tmp) / "store", records, args.confirm_lag)
+
+    mib = 1024 * 1024
+    print(f"{'legacy per-stage copies':>26}: {legacy_bytes / mib:8.1f} MiB on disk, {legacy_sec * 1000 / args.records:6.2f} ms/record")
+    print(
+        f"{'content-addressed store':>26}: {peak / mib:8.1f} MiB peak, {final / mib:6.1f} MiB after GC, "
+        f"{store_sec * 1000 / args.records:6.2f} ms/record (GC {gc_sec * 1000 / args.records:5.2f} ms/record)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+from storage.artifacts import ArtifactRef, ArtifactStore, ArtifactWriter, CollectResult, CollectSchedule, materialize
+
+__all__ = [
+    "ArtifactRef",
+    "ArtifactStore",
+    "ArtifactWriter",
+    "CollectResult",
+    "CollectSchedule",
+    "materialize",
+]
@@ -0,0 +1,377 @@
+"""Content-addressed artifact store on the shared `/data` volume.
+
+Layout under `root`:
+- `objects/<aa>/<sha256><suffix>`: one file per distinct content.
+- `refs/<table_id>/<record_id>/<name>.<sha256><suffix>`: a record's reference
+  to an object, hardlinked to it. This is the path stages hand downstream.
+- `tmp/`: writes in progress, on the same filesystem so ingest is a rename/link.
+
+A record's references live until `release` (called once s8 has confirmed
+the record). `collect` then deletes every object that no record references
+any more. Records that never reach s8 (a job that failed for good) are
+released by `release_stale` once their reference dir is older than
+`ref_max_age_sec`. Because references are hardlinks, deleting an object never
+invalidates a path that is still in use.
+
+`collect` walks the whole store, so callers run it on a `CollectSchedule`
+(every N released records or every few minutes) rather than per record.
+Ingests hold a shared `flock` on `<root>/.lock` from linking the object to
+publishing the reference; `collect` deletes objects under the exclusive lock,
+so it never unlinks an object between those two steps.
+"""
+
+from __future__ import annotations
+
+import errno
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+from uuid import uuid4
+
+from loguru import logger
+
+# Linux FICLONE ioctl: share extents copy-on-write (btrfs, XFS with reflink=1).
+_FICLONE = 0x40049409
+_HASH_CHUNK_BYTES = 1024 * 1024
+_NAME_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+_REF_RE = re.compile(r"^(?P<name>[A-Za-z0-9_-]+)\.(?P<digest>[0-9a-f]{64})(?P<suffix>\.[A-Za-z0-9]+)?$")
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        while chunk := handle.read(_HASH_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _reflink(source: Path, dest: Path) -> None:
+    import fcntl
+
+    with source.open("rb") as src, dest.open("wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        except OSError:
+            dest.unlink(missing_ok=True)
+            raise
+
+
+def materialize(source: str | Path, dest: str | Path, *, mode: str = "link") -> str:
+    """Make `dest` have the content of `source` without copying bytes where the filesystem allows.
+
+    `mode="link"` tries a hardlink, then a reflink, then a copy. Use it for
+    read-only consumers. `mode="reflink"` skips the hardlink, so the
+    consumer can modify `dest` without touching `source`. Returns the method
+    that was used: "hardlink", "reflink" or "copy".
+    """
+    if mode not in {"link", "reflink"}:
+        raise ValueError(f"Unknown materialize mode {mode!r}; expected 'link' or 'reflink'")
+    source, dest = Path(source), Path(dest)
+    if mode == "link":
+        try:
+            os.link(source, dest)
+            return "hardlink"
+        except OSError as exc:
+            if exc.errno not in {errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP}:
+                raise
+    try:
+        _reflink(source, dest)
+        return "reflink"
+    except (OSError, ImportError):
+        shutil.copyfile(source, dest)
+        return "copy"
+
+
+@dataclass(frozen=True)
+class ArtifactRef:
+    table_id: str
+    record_id: int
+    name: str
+    digest: str
+    path: Path
+
+
+@dataclass(frozen=True)
+class CollectResult:
+    removed_objects: int
+    freed_bytes: int
+    kept_objects: int
+    stale_records: int = 0
+
+
+class CollectSchedule:
+    """Decide when a full `collect` is due: every `every_records` releases or `interval_sec`, whichever comes first."""
+
+    def __init__(self, *, every_records: int = 50, interval_sec: float = 600.0) -> None:
+        self.every_records = max(1, every_records)
+        self.interval_sec = interval_sec
+        self._pending = 0
+        self._last_run = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record_released(self) -> bool:
+        """Count one released record; True (and reset) when the caller should collect now."""
+        with self._lock:
+            self._pending += 1
+            now = time.monotonic()
+            if self._pending < self.every_records and now - self._last_run < self.interval_sec:
+                return False
+            self._pending = 0
+            self._last_run = now
+            return True
+
+
+class ArtifactWriter:
+    """File-like sink that hashes while writing; `path` is set once the store has ingested it."""
+
+    def __init__(self, handle: BinaryIO) -> None:
+        self._handle = handle
+        self._digest = hashlib.sha256()
+        self.bytes_written = 0
+        self.path: Path | None = None
+
+    def write(self, chunk: bytes) -> int:
+        self._handle.write(chunk)
+        self._digest.update(chunk)
+        self.bytes_written += len(chunk)
+        return len(chunk)
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+
+class ArtifactStore:
+    def __init__(
+        self,
+        root: str | Path,
+        *,
+        gc_grace_sec: float = 3600.0,
+        ref_max_age_sec: float | None = None,
+    ) -> None:
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.refs_dir = self.root / "refs"
+        self.tmp_dir = self.root / "tmp"
+        self.gc_grace_sec = gc_grace_sec
+        self.ref_max_age_sec = ref_max_age_sec
+
+    @contextmanager
+    def _lock(self, *, exclusive: bool) -> Iterator[None]:
+        import fcntl
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        with (self.root / ".lock").open("a") as handle:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    def object_path(self, digest: str, suffix: str = "") -> Path:
+        return self.objects_dir / digest[:2] / f"{digest}{suffix}"
+
+    def record_dir(self, *, table_id: str, record_id: int) -> Path:
+        return self.refs_dir / str(table_id) / str(record_id)
+
+    @contextmanager
+    def writer(self, *, table_id: str, record_id: int, name: str, suffix: str = "") -> Iterator[ArtifactWriter]:
+        """Stream bytes (e.g. a download) into the store; `writer.path` is the record's reference."""
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.tmp_dir / f"{uuid4().hex}{suffix}"
+        try:
+            with tmp_path.open("wb") as handle:
+                artifact = ArtifactWriter(handle)
+                yield artifact
+            artifact.path = self._ingest(
+                tmp_path,
+                digest=artifact.hexdigest(),
+                suffix=suffix,
+                table_id=table_id,
+                record_id=record_id,
+                name=name,
+            )
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def put_file(self, path: str | Path, *, table_id: str, record_id: int, name: str) -> Path:
+        """Move a finished file (e.g. an ffmpeg output) into the store and return the record's reference.
+
+        The file is read once: hashed after the rename, or while it is copied
+        when `path` is on another filesystem.
+        """
+        source = Path(path)
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.tmp_dir / f"{uuid4().hex}{source.suffix}"
+        try:
+            try:
+                os.replace(source, tmp_path)
+            except OSError as exc:
+                if exc.errno != errno.EXDEV:
+                    raise
+                with source.open("rb") as src, tmp_path.open("wb") as handle:
+                    artifact = ArtifactWriter(handle)
+                    shutil.copyfileobj(src, artifact, _HASH_CHUNK_BYTES)
+                digest = artifact.hexdigest()
+                source.unlink()
+            else:
+                digest = _file_sha256(tmp_path)
+            return self._ingest(
+                tmp_path,
+                digest=digest,
+                suffix=source.suffix,
+                table_id=table_id,
+                record_id=record_id,
+                name=name,
+            )
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def _ingest(self, tmp_path: Path, *, digest: str, suffix: str, table_id: str, record_id: int, name: str) -> Path:
+        if not _NAME_RE.match(name):
+            raise ValueError(f"Artifact name {name!r} must match {_NAME_RE.pattern}")
+        obj = self.object_path(digest, suffix)
+        obj.parent.mkdir(parents=True, exist_ok=True)
+        record_dir = self.record_dir(table_id=table_id, record_id=record_id)
+        record_dir.mkdir(parents=True, exist_ok=True)
+        ref = record_dir / f"{name}.{digest}{suffix}"
+        with self._lock(exclusive=False):
+            try:
+                os.link(tmp_path, obj)
+                deduplicated = False
+            except FileExistsError:
+                deduplicated = True
+            # A fresh mtime keeps the object inside the grace period of a `collect` that
+            # listed references before this one exists.
+            os.utime(obj)
+
+            # A redelivered stage may have produced different bytes under the same name.
+            for stale in record_dir.glob(f"{name}.*"):
+                if stale != ref:
+                    stale.unlink(missing_ok=True)
+            if not ref.exists():
+                ref_tmp = record_dir / f".{ref.name}.{uuid4().hex}"
+                try:
+                    materialize(obj, ref_tmp)
+                    os.replace(ref_tmp, ref)
+                finally:
+                    ref_tmp.unlink(missing_ok=True)
+
+        logger.info(
+            "Artifact stored: table={} record={} name={} digest={} deduplicated={}",
+            table_id,
+            record_id,
+            name,
+            digest[:12],
+            deduplicated,
+        )
+        return ref
+
+    def refs(self) -> Iterator[ArtifactRef]:
+        for path in self.refs_dir.glob("*/*/*"):
+            match = _REF_RE.match(path.name)
+            if match is None:
+                continue
+            try:
+                record_id = int(path.parent.name)
+            except ValueError:
+                continue
+            yield ArtifactRef(
+                table_id=path.parent.parent.name,
+                record_id=record_id,
+                name=match["name"],
+                digest=match["digest"],
+                path=path,
+            )
+
+    def reference_counts(self) -> dict[str, int]:
+        """Number of distinct records referencing each object digest."""
+        records: dict[str, set[tuple[str, int]]] = {}
+        for ref in self.refs():
+            records.setdefault(ref.digest, set()).add((ref.table_id, ref.record_id))
+        return {digest: len(owners) for digest, owners in records.items()}
+
+    def release(self, *, table_id: str, record_id: int) -> int:
+        """Drop every reference held by a confirmed record; returns how many were dropped."""
+        record_dir = self.record_dir(table_id=table_id, record_id=record_id)
+        if not record_dir.exists():
+            return 0
+        released = sum(1 for path in record_dir.iterdir() if _REF_RE.match(path.name))
+        shutil.rmtree(record_dir, ignore_errors=True)
+        return released
+
+    def release_stale(self, max_age_sec: float) -> int:
+        """Release records whose reference dir has not changed for `max_age_sec`; returns how many."""
+        cutoff = time.time() - max_age_sec
+        released = 0
+        for record_dir in self.refs_dir.glob("*/*"):
+            try:
+                if not record_dir.is_dir() or record_dir.stat().st_mtime > cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            shutil.rmtree(record_dir, ignore_errors=True)
+            released += 1
+        if released:
+            logger.warning("Artifact GC released {} records untouched for {:.0f}s", released, max_age_sec)
+        return released
+
+    def collect(self) -> CollectResult:
+        """Delete objects no record references, and stale temp files, older than `gc_grace_sec`.
+
+        With `ref_max_age_sec` set, stale records are released first (see `release_stale`).
+        """
+        stale = self.release_stale(self.ref_max_age_sec) if self.ref_max_age_sec is not None else 0
+        cutoff = time.time() - self.gc_grace_sec
+        live = self.reference_counts()
+        removed = freed = kept = 0
+        candidates: list[Path] = []
+        for path in self.objects_dir.glob("*/*"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.name[:64] in live or stat.st_mtime > cutoff:
+                kept += 1
+                continue
+            candidates.append(path)
+        with self._lock(exclusive=True):
+            for path in candidates:
+                # Re-check now that no ingest is in flight: one may have reused the object
+                # (fresh mtime) or hardlinked a reference to it since the walk above.
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                if stat.st_nlink > 1 or stat.st_mtime > cutoff:
+                    kept += 1
+                    continue
+                path.unlink(missing_ok=True)
+                removed += 1
+                freed += stat.st_size
+        for path in self.tmp_dir.glob("*"):
+            try:
+                if path.stat().st_mtime <= cutoff:
+                    path.unlink(missing_ok=True)
+            except FileNotFoundError:
+                continue
+        if removed:
+            logger.info("Artifact GC removed {} objects ({} bytes), kept {}", removed, freed, kept)
+        return CollectResult(removed_objects=removed, freed_bytes=freed, kept_objects=kept, stale_records=stale)
+
+    def usage_bytes(self) -> int:
+        """Bytes held by objects (references are hardlinks and take no extra space)."""
+        total = 0
+        for path in self.objects_dir.glob("*/*"):
+            try:
+                total += path.stat().st_size
+            except FileNotFoundError:
+                continue
+        return total
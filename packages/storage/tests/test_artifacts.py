@@ -0,0 +1,185 @@
+import errno
+import hashlib
+import os
+import threading
+import time
+
+import pytest
+
+from storage import artifacts
+from storage.artifacts import ArtifactStore, CollectSchedule, materialize
+
+
+def _put_bytes(store, data, *, record_id, name="s2-source", table_id="t1"):
+    with store.writer(table_id=table_id, record_id=record_id, name=name, suffix=".mp4") as artifact:
+        artifact.write(data)
+    return artifact.path
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    store = ArtifactStore(tmp_path)
+
+    first = _put_bytes(store, b"video", record_id=1)
+    second = _put_bytes(store, b"video", record_id=2)
+
+    assert first != second
+    assert first.read_bytes() == second.read_bytes() == b"video"
+    assert os.path.samefile(first, second)
+    assert len(list(store.objects_dir.glob("*/*"))) == 1
+    assert store.reference_counts() == {first.name.split(".")[1]: 2}
+
+
+def test_put_file_moves_output_into_the_store(tmp_path):
+    store = ArtifactStore(tmp_path / "store")
+    output = tmp_path / "record_1_composited.mp4"
+    output.write_bytes(b"encoded")
+
+    ref = store.put_file(output, table_id="t1", record_id=1, name="s6-composited")
+
+    assert not output.exists()
+    assert ref.read_bytes() == b"encoded"
+    assert ref.parent == store.record_dir(table_id="t1", record_id=1)
+    assert ref.suffix == ".mp4"
+
+
+def test_put_file_across_filesystems_hashes_while_copying(tmp_path, monkeypatch):
+    store = ArtifactStore(tmp_path / "store")
+    output = tmp_path / "record_1_composited.mp4"
+    output.write_bytes(b"encoded" * 1000)
+
+    real_replace = os.replace
+
+    def _cross_device(src, dst):
+        # Only the move out of the caller's directory crosses filesystems.
+        if src == output:
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", _cross_device)
+    ref = store.put_file(output, table_id="t1", record_id=1, name="s6-composited")
+
+    assert not output.exists()
+    assert ref.read_bytes() == b"encoded" * 1000
+    assert ref.name == f"s6-composited.{hashlib.sha256(b'encoded' * 1000).hexdigest()}.mp4"
+    assert list(store.tmp_dir.iterdir()) == []
+
+
+def test_redelivered_stage_replaces_its_previous_reference(tmp_path):
+    store = ArtifactStore(tmp_path)
+
+    _put_bytes(store, b"first try", record_id=1)
+    ref = _put_bytes(store, b"second try", record_id=1)
+
+    assert [path.name for path in ref.parent.iterdir()] == [ref.name]
+
+
+def test_gc_keeps_referenced_and_recent_objects(tmp_path):
+    store = ArtifactStore(tmp_path, gc_grace_sec=0)
+    shared = _put_bytes(store, b"shared", record_id=1)
+    _put_bytes(store, b"shared", record_id=2)
+    _put_bytes(store, b"own", record_id=1, name="s3-audio")
+
+    assert store.release(table_id="t1", record_id=1) == 2
+    result = store.collect()
+
+    assert (result.removed_objects, result.freed_bytes, result.kept_objects) == (1, 3, 1)
+    assert store.usage_bytes() == len(b"shared")
+    assert not shared.exists()
+
+    assert store.release(table_id="t1", record_id=2) == 1
+    assert store.collect().removed_objects == 1
+    assert store.usage_bytes() == 0
+
+
+def test_gc_grace_period_protects_fresh_objects(tmp_path):
+    store = ArtifactStore(tmp_path, gc_grace_sec=3600)
+    _put_bytes(store, b"data", record_id=1)
+    store.release(table_id="t1", record_id=1)
+
+    assert store.collect().removed_objects == 0
+
+
+def test_gc_releases_records_that_never_reached_s8(tmp_path):
+    store = ArtifactStore(tmp_path, gc_grace_sec=0, ref_max_age_sec=3600)
+    abandoned = _put_bytes(store, b"abandoned", record_id=1)
+    in_flight = _put_bytes(store, b"in flight", record_id=2)
+    old = time.time() - 7200
+    os.utime(abandoned.parent, (old, old))
+
+    result = store.collect()
+
+    assert (result.stale_records, result.removed_objects, result.kept_objects) == (1, 1, 1)
+    assert not abandoned.parent.exists()
+    assert in_flight.read_bytes() == b"in flight"
+
+
+def test_collect_waits_for_an_ingest_reusing_an_unreferenced_object(tmp_path, monkeypatch):
+    store = ArtifactStore(tmp_path, gc_grace_sec=0)
+    _put_bytes(store, b"shared", record_id=1)
+    store.release(table_id="t1", record_id=1)
+    collected = []
+    collector = threading.Thread(target=lambda: collected.append(store.collect()))
+
+    def _collect_mid_ingest(source, dest, **kwargs):
+        # Record 2 has deduplicated onto the unreferenced object but not published its
+        # reference yet: the window in which an unlocked `collect` deleted the object.
+        collector.start()
+        collector.join(0.2)
+        assert collector.is_alive()
+        return materialize(source, dest, **kwargs)
+
+    monkeypatch.setattr(artifacts, "materialize", _collect_mid_ingest)
+    ref = _put_bytes(store, b"shared", record_id=2)
+    collector.join(5)
+
+    assert ref.read_bytes() == b"shared"
+    assert collected[0].removed_objects == 0
+    assert [obj.read_bytes() for obj in store.objects_dir.glob("*/*")] == [b"shared"]
+
+
+def test_collect_schedule_fires_every_n_records_or_interval():
+    schedule = CollectSchedule(every_records=3, interval_sec=3600)
+
+    assert [schedule.record_released() for _ in range(6)] == [False, False, True, False, False, True]
+
+    schedule.interval_sec = 0
+    assert schedule.record_released() is True
+
+
+def test_hardlinked_reference_survives_object_deletion(tmp_path):
+    store = ArtifactStore(tmp_path, gc_grace_sec=0)
+    ref = _put_bytes(store, b"data", record_id=1)
+
+    for obj in store.objects_dir.glob("*/*"):
+        obj.unlink()
+
+    assert ref.read_bytes() == b"data"
+
+
+def test_failed_write_leaves_nothing_behind(tmp_path):
+    store = ArtifactStore(tmp_path)
+
+    with pytest.raises(RuntimeError):
+        with store.writer(table_id="t1", record_id=1, name="s2-source", suffix=".mp4") as artifact:
+            artifact.write(b"partial")
+            raise RuntimeError("download failed")
+
+    assert list(store.tmp_dir.iterdir()) == []
+    assert not store.record_dir(table_id="t1", record_id=1).exists()
+
+
+def test_invalid_artifact_name_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        _put_bytes(ArtifactStore(tmp_path), b"x", record_id=1, name="bad.name")
+
+
+def test_materialize_reflink_mode_never_hardlinks(tmp_path):
+    source = tmp_path / "source.bin"
+    source.write_bytes(b"payload")
+
+    method = materialize(source, tmp_path / "copy.bin", mode="reflink")
+
+    assert method in {"reflink", "copy"}
+    assert not os.path.samefile(source, tmp_path / "copy.bin")
+    assert (tmp_path / "copy.bin").read_bytes() == b"payload"
+    assert materialize(source, tmp_path / "link.bin") == "hardlink"
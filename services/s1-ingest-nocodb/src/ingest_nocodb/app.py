@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import json
 from contextlib import asynccontextmanager
 from typing import Annotated, Any, AsyncIterator, List, Optional
@@ -11,7 +12,17 @@ from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, ConfigDict, Field, StringConstraints
 
-from ingest_nocodb.messaging import enqueue_downstream, enqueue_ping, init_broker
+from ingest_nocodb.dedupe import DedupeKey, init_dedupe_store, row_fingerprint
+from ingest_nocodb.messaging import (
+    BatchPublishError,
+    build_downstream_message,
+    enqueue_ping,
+    init_broker,
+    init_publisher,
+    publish_downstream_batch,
+    run_on_publisher,
+    shutdown_publisher,
+)
 from ingest_nocodb.settings import get_settings
 
 
@@ -23,7 +34,10 @@ async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
     settings = get_settings()
     configure_service_logger("s1-ingest-nocodb", debug=settings.debug_log_payload)
     init_broker(settings)
+    init_publisher(settings)
+    init_dedupe_store(settings)
     yield
+    shutdown_publisher()
 
 
 app = FastAPI(title="s1-ingest-nocodb", lifespan=lifespan)
@@ -94,12 +108,14 @@ class NocoDbWebhookPayload(BaseModel):
 class WebhookAck(BaseModel):
     ok: bool
     received_rows: int
+    enqueued_rows: int
+    duplicate_rows: int
 
 
 @app.post("/ping")
 async def ping() -> dict[str, str]:
     settings = get_settings()
-    enqueue_ping(settings)
+    await run_on_publisher(settings, enqueue_ping)
     logger.bind(event="ping_enqueued", stage="s1", queue=settings.downstream_queue).info(
         "Ping enqueued"
     )
@@ -128,38 +144,101 @@ async def webhook(payload: NocoDbWebhookPayload) -> WebhookAck:
             json.dumps(payload_for_log, indent=2, default=str),
         )
 
-    for row in payload.data.rows:
-        row_logger = logger.bind(
-            event="row_processing",
-            stage="s1",
-            record_id=row.record_id,
-            table_id=payload.data.table_id,
-        )
-
+    table_id = payload.data.table_id
+    keys = [
+        DedupeKey(table_id, row.record_id, row_fingerprint(row.url, row.content)) for row in payload.data.rows
+    ]
+    dedupe_store = init_dedupe_store(settings)
+    if dedupe_store is not None:
+        claims = await asyncio.to_thread(dedupe_store.claim, keys)
+    else:
+        claims = [None] * len(keys)
+
+    fresh_rows = []
+    fresh_keys = []
+    for row, key, duplicate_state in zip(payload.data.rows, keys, claims):
+        if duplicate_state is not None:
+            logger.bind(
+                event="row_duplicate",
+                stage="s1",
+                record_id=row.record_id,
+                table_id=table_id,
+                dedupe_state=duplicate_state,
+            ).info("Skipping row already {}", duplicate_state)
+            continue
+        fresh_rows.append(row)
+        fresh_keys.append(key)
+
+    messages = []
+    for row in fresh_rows:
         if settings.debug_log_payload:
             row_for_log = _truncate_payload_text_fields(row.model_dump())
-            row_logger.info(
+            logger.bind(
+                event="row_processing",
+                stage="s1",
+                record_id=row.record_id,
+                table_id=payload.data.table_id,
+            ).info(
                 "Processing row debug payload:\n{}",
                 json.dumps(row_for_log, indent=2, default=str),
             )
-
-        enqueue_downstream(
-            settings,
-            record_id=row.record_id,
-            table_id=payload.data.table_id,
-            url=row.url,
-            content=row.content,
+        messages.append(
+            build_downstream_message(
+                settings,
+                record_id=row.record_id,
+                table_id=payload.data.table_id,
+                url=row.url,
+                content=row.content,
+            )
         )
-        if settings.debug_log_payload:
+
+    # One hop off the event loop for the whole webhook; the pooled channel
+    # returns once every row is confirmed by RabbitMQ.
+    try:
+        published = await publish_downstream_batch(settings, messages) if messages else 0
+    except BatchPublishError as exc:
+        # Rows before the failure are on the queue; only the rest may be retried.
+        if dedupe_store is not None:
+            await asyncio.to_thread(dedupe_store.complete, fresh_keys[: exc.published])
+            await asyncio.to_thread(dedupe_store.release, fresh_keys[exc.published :])
+        raise
+    except Exception:
+        if dedupe_store is not None:
+            await asyncio.to_thread(dedupe_store.release, fresh_keys)
+        raise
+    if dedupe_store is not None:
+        await asyncio.to_thread(dedupe_store.complete, fresh_keys)
+    logger.bind(
+        event="downstream_enqueued",
+        stage="s1",
+        table_id=payload.data.table_id,
+        queue=settings.downstream_queue,
+        enqueued_rows=published,
+        duplicate_rows=len(keys) - len(fresh_keys),
+    ).info("Enqueued downstream batch")
+
+    if settings.debug_log_payload:
+        for row in fresh_rows:
             msg_args = {
                 "record_id": row.record_id,
                 "table_id": payload.data.table_id,
                 "url": row.url,
                 "content": _truncate_text(row.content),
             }
-            row_logger.bind(queue=settings.downstream_queue, event="downstream_enqueued").info(
+            logger.bind(
+                event="downstream_enqueued",
+                stage="s1",
+                record_id=row.record_id,
+                table_id=payload.data.table_id,
+                queue=settings.downstream_queue,
+            ).info(
                 "Enqueued downstream message:\n{}",
                 json.dumps(msg_args, indent=2, default=str),
             )
 
-    return WebhookAck(ok=True, received_rows=len(payload.data.rows))
+    return WebhookAck(
+        ok=True,
+        received_rows=len(payload.data.rows),
+        enqueued_rows=published,
+        duplicate_rows=len(keys) - len(fresh_keys),
+    )
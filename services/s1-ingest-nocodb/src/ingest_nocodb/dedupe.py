@@ -0,0 +1,231 @@
+"""Dedupe index for webhook rows, so NocoDB re-fires do not restart the pipeline.
+
+A row is keyed by (table_id, record_id, fingerprint of url + content), so an
+edit that changes the url or content is processed again while a plain retry or
+an unrelated field edit is not. Each key is in one of two states:
+
+- `in_flight`: claimed by a webhook that is publishing it. Expires after
+  `S1_DEDUPE_IN_FLIGHT_TTL_SEC` so a crash between claim and publish does not
+  block the row forever.
+- `done`: handed to s2 with a confirmed publish. This says nothing about
+  whether the pipeline later succeeded, so it only lives for the short
+  `S1_DEDUPE_TTL_SEC` re-fire window, after which the same content may be
+  processed again.
+
+Claims are atomic per batch, so concurrent webhooks carrying the same row
+enqueue it once.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from typing import NamedTuple, Optional, Protocol
+
+from ingest_nocodb.settings import Settings
+
+DEDUPE_BACKENDS = ("sqlite", "memory")
+
+IN_FLIGHT = "in_flight"
+DONE = "done"
+
+
+class DedupeKey(NamedTuple):
+    table_id: str
+    record_id: int
+    fingerprint: str
+
+
+def row_fingerprint(url: str, content: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(url.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(content.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class DedupeStore(Protocol):
+    """Where claims live. Implementations must make `claim` atomic across callers."""
+
+    def claim(self, keys: Sequence[DedupeKey]) -> list[Optional[str]]:
+        """Claim every unclaimed (or expired) key as in-flight.
+
+        Returns one entry per key: `None` if this call claimed it, otherwise
+        the state that made it a duplicate. A key repeated within `keys` is
+        claimed once.
+        """
+        ...
+
+    def complete(self, keys: Sequence[DedupeKey]) -> None:
+        """Mark claimed keys done once their messages are published."""
+        ...
+
+    def release(self, keys: Sequence[DedupeKey]) -> None:
+        """Drop claims whose publish failed, so the webhook retry can enqueue them."""
+        ...
+
+
+class MemoryDedupeStore:
+    """Process-local store; duplicates are only caught within one s1 process and lifetime."""
+
+    def __init__(self, *, ttl_sec: float, in_flight_ttl_sec: float, clock: Callable[[], float] = time.time) -> None:
+        self.ttl_sec = ttl_sec
+        self.in_flight_ttl_sec = in_flight_ttl_sec
+        self._clock = clock
+        self._entries: dict[DedupeKey, tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def claim(self, keys: Sequence[DedupeKey]) -> list[Optional[str]]:
+        with self._lock:
+            now = self._clock()
+            results: list[Optional[str]] = []
+            for key in keys:
+                existing = self._entries.get(key)
+                if existing is not None and existing[1] > now:
+                    results.append(existing[0])
+                    continue
+                self._entries[key] = (IN_FLIGHT, now + self.in_flight_ttl_sec)
+                results.append(None)
+            return results
+
+    def complete(self, keys: Sequence[DedupeKey]) -> None:
+        with self._lock:
+            expires_at = self._clock() + self.ttl_sec
+            for key in keys:
+                self._entries[key] = (DONE, expires_at)
+
+    def release(self, keys: Sequence[DedupeKey]) -> None:
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == IN_FLIGHT:
+                    del self._entries[key]
+
+
+class SqliteDedupeStore:
+    """Store in a local SQLite file, shared by every s1 process on the host and kept across restarts.
+
+    Claims run in a `BEGIN IMMEDIATE` transaction, which takes the database
+    write lock up front, so concurrent claimers (threads or processes) are
+    serialized.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        ttl_sec: float,
+        in_flight_ttl_sec: float,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = Path(path)
+        self.ttl_sec = ttl_sec
+        self.in_flight_ttl_sec = in_flight_ttl_sec
+        self._clock = clock
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection shared by all threads, guarded by `_lock`.
+        self._conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ingest_dedupe ("
+                " table_id TEXT NOT NULL,"
+                " record_id INTEGER NOT NULL,"
+                " fingerprint TEXT NOT NULL,"
+                " state TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " PRIMARY KEY (table_id, record_id, fingerprint))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ingest_dedupe_expires_at ON ingest_dedupe (expires_at)")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def claim(self, keys: Sequence[DedupeKey]) -> list[Optional[str]]:
+        with self._lock:
+            now = self._clock()
+            expires_at = now + self.in_flight_ttl_sec
+            results: list[Optional[str]] = []
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM ingest_dedupe WHERE expires_at <= ?", (now,))
+                for key in keys:
+                    row = self._conn.execute(
+                        "SELECT state FROM ingest_dedupe WHERE table_id = ? AND record_id = ? AND fingerprint = ?",
+                        key,
+                    ).fetchone()
+                    if row is not None:
+                        results.append(row[0])
+                        continue
+                    self._conn.execute(
+                        "INSERT INTO ingest_dedupe (table_id, record_id, fingerprint, state, expires_at)"
+                        " VALUES (?, ?, ?, ?, ?)",
+                        (*key, IN_FLIGHT, expires_at),
+                    )
+                    results.append(None)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return results
+
+    def complete(self, keys: Sequence[DedupeKey]) -> None:
+        with self._lock:
+            expires_at = self._clock() + self.ttl_sec
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO ingest_dedupe (table_id, record_id, fingerprint, state, expires_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    [(*key, DONE, expires_at) for key in keys],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def release(self, keys: Sequence[DedupeKey]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM ingest_dedupe WHERE table_id = ? AND record_id = ? AND fingerprint = ? AND state = ?",
+                [(*key, IN_FLIGHT) for key in keys],
+            )
+
+
+def build_dedupe_store(
+    name: str,
+    *,
+    sqlite_path: str,
+    ttl_sec: float,
+    in_flight_ttl_sec: float,
+) -> DedupeStore:
+    if name == "sqlite":
+        return SqliteDedupeStore(sqlite_path, ttl_sec=ttl_sec, in_flight_ttl_sec=in_flight_ttl_sec)
+    if name == "memory":
+        return MemoryDedupeStore(ttl_sec=ttl_sec, in_flight_ttl_sec=in_flight_ttl_sec)
+    raise ValueError(f"Invalid S1_DEDUPE_BACKEND={name!r}; expected one of {', '.join(DEDUPE_BACKENDS)}")
+
+
+_store: Optional[DedupeStore] = None
+
+
+def init_dedupe_store(settings: Settings) -> Optional[DedupeStore]:
+    """The process-wide store, or `None` when `S1_DEDUPE_ENABLED` is off."""
+    global _store
+    if not settings.dedupe_enabled:
+        return None
+    if _store is None:
+        _store = build_dedupe_store(
+            settings.dedupe_backend,
+            sqlite_path=settings.dedupe_sqlite_path,
+            ttl_sec=settings.dedupe_ttl_sec,
+            in_flight_ttl_sec=settings.dedupe_in_flight_ttl_sec,
+        )
+    return _store
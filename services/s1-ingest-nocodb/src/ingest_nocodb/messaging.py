@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-from typing import Optional
+import asyncio
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, TypeVar
 
 import dramatiq
 from dramatiq.brokers.rabbitmq import RabbitmqBroker
@@ -9,16 +12,57 @@ from ingest_nocodb.settings import Settings
 
 
 _broker: Optional[RabbitmqBroker] = None
+# Dramatiq keeps one connection/channel per thread, so the publisher threads
+# double as a pool of long-lived channels shared by all webhooks.
+_publisher: Optional[ThreadPoolExecutor] = None
+
+T = TypeVar("T")
+
+
+class BatchPublishError(RuntimeError):
+    """A batch publish failed part-way; the first `published` messages are already queued."""
+
+    def __init__(self, published: int, total: int) -> None:
+        super().__init__(f"Downstream publish failed after {published} of {total} messages")
+        self.published = published
+        self.total = total
 
 
 def init_broker(settings: Settings) -> RabbitmqBroker:
     global _broker
     if _broker is None:
-        _broker = RabbitmqBroker(url=settings.rabbitmq_url)
+        _broker = RabbitmqBroker(url=settings.rabbitmq_url, confirm_delivery=settings.confirm_delivery)
         dramatiq.set_broker(_broker)
     return _broker
 
 
+def init_publisher(settings: Settings) -> ThreadPoolExecutor:
+    global _publisher
+    if _publisher is None:
+        _publisher = ThreadPoolExecutor(
+            max_workers=settings.publisher_channels,
+            thread_name_prefix="s1-publisher",
+        )
+    return _publisher
+
+
+def shutdown_publisher() -> None:
+    """Wait for in-flight batches, then close the pooled channels and connections."""
+    global _publisher
+    if _publisher is None:
+        return
+    _publisher.shutdown(wait=True)
+    _publisher = None
+    if _broker is not None:
+        _broker.close()
+
+
+async def run_on_publisher(settings: Settings, fn: Callable[..., T], *args: object) -> T:
+    """Run a blocking publish on a pooled publisher thread without stalling the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(init_publisher(settings), fn, settings, *args)
+
+
 def enqueue_ping(settings: Settings) -> None:
     broker = init_broker(settings)
     message = dramatiq.Message(
@@ -31,19 +75,52 @@ def enqueue_ping(settings: Settings) -> None:
     broker.enqueue(message)
 
 
-def enqueue_downstream(
+def build_downstream_message(
     settings: Settings,
     record_id: int,
     table_id: str,
     url: str,
     content: str,
-) -> None:
-    broker = init_broker(settings)
-    message = dramatiq.Message(
+) -> dramatiq.Message:
+    return dramatiq.Message(
         queue_name=settings.downstream_queue,
         actor_name=settings.downstream_actor,
         args=[record_id, table_id, url, content],
         kwargs={},
         options={},
     )
-    broker.enqueue(message)
+
+
+def enqueue_downstream(
+    settings: Settings,
+    record_id: int,
+    table_id: str,
+    url: str,
+    content: str,
+) -> None:
+    broker = init_broker(settings)
+    broker.enqueue(build_downstream_message(settings, record_id, table_id, url, content))
+
+
+def enqueue_downstream_batch(settings: Settings, messages: Sequence[dramatiq.Message]) -> int:
+    """Publish `messages` back to back on the calling thread's channel.
+
+    With `S1_CONFIRM_DELIVERY` each publish returns only once RabbitMQ has
+    confirmed it, so a successful return means every row is on the queue. If a
+    publish fails, `BatchPublishError` reports how many leading messages were
+    already confirmed; the original error is its `__cause__`.
+    """
+    broker = init_broker(settings)
+    published = 0
+    for message in messages:
+        try:
+            broker.enqueue(message)
+        except Exception as exc:
+            raise BatchPublishError(published, len(messages)) from exc
+        published += 1
+    return published
+
+
+async def publish_downstream_batch(settings: Settings, messages: list[dramatiq.Message]) -> int:
+    """Publish all rows of one webhook as a single batch on one pooled channel."""
+    return await run_on_publisher(settings, enqueue_downstream_batch, messages)
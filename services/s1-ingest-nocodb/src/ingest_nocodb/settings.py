@@ -38,6 +38,44 @@ class Settings(BaseSettings):
         description="Dramatiq actor name for downstream service",
         validation_alias=AliasChoices("S1_DOWNSTREAM_ACTOR", "downstream_actor"),
     )
+    confirm_delivery: bool = Field(
+        True,
+        description="Wait for RabbitMQ publisher confirms before acknowledging a webhook",
+        validation_alias=AliasChoices("S1_CONFIRM_DELIVERY", "confirm_delivery"),
+    )
+    publisher_channels: int = Field(
+        4,
+        description="RabbitMQ channels (one publisher thread each) shared by concurrent webhooks",
+        validation_alias=AliasChoices("S1_PUBLISHER_CHANNELS", "publisher_channels"),
+        ge=1,
+    )
+    dedupe_enabled: bool = Field(
+        True,
+        description="Acknowledge rows already in flight or done without enqueueing them again",
+        validation_alias=AliasChoices("S1_DEDUPE_ENABLED", "dedupe_enabled"),
+    )
+    dedupe_backend: str = Field(
+        "sqlite",
+        description="Dedupe index store: sqlite (shared by s1 processes, survives restarts) or memory",
+        validation_alias=AliasChoices("S1_DEDUPE_BACKEND", "dedupe_backend"),
+    )
+    dedupe_sqlite_path: str = Field(
+        "/data/s1/dedupe.sqlite3",
+        description="SQLite file for the sqlite dedupe backend",
+        validation_alias=AliasChoices("S1_DEDUPE_SQLITE_PATH", "dedupe_sqlite_path"),
+    )
+    dedupe_ttl_sec: float = Field(
+        3600,
+        description="How long a row handed to s2 is treated as a duplicate (covers NocoDB re-fires, not pipeline completion)",
+        validation_alias=AliasChoices("S1_DEDUPE_TTL_SEC", "dedupe_ttl_sec"),
+        gt=0,
+    )
+    dedupe_in_flight_ttl_sec: float = Field(
+        600,
+        description="How long a claim survives without a confirmed publish (e.g. s1 crashed mid-webhook)",
+        validation_alias=AliasChoices("S1_DEDUPE_IN_FLIGHT_TTL_SEC", "dedupe_in_flight_ttl_sec"),
+        gt=0,
+    )
     debug_log_payload: bool = Field(
         False,
         description="Enable verbose logging of incoming rows and enqueued messages",
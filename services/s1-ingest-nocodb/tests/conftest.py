@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _fresh_dedupe_store(monkeypatch):
+    # Every test starts with an empty process-local dedupe index.
+    monkeypatch.setenv("S1_DEDUPE_BACKEND", "memory")
+    monkeypatch.setattr("ingest_nocodb.dedupe._store", None)
@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+
+from ingest_nocodb.dedupe import (
+    DONE,
+    IN_FLIGHT,
+    DedupeKey,
+    MemoryDedupeStore,
+    SqliteDedupeStore,
+    build_dedupe_store,
+    row_fingerprint,
+)
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def _make(clock):
+        if request.param == "memory":
+            return MemoryDedupeStore(ttl_sec=100, in_flight_ttl_sec=10, clock=clock)
+        return SqliteDedupeStore(tmp_path / "dedupe.sqlite3", ttl_sec=100, in_flight_ttl_sec=10, clock=clock)
+
+    return _make
+
+
+def _key(record_id: int, content: str = "text") -> DedupeKey:
+    return DedupeKey("tbl", record_id, row_fingerprint("https://example.com", content))
+
+
+def test_fingerprint_separates_url_and_content():
+    assert row_fingerprint("ab", "c") != row_fingerprint("a", "bc")
+    assert row_fingerprint("a", "b") == row_fingerprint("a", "b")
+
+
+def test_claim_complete_and_expire(make_store):
+    clock = _Clock()
+    store = make_store(clock)
+
+    assert store.claim([_key(1), _key(2), _key(1)]) == [None, None, IN_FLIGHT]
+    assert store.claim([_key(1), _key(1, "edited")]) == [IN_FLIGHT, None]
+
+    store.complete([_key(1)])
+    clock.now += 50
+    assert store.claim([_key(1)]) == [DONE]
+    # The in-flight claim on record 2 was never completed and has expired.
+    assert store.claim([_key(2)]) == [None]
+
+    clock.now += 51
+    assert store.claim([_key(1)]) == [None]
+
+
+def test_release_drops_only_in_flight_claims(make_store):
+    store = make_store(_Clock())
+    store.claim([_key(1), _key(2)])
+    store.complete([_key(2)])
+
+    store.release([_key(1), _key(2)])
+
+    assert store.claim([_key(1), _key(2)]) == [None, DONE]
+
+
+def test_concurrent_claims_have_one_winner(make_store):
+    store = make_store(_Clock())
+    keys = [_key(record_id) for record_id in range(50)]
+    barrier = threading.Barrier(8)
+    results: list[list] = []
+
+    def claim() -> None:
+        barrier.wait()
+        results.append(store.claim(keys))
+
+    threads = [threading.Thread(target=claim) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for index in range(len(keys)):
+        assert sum(result[index] is None for result in results) == 1
+
+
+def test_sqlite_claims_are_shared_across_connections(tmp_path):
+    path = tmp_path / "dedupe.sqlite3"
+    first = SqliteDedupeStore(path, ttl_sec=100, in_flight_ttl_sec=10)
+    second = SqliteDedupeStore(path, ttl_sec=100, in_flight_ttl_sec=10)
+
+    assert first.claim([_key(1)]) == [None]
+    assert second.claim([_key(1)]) == [IN_FLIGHT]
+    first.close()
+    second.close()
+
+
+def test_build_dedupe_store_rejects_unknown_backend(tmp_path):
+    with pytest.raises(ValueError, match="S1_DEDUPE_BACKEND"):
+        build_dedupe_store("redis", sqlite_path=str(tmp_path / "x"), ttl_sec=1, in_flight_ttl_sec=1)
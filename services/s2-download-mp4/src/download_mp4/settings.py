@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from core.durability import Durability
 from pydantic import AliasChoices, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -37,11 +38,54 @@ class Settings(BaseSettings):
         description="Directory to store downloaded MP4 files",
         validation_alias=AliasChoices("S2_OUTPUT_DIR", "output_dir"),
     )
+    artifact_store_enabled: bool = Field(
+        False,
+        description="Write outputs through the shared content-addressed artifact store instead of output_dir",
+        validation_alias=AliasChoices("S2_ARTIFACT_STORE_ENABLED", "artifact_store_enabled"),
+    )
+    artifact_store_dir: str = Field(
+        "/data/artifacts",
+        description="Root of the shared artifact store (must be on the same filesystem for every stage)",
+        validation_alias=AliasChoices("S2_ARTIFACT_STORE_DIR", "ARTIFACT_STORE_DIR", "artifact_store_dir"),
+    )
+    durability: Durability = Field(
+        "file",
+        description="How outputs are flushed before the downstream enqueue: none, file (fsync the output and its directory) or host (os.sync)",
+        validation_alias=AliasChoices("S2_DURABILITY", "durability"),
+    )
     request_timeout_s: float = Field(
         60.0,
         description="HTTP request timeout in seconds",
         validation_alias=AliasChoices("S2_REQUEST_TIMEOUT_S", "request_timeout_s"),
     )
+    download_timeout_s: float = Field(
+        120.0,
+        description="Timeout in seconds for downloading the generated file",
+        validation_alias=AliasChoices("S2_DOWNLOAD_TIMEOUT_S", "download_timeout_s"),
+    )
+    http_max_connections: int = Field(
+        20,
+        description="Connections the pooled HTTP client opens at most, across all hosts",
+        validation_alias=AliasChoices("S2_HTTP_MAX_CONNECTIONS", "http_max_connections"),
+        ge=1,
+    )
+    http_max_keepalive_connections: int = Field(
+        10,
+        description="Idle connections kept open for reuse between jobs",
+        validation_alias=AliasChoices("S2_HTTP_MAX_KEEPALIVE_CONNECTIONS", "http_max_keepalive_connections"),
+        ge=0,
+    )
+    http_keepalive_expiry_s: float = Field(
+        60.0,
+        description="Seconds an idle pooled connection is kept before it is closed",
+        validation_alias=AliasChoices("S2_HTTP_KEEPALIVE_EXPIRY_S", "http_keepalive_expiry_s"),
+        ge=0,
+    )
+    http2_enabled: bool = Field(
+        True,
+        description="Negotiate HTTP/2 with servers that offer it",
+        validation_alias=AliasChoices("S2_HTTP2_ENABLED", "http2_enabled"),
+    )
     current_queue: str = Field(
         "s2-download-mp4",
         description="Dramatiq queue consumed by this service",
@@ -1,15 +1,16 @@
 from __future__ import annotations
 
 import json
-import os
 from pathlib import Path
 from typing import Any, Optional
 from uuid import uuid4
 
 import dramatiq
-import httpx
 from dramatiq.brokers.rabbitmq import RabbitmqBroker
+from core.durability import Durability, atomic_output, make_durable
+from core.http import CloseHttpClientMiddleware, build_http_client
 from core.logging import configure_service_logger, get_logger
+from storage import ArtifactStore
 
 from download_mp4.settings import get_settings
 
@@ -37,6 +38,20 @@ broker = RabbitmqBroker(url=settings.rabbitmq_url)
 dramatiq.set_broker(broker)
 broker.declare_queue(settings.current_queue, ensure=True)
 
+artifact_store = ArtifactStore(settings.artifact_store_dir) if settings.artifact_store_enabled else None
+
+# One pooled client per worker process, shared by all jobs and worker threads,
+# so the parse API and the CDN connections stay open between jobs.
+http_client = build_http_client(
+    timeout_s=settings.request_timeout_s,
+    max_connections=settings.http_max_connections,
+    max_keepalive_connections=settings.http_max_keepalive_connections,
+    keepalive_expiry_s=settings.http_keepalive_expiry_s,
+    http2=settings.http2_enabled,
+)
+
+broker.add_middleware(CloseHttpClientMiddleware(http_client))
+
 
 def _truncate_text(value: str, *, max_chars: int = 30) -> str:
     if len(value) <= max_chars:
@@ -61,11 +76,9 @@ def _extract_douyin_download_url(payload: dict[str, Any]) -> Optional[str]:
 def _request_douyin_download_url(settings: Any, source_url: str) -> str:
     headers = {"Content-Type": "application/json"}
     body = {"url": source_url, "token": settings.api_token}
-    timeout = httpx.Timeout(settings.request_timeout_s)
-    with httpx.Client(timeout=timeout) as client:
-        response = client.post(settings.api_url, headers=headers, json=body)
-        response.raise_for_status()
-        payload = response.json()
+    response = http_client.post(settings.api_url, headers=headers, json=body, follow_redirects=False)
+    response.raise_for_status()
+    payload = response.json()
 
     if settings.debug_log_payload:
         logger.info(
@@ -82,15 +95,36 @@ def _request_douyin_download_url(settings: Any, source_url: str) -> str:
     return douyin_download_url
 
 
-def _download_mp4(douyin_download_url: str, output_dir: str, record_id: int) -> str:
-    Path(output_dir).mkdir(parents=True, exist_ok=True)
-    filename = f"record_{record_id}_{uuid4().hex}.mp4"
-    target_path = Path(output_dir) / filename
-    timeout = httpx.Timeout(120.0)
-    with httpx.Client(timeout=timeout, follow_redirects=True) as client:
-        with client.stream("GET", douyin_download_url) as response:
-            response.raise_for_status()
-            with target_path.open("wb") as file_handle:
+def _download_mp4(
+    douyin_download_url: str,
+    output_dir: str,
+    record_id: int,
+    table_id: str,
+    *,
+    durability: Durability,
+    timeout_s: float,
+) -> str:
+    with http_client.stream("GET", douyin_download_url, timeout=timeout_s) as response:
+        response.raise_for_status()
+        if artifact_store is not None:
+            # Hashed while streaming; a source already downloaded for another record is linked, not stored twice.
+            with artifact_store.writer(
+                table_id=table_id,
+                record_id=record_id,
+                name="s2-source",
+                suffix=".mp4",
+            ) as artifact:
+                for chunk in response.iter_bytes():
+                    if chunk:
+                        artifact.write(chunk)
+            # The ref is what s3 reads; flush it before the message that names it is published.
+            make_durable(artifact.path, level=durability)
+            return str(artifact.path)
+
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        target_path = Path(output_dir) / f"record_{record_id}_{uuid4().hex}.mp4"
+        with atomic_output(target_path, fsync=durability) as tmp_path:
+            with tmp_path.open("wb") as file_handle:
                 for chunk in response.iter_bytes():
                     if chunk:
                         file_handle.write(chunk)
@@ -165,6 +199,9 @@ def process(
             douyin_download_url,
             settings.output_dir,
             record_id,
+            table_id,
+            durability=settings.durability,
+            timeout_s=settings.download_timeout_s,
         )
 
         _enqueue_downstream(
@@ -200,9 +237,6 @@ def process(
             url=url,
         ).exception("Failed job")
         raise
-    finally:
-        # Ensure all filesystem buffers are flushed to disk (Linux/Unix only; no-op on Windows)
-        os.sync() if hasattr(os, "sync") else None
 
 
 # Log registered actors for verification
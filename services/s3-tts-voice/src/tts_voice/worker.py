@@ -1,15 +1,16 @@
 from __future__ import annotations
 
 import json
-import os
 from pathlib import Path
 from typing import Any
 from uuid import uuid4
 
 import dramatiq
-import httpx
 from dramatiq.brokers.rabbitmq import RabbitmqBroker
+from core.durability import Durability, atomic_output, make_durable
+from core.http import CloseHttpClientMiddleware, build_http_client
 from core.logging import configure_service_logger, get_logger
+from storage import ArtifactStore
 
 from tts_voice.settings import get_settings
 
@@ -34,6 +35,20 @@ broker = RabbitmqBroker(url=settings.rabbitmq_url)
 dramatiq.set_broker(broker)
 broker.declare_queue(settings.current_queue, ensure=True)
 
+artifact_store = ArtifactStore(settings.artifact_store_dir) if settings.artifact_store_enabled else None
+
+# One pooled client per worker process, shared by all jobs and worker threads,
+# so the TTS API and audio host connections stay open between jobs.
+http_client = build_http_client(
+    timeout_s=settings.request_timeout_s,
+    max_connections=settings.http_max_connections,
+    max_keepalive_connections=settings.http_max_keepalive_connections,
+    keepalive_expiry_s=settings.http_keepalive_expiry_s,
+    http2=settings.http2_enabled,
+)
+
+broker.add_middleware(CloseHttpClientMiddleware(http_client))
+
 
 def _truncate_text(value: str, *, max_chars: int = 30) -> str:
     if len(value) <= max_chars:
@@ -51,12 +66,9 @@ def _request_tts_url(settings: Any, text: str) -> str:
         "sex": "2",  # Defaulting to 2 as per user example
         "token": settings.api_token,
     }
-    timeout = httpx.Timeout(settings.request_timeout_s)
-    
-    with httpx.Client(timeout=timeout) as client:
-        response = client.get(settings.api_url, params=params)
-        response.raise_for_status()
-        payload = response.json()
+    response = http_client.get(settings.api_url, params=params, follow_redirects=False)
+    response.raise_for_status()
+    payload = response.json()
 
     if settings.debug_log_payload:
         logger.info(
@@ -80,19 +92,37 @@ def _request_tts_url(settings: Any, text: str) -> str:
     return voice_url
 
 
-def _download_audio(audio_url: str, output_dir: str, record_id: int) -> str:
+def _download_audio(
+    audio_url: str,
+    output_dir: str,
+    record_id: int,
+    table_id: str,
+    *,
+    durability: Durability,
+    timeout_s: float,
+) -> str:
     """
-    Download the generated audio file.
+    Download the generated audio file, into the artifact store when it is enabled.
     """
-    Path(output_dir).mkdir(parents=True, exist_ok=True)
-    filename = f"record_{record_id}_{uuid4().hex}.mp3"
-    target_path = Path(output_dir) / filename
-    
-    timeout = httpx.Timeout(120.0)
-    with httpx.Client(timeout=timeout, follow_redirects=True) as client:
-        with client.stream("GET", audio_url) as response:
-            response.raise_for_status()
-            with target_path.open("wb") as file_handle:
+    with http_client.stream("GET", audio_url, timeout=timeout_s) as response:
+        response.raise_for_status()
+        if artifact_store is not None:
+            with artifact_store.writer(
+                table_id=table_id,
+                record_id=record_id,
+                name="s3-tts",
+                suffix=".mp3",
+            ) as artifact:
+                for chunk in response.iter_bytes():
+                    if chunk:
+                        artifact.write(chunk)
+            make_durable(artifact.path, level=durability)
+            return str(artifact.path)
+
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        target_path = Path(output_dir) / f"record_{record_id}_{uuid4().hex}.mp3"
+        with atomic_output(target_path, fsync=durability) as tmp_path:
+            with tmp_path.open("wb") as file_handle:
                 for chunk in response.iter_bytes():
                     if chunk:
                         file_handle.write(chunk)
@@ -176,6 +206,9 @@ def process(
             voice_url,
             settings.output_dir,
             record_id,
+            table_id,
+            durability=settings.durability,
+            timeout_s=settings.download_timeout_s,
         )
 
         # Step 3: Enqueue for downstream (s4-inference-engine)
@@ -203,8 +236,6 @@ def process(
             content=_truncate_text(content),
         ).exception("Failed TTS job")
         raise
-    finally:
-        os.sync() if hasattr(os, "sync") else None
 
 
 # Log registered actors for verification
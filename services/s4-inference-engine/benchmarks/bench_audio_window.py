@@ -0,0 +1,75 @@
+"""Compare the deque-based stream-mode audio window with AudioWindow.
+
+Replays a synthetic 2-minute waveform through both implementations using the
+same per-chunk slice length as `SoulXRuntime._run_inference` and reports the
+time spent building windows.
+
+Usage:
+    uv run python benchmarks/bench_audio_window.py [--sample-rate 16000] [--tgt-fps 25]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from collections import deque
+
+import numpy as np
+
+from inference_engine.audio_window import AudioWindow
+
+
+def _deque_windows(slices: np.ndarray, window_len: int) -> float:
+    audio_dq = deque([0.0] * window_len, maxlen=window_len)
+    checksum = 0.0
+    for speech_slice in slices:
+        audio_dq.extend(speech_slice.tolist())
+        checksum += float(np.array(audio_dq)[-1])
+    return checksum
+
+
+def _ring_windows(slices: np.ndarray, window_len: int) -> float:
+    audio_window = AudioWindow(window_len)
+    checksum = 0.0
+    for speech_slice in slices:
+        audio_window.push(speech_slice)
+        checksum += float(audio_window.view()[-1])
+    return checksum
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration-sec", type=int, default=120)
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    parser.add_argument("--tgt-fps", type=int, default=25)
+    parser.add_argument("--cached-audio-duration", type=int, default=8)
+    parser.add_argument("--frame-num", type=int, default=33)
+    parser.add_argument("--motion-frames-num", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    slice_len = args.frame_num - args.motion_frames_num
+    samples_per_slice = max(1, slice_len * args.sample_rate // args.tgt_fps)
+    window_len = args.sample_rate * args.cached_audio_duration
+
+    rng = np.random.default_rng(0)
+    waveform = rng.standard_normal(args.sample_rate * args.duration_sec).astype(np.float32)
+    usable = (waveform.size // samples_per_slice) * samples_per_slice
+    slices = waveform[:usable].reshape(-1, samples_per_slice)
+
+    results: dict[str, float] = {}
+    for name, fn in (("deque", _deque_windows), ("ring", _ring_windows)):
+        best = float("inf")
+        checksum = 0.0
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            checksum = fn(slices, window_len)
+            best = min(best, time.perf_counter() - start)
+        results[name] = best
+        print(f"{name:>6}: {best * 1000:9.2f} ms for {len(slices)} windows (checksum={checksum:.6f})")
+
+    print(f"speedup: {results['deque'] / results['ring']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Chunks/sec of the multi-job batch scheduler against the serial path.
+
+Runs N concurrent jobs through `SoulXRuntime` on the GPU-free synthetic backend,
+once with `batch_max_jobs=1` (jobs queue behind each other, one `run_pipeline`
+per chunk) and once per batch size (the scheduler stacks one chunk per job into
+a single `run_pipeline_batch` call). Chunk outputs are discarded, so encoding is
+left out and only the render loop is measured. Set `--chunk-latency-ms` to the
+batched forward-pass time measured on the target GPU to see what batching buys.
+
+Usage:
+    uv run python benchmarks/bench_batch_scheduler.py [--jobs 4] [--duration-sec 10] [--chunk-latency-ms 250]
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from inference_engine.backends import SyntheticBackend
+from inference_engine.profiling import ChunkProfiler
+from inference_engine.soulx_runtime import SoulXRuntime
+
+
+def _run(runtime: SoulXRuntime, jobs: list[tuple[Path, Path]]) -> tuple[float, int]:
+    chunk_counts = [0] * len(jobs)
+
+    def _job(job_id: int) -> None:
+        cond_image, audio_path = jobs[job_id]
+        chunk_counts[job_id] = runtime._render_chunks(
+            cond_image=cond_image,
+            base_seed=42,
+            use_face_crop=False,
+            audio_path=audio_path,
+            audio_encode_mode="stream",
+            on_chunk=lambda chunk: None,
+            profiler=ChunkProfiler(enabled=False),
+        )
+
+    start = time.perf_counter()
+    if runtime.scheduler is None:
+        # The serial path owns the pipeline for a whole job, so jobs run back to back.
+        for job_id in range(len(jobs)):
+            _job(job_id)
+        return time.perf_counter() - start, sum(chunk_counts)
+    threads = [threading.Thread(target=_job, args=(job_id,)) for job_id in range(len(jobs))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, sum(chunk_counts)
+
+
+def main() -> None:
+    logger.disable("inference_engine")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=4)
+    parser.add_argument("--duration-sec", type=int, default=10)
+    parser.add_argument("--chunk-latency-ms", type=float, default=250.0)
+    parser.add_argument("--size", type=int, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        jobs = []
+        for job_id in range(args.jobs):
+            audio_path = root / f"tts_{job_id}.wav"
+            subprocess.run(
+                ["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i", f"sine=f={220 + job_id}:d={args.duration_sec}", str(audio_path)],
+                check=True,
+            )
+            cond_image = root / f"avatar_{job_id}.png"
+            cond_image.write_bytes(f"synthetic-avatar-{job_id}".encode())
+            jobs.append((cond_image, audio_path))
+
+        # Warm up librosa and torch so the first configuration does not pay for it.
+        _run(SoulXRuntime(backend=SyntheticBackend(chunk_latency_sec=0, embedding_latency_sec=0, frame_size=args.size)), jobs[:1])
+        baseline = None
+        for batch_max_jobs in sorted({1, 2, args.jobs}):
+            backend = SyntheticBackend(
+                chunk_latency_sec=args.chunk_latency_ms / 1000,
+                embedding_latency_sec=0,
+                frame_size=args.size,
+            )
+            runtime = SoulXRuntime(backend=backend, batch_max_jobs=batch_max_jobs)
+            elapsed, chunks = _run(runtime, jobs)
+            batches = ""
+            if runtime.scheduler is not None:
+                runtime.scheduler.close()
+                batches = ", batch sizes " + ", ".join(
+                    f"{size}x{count}" for size, count in sorted(runtime.scheduler.batch_size_counts.items())
+                )
+            name = "serial" if batch_max_jobs == 1 else f"batch_max_jobs={batch_max_jobs}"
+            baseline = baseline or chunks / elapsed
+            print(
+                f"{name:>18}: {elapsed:7.2f} s, {chunks / elapsed:6.2f} chunks/sec "
+                f"(x{chunks / elapsed / baseline:4.2f} vs serial, {chunks} chunks{batches})"
+            )
+
+
+if __name__ == "__main__":
+    main()
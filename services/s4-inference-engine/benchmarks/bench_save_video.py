@@ -0,0 +1,110 @@
+"""Compare the legacy two-pass SoulX save path with the single-pass writer.
+
+Legacy: imageio h264 writer to `_tmp.mp4`, then a second ffmpeg run copying
+the video and encoding the audio to AAC. Single-pass: `StreamingVideoWriter`
+piping raw frames to one ffmpeg process that muxes the audio directly.
+
+Frames are synthetic float tensors shaped like SoulX chunks; the audio is a
+generated sine tone. Reports wall-clock time and bytes written to disk per job.
+
+Usage:
+    uv run python benchmarks/bench_save_video.py [--duration-sec 60] [--size 512]
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import imageio
+import numpy as np
+import torch
+from loguru import logger
+
+from inference_engine.video_writer import StreamingVideoWriter
+
+
+def _make_chunks(duration_sec: int, fps: int, chunk_frames: int, size: int) -> list[torch.Tensor]:
+    generator = torch.Generator().manual_seed(0)
+    total = duration_sec * fps
+    chunks = []
+    for start in range(0, total, chunk_frames):
+        count = min(chunk_frames, total - start)
+        base = torch.rand(1, size, size, 3, generator=generator) * 255
+        drift = torch.linspace(0, 8, count).view(count, 1, 1, 1)
+        chunks.append((base + drift).clamp(0, 255))
+    return chunks
+
+
+def _legacy_save(chunks: list[torch.Tensor], video_path: Path, audio_path: Path, fps: int) -> int:
+    temp_video_path = video_path.with_name(video_path.stem + "_tmp.mp4")
+    with imageio.get_writer(
+        str(temp_video_path),
+        format="mp4",
+        mode="I",
+        fps=fps,
+        codec="h264",
+        ffmpeg_params=["-bf", "0"],
+    ) as writer:
+        for frames in chunks:
+            np_frames = frames.numpy().astype(np.uint8)
+            for idx in range(np_frames.shape[0]):
+                writer.append_data(np_frames[idx])
+    temp_bytes = temp_video_path.stat().st_size
+
+    cmd = [
+        "ffmpeg",
+        "-i",
+        str(temp_video_path),
+        "-i",
+        str(audio_path),
+        "-c:v",
+        "copy",
+        "-c:a",
+        "aac",
+        "-shortest",
+        str(video_path),
+        "-y",
+    ]
+    subprocess.run(cmd, capture_output=True, text=True, check=True)
+    temp_video_path.unlink()
+    return temp_bytes + video_path.stat().st_size
+
+
+def _single_pass_save(chunks: list[torch.Tensor], video_path: Path, audio_path: Path, fps: int) -> int:
+    with StreamingVideoWriter(video_path=video_path, audio_path=audio_path, fps=fps) as writer:
+        for frames in chunks:
+            writer.write(frames)
+    return writer.bytes_written
+
+
+def main() -> None:
+    logger.disable("inference_engine")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration-sec", type=int, default=60)
+    parser.add_argument("--fps", type=int, default=25)
+    parser.add_argument("--chunk-frames", type=int, default=28)
+    parser.add_argument("--size", type=int, default=512)
+    args = parser.parse_args()
+
+    chunks = _make_chunks(args.duration_sec, args.fps, args.chunk_frames, args.size)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        audio_path = root / "tts.wav"
+        subprocess.run(
+            ["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i", f"sine=f=220:d={args.duration_sec}", str(audio_path)],
+            check=True,
+        )
+
+        for name, fn in (("legacy two-pass", _legacy_save), ("single-pass", _single_pass_save)):
+            start = time.perf_counter()
+            disk_bytes = fn(chunks, root / f"{name.replace(' ', '_')}.mp4", audio_path, args.fps)
+            elapsed = time.perf_counter() - start
+            print(f"{name:>16}: {elapsed:7.2f} s, {disk_bytes / (1024 * 1024):8.2f} MiB written")
+
+
+if __name__ == "__main__":
+    main()
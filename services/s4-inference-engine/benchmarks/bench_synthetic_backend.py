@@ -0,0 +1,82 @@
+"""End-to-end s4 throughput on the GPU-free synthetic backend.
+
+Runs `SoulXRuntime.generate` (embedding, chunking, prefetch, streaming encode)
+against `SyntheticBackend`, so everything except the model itself is exercised
+on a CPU box. Set the simulated latencies to the per-chunk numbers measured on
+the target GPU to see whether encoding or buffering becomes the bottleneck.
+Reports wall-clock time, realtime factor and chunks/sec per configuration.
+
+Usage:
+    uv run python benchmarks/bench_synthetic_backend.py [--duration-sec 30] [--chunk-latency-ms 250] [--size 512]
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from inference_engine.backends import SyntheticBackend
+from inference_engine.soulx_runtime import SoulXRuntime
+
+
+def _run(runtime: SoulXRuntime, root: Path, audio_path: Path, cond_image: Path, stream_encode: bool) -> float:
+    start = time.perf_counter()
+    runtime.generate(
+        record_id=1,
+        cond_image_path=str(cond_image),
+        audio_path=str(audio_path),
+        output_dir=str(root / "out"),
+        base_seed=42,
+        use_face_crop=False,
+        audio_encode_mode="stream",
+        stream_encode=stream_encode,
+    )
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    logger.disable("inference_engine")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration-sec", type=int, default=30)
+    parser.add_argument("--chunk-latency-ms", type=float, default=250.0)
+    parser.add_argument("--embedding-latency-ms", type=float, default=10.0)
+    parser.add_argument("--size", type=int, default=512)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        audio_path = root / "tts.wav"
+        subprocess.run(
+            ["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i", f"sine=f=220:d={args.duration_sec}", str(audio_path)],
+            check=True,
+        )
+        cond_image = root / "avatar.png"
+        cond_image.write_bytes(b"synthetic-avatar")
+
+        for name, lookahead, stream_encode in (
+            ("buffered, inline embedding", 0, False),
+            ("streaming, inline embedding", 0, True),
+            ("streaming, lookahead=1", 1, True),
+        ):
+            backend = SyntheticBackend(
+                chunk_latency_sec=args.chunk_latency_ms / 1000,
+                embedding_latency_sec=args.embedding_latency_ms / 1000,
+                frame_size=args.size,
+            )
+            runtime = SoulXRuntime(backend=backend, embedding_lookahead=lookahead)
+            elapsed = _run(runtime, root, audio_path, cond_image, stream_encode)
+            slice_frames = int(backend.infer_params["frame_num"]) - int(backend.infer_params["motion_frames_num"])
+            chunks = int(backend.pipeline.motion_frames[0])
+            print(
+                f"{name:>28}: {elapsed:7.2f} s, realtime x{args.duration_sec / elapsed:5.2f}, "
+                f"{chunks / elapsed:6.2f} chunks/sec ({chunks} chunks of {slice_frames} frames)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+class AudioWindow:
+	"""Fixed-length float32 sliding window over the most recent audio samples.
+
+	Samples are mirrored into a preallocated buffer of twice the window length,
+	so the current window is always one contiguous slice of it. Pushing N
+	samples costs two array copies of N samples; no per-sample Python objects
+	are created and nothing is shifted.
+	"""
+
+	def __init__(self, length: int) -> None:
+		if length <= 0:
+			raise ValueError(f"Audio window length must be positive, got {length}")
+		self.length = length
+		self._buffer = np.zeros(2 * length, dtype=np.float32)
+		# Index of the oldest sample; the window is buffer[start : start + length].
+		self._start = 0
+
+	def push(self, samples: np.ndarray) -> None:
+		samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+		count = samples.size
+		if count == 0:
+			return
+		if count >= self.length:
+			tail = samples[-self.length :]
+			self._buffer[: self.length] = tail
+			self._buffer[self.length :] = tail
+			self._start = 0
+			return
+
+		# The oldest `count` samples are overwritten in both mirrored halves.
+		start = self._start
+		head = min(count, self.length - start)
+		self._buffer[start : start + head] = samples[:head]
+		self._buffer[start + self.length : start + self.length + head] = samples[:head]
+		if head < count:
+			rest = count - head
+			self._buffer[:rest] = samples[head:]
+			self._buffer[self.length : self.length + rest] = samples[head:]
+		self._start = (start + count) % self.length
+
+	def view(self) -> np.ndarray:
+		"""Return the current window as a read-only contiguous view (valid until the next push)."""
+		window = self._buffer[self._start : self._start + self.length]
+		window.flags.writeable = False
+		return window
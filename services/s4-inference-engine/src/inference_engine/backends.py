@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sys
+import time
+from collections.abc import Sequence
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Protocol
+
+import numpy as np
+import torch
+from loguru import logger
+
+BACKENDS = ("soulx", "synthetic")
+
+
+@contextmanager
+def _pushd(path: Path):
+	old_cwd = Path.cwd()
+	os.chdir(path)
+	try:
+		yield
+	finally:
+		os.chdir(old_cwd)
+
+
+class InferenceBackend(Protocol):
+	"""What `SoulXRuntime` needs from a talking-head model.
+
+	`pipeline` is the object holding per-avatar and per-chunk state as plain
+	attributes; the runtime snapshots and restores those attributes for the base
+	data cache, the batch scheduler and chunk checkpoints.
+
+	Backends with `supports_batching` also implement `run_pipeline_batch`, which
+	renders the next chunk of several jobs in one forward pass. Only those get
+	the multi-job scheduler (`S4_BATCH_MAX_JOBS`).
+	"""
+
+	name: str
+	pipeline: Any
+	infer_params: dict[str, Any]
+	# Pipeline attributes `get_base_data` sets and `run_pipeline` carries from chunk
+	# to chunk; None (a backend that cannot list them) lets the runtime discover them
+	# on the first avatar.
+	base_data_attrs: tuple[str, ...] | None
+	supports_batching: bool
+
+	def identity(self) -> dict[str, Any]:
+		"""Settings that change the generated frames (part of the checkpoint key)."""
+		...
+
+	def get_base_data(self, cond_image: Path, *, base_seed: int, use_face_crop: bool) -> None: ...
+
+	def get_audio_embedding(
+		self,
+		audio: np.ndarray,
+		start_idx: int | None = None,
+		end_idx: int | None = None,
+	) -> torch.Tensor: ...
+
+	def run_pipeline(self, audio_embedding: torch.Tensor) -> torch.Tensor: ...
+
+	def run_pipeline_batch(
+		self,
+		audio_embeddings: torch.Tensor,
+		states: Sequence[dict[str, Any]],
+	) -> tuple[torch.Tensor, list[dict[str, Any]]]:
+		"""Render one chunk for each of several jobs in a single call.
+
+		`audio_embeddings` stacks one embedding per job on dim 0 and `states[i]`
+		holds job i's `base_data_attrs`. Returns the chunks stacked the same way
+		and each job's state after its chunk; `pipeline` is not touched.
+		"""
+		...
+
+
+class SoulXBackend:
+	"""The vendored SoulX-FlashHead pipeline, loaded once at construction."""
+
+	name = "soulx"
+	# Attributes `get_base_data` (the pipeline's `prepare_params`) sets for one avatar
+	# and `run_pipeline` carries between chunks. Declared rather than discovered because
+	# some are reset to a value they may already hold; S4_BASE_DATA_ATTRS overrides it.
+	base_data_attrs: tuple[str, ...] = ("ref_img_latent", "latent_motion_frames", "original_color_reference")
+	# The vendored run_pipeline reads one avatar's state from the pipeline object.
+	supports_batching = False
+
+	def __init__(
+		self,
+		*,
+		flashhead_ckpt_dir: str,
+		wav2vec_dir: str,
+		model_type: str,
+		base_data_attrs: tuple[str, ...] | None = None,
+	) -> None:
+		if base_data_attrs is not None:
+			self.base_data_attrs = base_data_attrs
+		self.vendor_root = Path(__file__).resolve().parents[2] / "vendor" / "SoulX-FlashHead"
+		self.flashhead_ckpt_dir = str(Path(flashhead_ckpt_dir).resolve())
+		self.wav2vec_dir = str(Path(wav2vec_dir).resolve())
+		self.model_type = model_type
+
+		if self.model_type not in {"pro", "lite"}:
+			raise ValueError(f"Invalid S4_MODEL_TYPE={self.model_type!r}; expected 'pro' or 'lite'")
+
+		if not self.vendor_root.exists():
+			raise FileNotFoundError(f"SoulX vendor repo not found at: {self.vendor_root}")
+		if not Path(self.flashhead_ckpt_dir).exists():
+			raise FileNotFoundError(f"FlashHead checkpoint dir not found: {self.flashhead_ckpt_dir}")
+		if not Path(self.wav2vec_dir).exists():
+			raise FileNotFoundError(f"wav2vec checkpoint dir not found: {self.wav2vec_dir}")
+
+		if str(self.vendor_root) not in sys.path:
+			sys.path.insert(0, str(self.vendor_root))
+
+		with _pushd(self.vendor_root):
+			import flash_head.inference as flash_inference
+
+		self.flash_inference = flash_inference
+		logger.info(
+			"Loading SoulX pipeline at startup (model_type={}, ckpt_dir={}, wav2vec_dir={})",
+			self.model_type,
+			self.flashhead_ckpt_dir,
+			self.wav2vec_dir,
+		)
+		self.pipeline = self.flash_inference.get_pipeline(
+			world_size=1,
+			ckpt_dir=self.flashhead_ckpt_dir,
+			wav2vec_dir=self.wav2vec_dir,
+			model_type=self.model_type,
+		)
+		self.infer_params = self.flash_inference.get_infer_params()
+
+	def identity(self) -> dict[str, Any]:
+		return {
+			"backend": self.name,
+			"model_type": self.model_type,
+			"flashhead_ckpt_dir": self.flashhead_ckpt_dir,
+		}
+
+	def get_base_data(self, cond_image: Path, *, base_seed: int, use_face_crop: bool) -> None:
+		with _pushd(self.vendor_root):
+			self.flash_inference.get_base_data(
+				self.pipeline,
+				cond_image_path_or_dir=str(cond_image),
+				base_seed=base_seed,
+				use_face_crop=use_face_crop,
+			)
+
+	def get_audio_embedding(
+		self,
+		audio: np.ndarray,
+		start_idx: int | None = None,
+		end_idx: int | None = None,
+	) -> torch.Tensor:
+		if start_idx is None or end_idx is None:
+			return self.flash_inference.get_audio_embedding(self.pipeline, audio)
+		return self.flash_inference.get_audio_embedding(self.pipeline, audio, start_idx, end_idx)
+
+	def run_pipeline(self, audio_embedding: torch.Tensor) -> torch.Tensor:
+		return self.flash_inference.run_pipeline(self.pipeline, audio_embedding)
+
+	def run_pipeline_batch(
+		self,
+		audio_embeddings: torch.Tensor,
+		states: Sequence[dict[str, Any]],
+	) -> tuple[torch.Tensor, list[dict[str, Any]]]:
+		raise NotImplementedError("The vendored SoulX run_pipeline is not batch-aware")
+
+
+class SyntheticBackend:
+	"""GPU-free stand-in that returns SoulX-shaped tensors after a simulated latency.
+
+	Embeddings are `(1, frames, embedding_dim)` and each chunk is
+	`(frame_num - motion_frames_num, frame_size, frame_size, 3)` uint8 frames, so
+	chunking, buffering, encoding and queue behaviour of s4 can be exercised on a
+	CPU box. Like SoulX it keeps avatar and motion state on `pipeline`, and each
+	chunk's pixels depend on that state, so state swapping and resume produce the
+	same frames as an uninterrupted run.
+
+	`run_pipeline_batch` renders several jobs' chunks with one simulated latency,
+	i.e. it models a GPU that one avatar's chunk leaves underused.
+	"""
+
+	name = "synthetic"
+	base_data_attrs = ("ref_color", "motion_frames")
+	supports_batching = True
+
+	def __init__(
+		self,
+		*,
+		chunk_latency_sec: float = 0.25,
+		embedding_latency_sec: float = 0.01,
+		frame_size: int = 512,
+		embedding_dim: int = 768,
+		sample_rate: int = 16000,
+		tgt_fps: int = 25,
+		cached_audio_duration: int = 8,
+		frame_num: int = 33,
+		motion_frames_num: int = 5,
+	) -> None:
+		if frame_num <= motion_frames_num:
+			raise ValueError("frame_num must be larger than motion_frames_num")
+		self.chunk_latency_sec = max(0.0, chunk_latency_sec)
+		self.embedding_latency_sec = max(0.0, embedding_latency_sec)
+		self.frame_size = frame_size
+		self.embedding_dim = embedding_dim
+		self.infer_params: dict[str, Any] = {
+			"sample_rate": sample_rate,
+			"tgt_fps": tgt_fps,
+			"cached_audio_duration": cached_audio_duration,
+			"frame_num": frame_num,
+			"motion_frames_num": motion_frames_num,
+		}
+		self.pipeline = SimpleNamespace(ref_color=None, motion_frames=None)
+		logger.info(
+			"Using synthetic s4 backend (chunk_latency={:.0f}ms, embedding_latency={:.0f}ms, frame_size={})",
+			self.chunk_latency_sec * 1000,
+			self.embedding_latency_sec * 1000,
+			self.frame_size,
+		)
+
+	def identity(self) -> dict[str, Any]:
+		return {"backend": self.name, "frame_size": self.frame_size}
+
+	def get_base_data(self, cond_image: Path, *, base_seed: int, use_face_crop: bool) -> None:
+		digest = hashlib.sha256(cond_image.read_bytes()).digest()
+		# Like SoulX, seed the global RNG and draw from it, so a cache hit has to
+		# reproduce that side effect as well as the attributes.
+		torch.manual_seed(base_seed)
+		jitter = torch.randint(0, 32, (3,), dtype=torch.int64)
+		self.pipeline.ref_color = ((torch.tensor(list(digest[:3])) + jitter) % 256).to(torch.uint8)
+		# Chunk counter standing in for SoulX's motion frames.
+		self.pipeline.motion_frames = torch.zeros(1, dtype=torch.int64)
+
+	def get_audio_embedding(
+		self,
+		audio: np.ndarray,
+		start_idx: int | None = None,
+		end_idx: int | None = None,
+	) -> torch.Tensor:
+		if self.embedding_latency_sec:
+			time.sleep(self.embedding_latency_sec)
+		if start_idx is None or end_idx is None:
+			frames = int(len(audio) * self.infer_params["tgt_fps"] // self.infer_params["sample_rate"])
+		else:
+			frames = end_idx - start_idx
+		level = float(np.abs(audio).mean()) if len(audio) else 0.0
+		return torch.full((1, frames, self.embedding_dim), level, dtype=torch.float32)
+
+	def run_pipeline(self, audio_embedding: torch.Tensor) -> torch.Tensor:
+		if self.pipeline.ref_color is None:
+			raise RuntimeError("Synthetic backend has no base data; call get_base_data first")
+		if self.chunk_latency_sec:
+			time.sleep(self.chunk_latency_sec)
+		frames = self._render(self.pipeline.ref_color, int(self.pipeline.motion_frames[0]))
+		self.pipeline.motion_frames = self.pipeline.motion_frames + 1
+		return frames
+
+	def run_pipeline_batch(
+		self,
+		audio_embeddings: torch.Tensor,
+		states: Sequence[dict[str, Any]],
+	) -> tuple[torch.Tensor, list[dict[str, Any]]]:
+		if audio_embeddings.shape[0] != len(states):
+			raise ValueError(f"Batch of {audio_embeddings.shape[0]} embeddings for {len(states)} job states")
+		if any(state.get("ref_color") is None for state in states):
+			raise RuntimeError("Synthetic backend has no base data; call get_base_data first")
+		if self.chunk_latency_sec:
+			time.sleep(self.chunk_latency_sec)
+		frames = torch.stack([self._render(state["ref_color"], int(state["motion_frames"][0])) for state in states])
+		next_states = [{**state, "motion_frames": state["motion_frames"] + 1} for state in states]
+		return frames, next_states
+
+	def _render(self, ref_color: torch.Tensor, chunk_idx: int) -> torch.Tensor:
+		slice_len = int(self.infer_params["frame_num"]) - int(self.infer_params["motion_frames_num"])
+		frames = ref_color.expand(slice_len, self.frame_size, self.frame_size, 3).clone()
+		# A bright bar that advances one row per frame makes chunk order visible in the output.
+		for frame_idx in range(slice_len):
+			row = (chunk_idx * slice_len + frame_idx) % self.frame_size
+			frames[frame_idx, row : row + 8] = 255
+		return frames
+
+
+def build_backend(
+	name: str,
+	*,
+	flashhead_ckpt_dir: str,
+	wav2vec_dir: str,
+	model_type: str,
+	base_data_attrs: tuple[str, ...] | None = None,
+	synthetic_chunk_latency_ms: float = 250.0,
+	synthetic_embedding_latency_ms: float = 10.0,
+	synthetic_frame_size: int = 512,
+) -> InferenceBackend:
+	if name == "soulx":
+		return SoulXBackend(
+			flashhead_ckpt_dir=flashhead_ckpt_dir,
+			wav2vec_dir=wav2vec_dir,
+			model_type=model_type,
+			base_data_attrs=base_data_attrs,
+		)
+	if name == "synthetic":
+		return SyntheticBackend(
+			chunk_latency_sec=synthetic_chunk_latency_ms / 1000,
+			embedding_latency_sec=synthetic_embedding_latency_ms / 1000,
+			frame_size=synthetic_frame_size,
+		)
+	raise ValueError(f"Invalid S4_BACKEND={name!r}; expected one of {', '.join(BACKENDS)}")
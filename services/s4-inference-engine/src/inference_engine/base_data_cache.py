@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import copy
+import hashlib
+import random
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import torch
+from loguru import logger
+
+
+@dataclass(frozen=True)
+class BaseDataKey:
+	image_sha256: str
+	base_seed: int
+	use_face_crop: bool
+
+	@classmethod
+	def for_image(cls, cond_image: Path, *, base_seed: int, use_face_crop: bool) -> BaseDataKey:
+		digest = hashlib.sha256(cond_image.read_bytes()).hexdigest()
+		return cls(image_sha256=digest, base_seed=base_seed, use_face_crop=use_face_crop)
+
+
+def _copy_value(value: Any) -> Any:
+	return value.clone() if isinstance(value, torch.Tensor) else copy.deepcopy(value)
+
+
+def _change_marker(value: Any) -> tuple[int, int | None]:
+	# A tensor's `_version` counter moves on every in-place write, so a reused
+	# buffer that `mutate` filled in is caught as well as a reassigned attribute.
+	return id(value), value._version if isinstance(value, torch.Tensor) else None
+
+
+def discover_state_names(target: Any, mutate: Callable[[], None]) -> tuple[str, ...]:
+	"""Run `mutate` and return the attributes of `target` it assigned or wrote in place.
+
+	Modules (model weights) are skipped. An attribute reset to the value it
+	already held (e.g. `None` again) and in-place edits of non-tensor containers
+	cannot be seen here, which is why backends declare the list explicitly and
+	this is only a fallback and a cross-check.
+	"""
+	before = {name: _change_marker(value) for name, value in vars(target).items()}
+	mutate()
+	return tuple(
+		name
+		for name, value in vars(target).items()
+		if not isinstance(value, torch.nn.Module) and before.get(name) != _change_marker(value)
+	)
+
+
+def snapshot_state(target: Any, names: Sequence[str]) -> dict[str, Any]:
+	"""Copy the named attributes of `target`: tensors are cloned, everything else deep-copied."""
+	return {name: _copy_value(getattr(target, name)) for name in names}
+
+
+def restore_state(target: Any, state: dict[str, Any], *, clone: bool = True) -> None:
+	for name, value in state.items():
+		setattr(target, name, _copy_value(value) if clone else value)
+
+
+def capture_rng_state() -> dict[str, Any]:
+	"""Global RNG state of Python, NumPy and torch (plus CUDA once it is initialised)."""
+	state: dict[str, Any] = {
+		"python": random.getstate(),
+		"numpy": np.random.get_state(),
+		"torch": torch.get_rng_state(),
+	}
+	if torch.cuda.is_available() and torch.cuda.is_initialized():
+		state["cuda"] = torch.cuda.get_rng_state_all()
+	return state
+
+
+def restore_rng_state(state: dict[str, Any]) -> None:
+	random.setstate(state["python"])
+	np.random.set_state(state["numpy"])
+	torch.set_rng_state(state["torch"])
+	if "cuda" in state:
+		torch.cuda.set_rng_state_all(state["cuda"])
+
+
+@dataclass
+class _CachedBaseData:
+	state: dict[str, Any]
+	rng_state: dict[str, Any]
+
+
+class BaseDataCache:
+	"""Bounded LRU of the pipeline state `get_base_data` produces for each avatar.
+
+	`get_base_data` preprocesses the condition image and computes its reference
+	latents, then stores the results on the pipeline object. On a miss the cache
+	runs it and snapshots `state_names` together with the global RNG state it left
+	behind (it seeds with `base_seed`); on a hit it restores both, so the following
+	chunks see exactly what a fresh `get_base_data` call would have produced.
+
+	`state_names` is the backend's explicit attribute list. Without one, the names
+	are discovered on the first miss and then kept for the process lifetime. With
+	one, the first miss still runs discovery as a cross-check. Attributes assigned
+	outside the list are only logged. If a declared name is missing from the
+	pipeline, the list is stale and the discovered names are used instead.
+	"""
+
+	def __init__(self, capacity: int, *, state_names: Sequence[str] | None = None) -> None:
+		self.capacity = max(0, capacity)
+		self.hits = 0
+		self.misses = 0
+		# Names of the pipeline attributes that make up one avatar's base data.
+		self.state_names: tuple[str, ...] = tuple(state_names or ())
+		self._discover = state_names is None
+		self._checked = False
+		self._entries: OrderedDict[BaseDataKey, _CachedBaseData] = OrderedDict()
+
+	def __len__(self) -> int:
+		return len(self._entries)
+
+	def load(self, pipeline: Any, key: BaseDataKey, compute: Callable[[], None]) -> bool:
+		"""Make `key`'s base data active on `pipeline`; return True on a cache hit."""
+		entry = self._entries.get(key)
+		if entry is not None:
+			self._entries.move_to_end(key)
+			restore_state(pipeline, entry.state)
+			restore_rng_state(entry.rng_state)
+			self.hits += 1
+			return True
+
+		self.misses += 1
+		if not self._checked:
+			discovered = discover_state_names(pipeline, compute)
+			self._checked = True
+			if self._discover:
+				self.state_names = discovered
+				logger.info("SoulX base data attributes discovered: {}", ", ".join(self.state_names) or "<none>")
+			else:
+				self.state_names = self._reconcile(pipeline, discovered)
+		else:
+			compute()
+		if self.capacity == 0:
+			return False
+		if not self.state_names:
+			logger.warning("SoulX base data left no pipeline attributes to cache; recomputing per job")
+			return False
+
+		self._entries[key] = _CachedBaseData(
+			state=snapshot_state(pipeline, self.state_names),
+			rng_state=capture_rng_state(),
+		)
+		while len(self._entries) > self.capacity:
+			self._entries.popitem(last=False)
+		return False
+
+	def _reconcile(self, pipeline: Any, discovered: Sequence[str]) -> tuple[str, ...]:
+		missing = [name for name in self.state_names if not hasattr(pipeline, name)]
+		extra = [name for name in discovered if name not in self.state_names]
+		if missing:
+			# A stale list: fall back to what discovery saw rather than cache the wrong state.
+			names = tuple(name for name in self.state_names if name not in missing) + tuple(extra)
+			logger.warning(
+				"SoulX base data attributes declared but not on the pipeline: {}; caching {} instead (fix S4_BASE_DATA_ATTRS)",
+				", ".join(missing),
+				", ".join(names) or "<none>",
+			)
+			return names
+		if extra:
+			logger.warning(
+				"SoulX base data assigned attributes outside the declared list, not cached: {}",
+				", ".join(extra),
+			)
+		return self.state_names
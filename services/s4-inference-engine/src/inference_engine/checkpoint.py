@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import os
+import shutil
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import torch
+from loguru import logger
+from media import RawVideoPipe, rawvideo_input_args, read_rawvideo_frames, temp_path_for
+
+_PROGRESS_FILE = "progress.json"
+# Segments only store frames; the rate is a placeholder the replay never reads.
+_SEGMENT_FPS = 25
+
+
+def checkpoint_key(audio_path: Path, **params: Any) -> str:
+	"""Hash the TTS audio bytes together with every setting that changes the generated frames."""
+	digest = hashlib.sha256()
+	with audio_path.open("rb") as handle:
+		for block in iter(lambda: handle.read(1 << 20), b""):
+			digest.update(block)
+	digest.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+	return digest.hexdigest()
+
+
+def _replace_atomically(path: Path, write: Callable[[Path], Any]) -> None:
+	tmp_path = path.with_name(f".{path.name}.tmp")
+	write(tmp_path)
+	os.replace(tmp_path, path)
+
+
+def _copy_value(value: Any) -> Any:
+	return value.clone() if isinstance(value, torch.Tensor) else copy.deepcopy(value)
+
+
+class ChunkCheckpoint:
+	"""Per-record work directory holding finished SoulX chunks so a redelivered job can resume.
+
+	Layout under `<root>/record_<id>_<key prefix>/`:
+	- `segment_00000.mkv` ...: the chunks finished between two flushes, encoded
+	  losslessly with FFV1, so they replay into the encoder bit for bit at a
+	  fraction of the raw frame size.
+	- `state_00000.pt` ...: the pipeline attributes that carry over between chunks
+	  (avatar state and motion frames) as they were after the last flushed chunk;
+	  only the latest one is kept.
+	- `progress.json`: flushed chunk count and the chunk layout of each segment. It
+	  is replaced last, so a kill mid-flush leaves the previous, consistent
+	  checkpoint in place.
+
+	`save` only queues work for one writer thread, which pipes frames into the
+	open segment encoder and, at most every `flush_interval_sec`, closes the
+	segment and writes state and progress. The inference thread never waits on
+	disk or on a device-to-host copy; a kill loses at most one interval of chunks,
+	which the redelivered job renders again.
+	"""
+
+	def __init__(self, root: Path, *, record_id: int, key: str, flush_interval_sec: float = 30.0) -> None:
+		self.key = key
+		self.flush_interval_sec = max(0.0, flush_interval_sec)
+		self.work_dir = root / f"record_{record_id}_{key[:16]}"
+		self.work_dir.mkdir(parents=True, exist_ok=True)
+		self._segments: list[dict[str, Any]] = []
+		self.completed_chunks = self._read_progress()
+		self._flushed_chunks = self.completed_chunks
+		self._queued_flush_chunks = self.completed_chunks
+
+		self._writer: ThreadPoolExecutor | None = None
+		self._writer_error: BaseException | None = None
+		self._latest_state: dict[str, Any] = {}
+		self._last_flush = time.monotonic()
+		# Owned by the writer thread.
+		self._segment_pipe: RawVideoPipe | None = None
+		self._segment_chunk_frames: list[int] = []
+		self._segment_size: tuple[int, int] = (0, 0)
+		self._segment_tmp: Path | None = None
+
+	def _read_progress(self) -> int:
+		progress_path = self.work_dir / _PROGRESS_FILE
+		if not progress_path.exists():
+			return 0
+		try:
+			progress = json.loads(progress_path.read_text(encoding="utf-8"))
+		except (OSError, ValueError):
+			logger.warning("Ignoring unreadable SoulX checkpoint progress at {}", progress_path)
+			return 0
+		if progress.get("key") != self.key:
+			return 0
+		completed = int(progress.get("completed_chunks", 0))
+		segments = list(progress.get("segments", []))
+		# Trust only segments that cover every finished chunk plus the state they lead to.
+		if completed and not self._state_path(completed - 1).exists():
+			return 0
+		if sum(len(segment["chunk_frames"]) for segment in segments) != completed:
+			return 0
+		if not all((self.work_dir / segment["file"]).exists() for segment in segments):
+			return 0
+		self._segments = segments
+		return completed
+
+	def _segment_path(self, segment_idx: int) -> Path:
+		return self.work_dir / f"segment_{segment_idx:05d}.mkv"
+
+	def _state_path(self, chunk_idx: int) -> Path:
+		return self.work_dir / f"state_{chunk_idx:05d}.pt"
+
+	def iter_chunks(self) -> Iterator[torch.Tensor]:
+		"""Yield the frames of every flushed chunk in order."""
+		for segment in self._segments:
+			width, height = segment["width"], segment["height"]
+			frames = read_rawvideo_frames(self.work_dir / segment["file"], width=width, height=height)
+			for frame_count in segment["chunk_frames"]:
+				chunk = np.empty((frame_count, height, width, 3), dtype=np.uint8)
+				for frame_idx in range(frame_count):
+					chunk[frame_idx] = np.frombuffer(next(frames), dtype=np.uint8).reshape(height, width, 3)
+				yield torch.from_numpy(chunk)
+			frames.close()
+
+	def load_state(self) -> dict[str, Any]:
+		# The state holds arbitrary pipeline attributes, not just tensors.
+		return torch.load(self._state_path(self.completed_chunks - 1), weights_only=False)
+
+	def save(self, chunk_idx: int, frames: torch.Tensor, state: dict[str, Any]) -> None:
+		"""Queue chunk `chunk_idx` for the checkpoint; chunks must be saved in order.
+
+		Raises the error of an earlier write that failed on the writer thread.
+		"""
+		if chunk_idx != self.completed_chunks:
+			raise ValueError(f"Expected checkpoint for chunk {self.completed_chunks}, got {chunk_idx}")
+		if self._writer_error is not None:
+			raise RuntimeError(f"SoulX checkpoint write failed in {self.work_dir}") from self._writer_error
+		if self._writer is None:
+			self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="s4-checkpoint")
+		# Output chunks are fresh tensors; the state is copied (on its own device) because
+		# the next chunk updates the pipeline attributes it references.
+		self._latest_state = {name: _copy_value(value) for name, value in state.items()}
+		self._submit(self._append_chunk, frames)
+		self.completed_chunks = chunk_idx + 1
+		if time.monotonic() - self._last_flush >= self.flush_interval_sec:
+			self._queue_flush()
+
+	def close(self) -> None:
+		"""Flush queued chunks and wait for the writer, e.g. before a failed job is redelivered."""
+		if self._writer is None:
+			return
+		if self.completed_chunks > self._queued_flush_chunks:
+			self._queue_flush()
+		self._writer.shutdown(wait=True)
+		self._writer = None
+		if self._writer_error is not None:
+			logger.warning(
+				"SoulX checkpoint in {} kept {} chunk(s) after a write error: {}",
+				self.work_dir,
+				self._flushed_chunks,
+				self._writer_error,
+			)
+
+	def discard(self) -> None:
+		if self._writer is not None:
+			self._writer.shutdown(wait=True, cancel_futures=True)
+			self._writer = None
+		if self._segment_pipe is not None:
+			self._segment_pipe.kill()
+			self._segment_pipe = None
+		shutil.rmtree(self.work_dir, ignore_errors=True)
+
+	def _submit(self, fn: Callable[..., None], *args: Any) -> None:
+		assert self._writer is not None
+		self._writer.submit(self._guarded, fn, *args)
+
+	def _guarded(self, fn: Callable[..., None], *args: Any) -> None:
+		# After one failed write the segment on disk is unusable; skip the rest.
+		if self._writer_error is not None:
+			return
+		try:
+			fn(*args)
+		except BaseException as exc:  # noqa: BLE001 - surfaced by the next save()/close()
+			self._writer_error = exc
+			if self._segment_pipe is not None:
+				self._segment_pipe.kill()
+				self._segment_pipe = None
+
+	def _queue_flush(self) -> None:
+		self._submit(self._flush, self.completed_chunks, self._latest_state)
+		self._queued_flush_chunks = self.completed_chunks
+		self._last_flush = time.monotonic()
+
+	def _append_chunk(self, frames: torch.Tensor) -> None:
+		np_frames = np.ascontiguousarray(frames.detach().cpu().numpy().astype(np.uint8, copy=False))
+		frame_count, height, width = np_frames.shape[:3]
+		if self._segment_pipe is None:
+			self._segment_size = (width, height)
+			self._segment_chunk_frames = []
+			cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y"]
+			cmd += rawvideo_input_args(width=width, height=height, fps=_SEGMENT_FPS)
+			self._segment_tmp = temp_path_for(self._segment_path(len(self._segments)))
+			cmd += ["-c:v", "ffv1", "-level", "3", "-pix_fmt", "gbrp", str(self._segment_tmp)]
+			self._segment_pipe = RawVideoPipe(cmd, what="SoulX checkpoint segment encode")
+		self._segment_pipe.write(np_frames)
+		self._segment_chunk_frames.append(frame_count)
+
+	def _flush(self, completed_chunks: int, state: dict[str, Any]) -> None:
+		if self._segment_pipe is not None:
+			segment_path = self._segment_path(len(self._segments))
+			self._segment_pipe.close()
+			self._segment_pipe = None
+			assert self._segment_tmp is not None
+			os.replace(self._segment_tmp, segment_path)
+			width, height = self._segment_size
+			self._segments.append(
+				{
+					"file": segment_path.name,
+					"width": width,
+					"height": height,
+					"chunk_frames": self._segment_chunk_frames,
+				}
+			)
+		_replace_atomically(self._state_path(completed_chunks - 1), lambda path: torch.save(state, path))
+		progress = {
+			"key": self.key,
+			"completed_chunks": completed_chunks,
+			"segments": self._segments,
+			"updated_at": time.time(),
+		}
+		_replace_atomically(
+			self.work_dir / _PROGRESS_FILE,
+			lambda path: path.write_text(json.dumps(progress), encoding="utf-8"),
+		)
+		if self._flushed_chunks:
+			self._state_path(self._flushed_chunks - 1).unlink(missing_ok=True)
+		self._flushed_chunks = completed_chunks
+
+
+def cleanup_stale_checkpoints(root: Path, *, max_age_sec: float) -> int:
+	"""Delete work directories untouched for longer than `max_age_sec`; returns how many were removed."""
+	if not root.exists():
+		return 0
+	cutoff = time.time() - max_age_sec
+	removed = 0
+	for work_dir in root.iterdir():
+		if not work_dir.is_dir() or not work_dir.name.startswith("record_"):
+			continue
+		try:
+			if work_dir.stat().st_mtime >= cutoff:
+				continue
+		except FileNotFoundError:
+			continue
+		shutil.rmtree(work_dir, ignore_errors=True)
+		removed += 1
+	if removed:
+		logger.info("Removed {} stale SoulX checkpoint dir(s) from {}", removed, root)
+	return removed
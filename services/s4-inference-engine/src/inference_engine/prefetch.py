@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import queue
+import threading
+from collections.abc import Iterator
+
+import torch
+
+# Seconds between stop-flag checks while the producer waits for a free slot.
+_PUT_POLL_SEC = 0.1
+
+
+class _Done:
+	pass
+
+
+_DONE = _Done()
+_Item = tuple[torch.Tensor, "torch.cuda.Event | None"] | BaseException | _Done
+
+
+class EmbeddingPrefetcher:
+	"""Compute upcoming audio embeddings on a background thread while the current chunk renders.
+
+	The wrapped iterator is driven entirely by the producer thread, which keeps at
+	most `depth` finished embeddings queued ahead of the consumer. Items come out
+	in source order, and an exception raised by the source is re-raised from
+	`next()` on the consumer side. With `depth=0` the source is iterated inline on
+	the caller's thread, so the old strict alternation is kept.
+
+	On CUDA the producer queues its work on a side stream and records an event per
+	embedding; the consumer makes its current stream wait on that event before
+	using the tensor, so wav2vec kernels can overlap `run_pipeline` kernels.
+	"""
+
+	def __init__(
+		self,
+		source: Iterator[torch.Tensor],
+		*,
+		depth: int,
+		name: str = "s4-embedding-prefetch",
+	) -> None:
+		self.depth = max(0, depth)
+		self._source = source
+		self._stop = threading.Event()
+		self._finished = False
+		self._thread: threading.Thread | None = None
+		if self.depth == 0:
+			return
+		self._queue: queue.Queue[_Item] = queue.Queue(maxsize=self.depth)
+		self._thread = threading.Thread(target=self._produce, name=name, daemon=True)
+		self._thread.start()
+
+	def __iter__(self) -> EmbeddingPrefetcher:
+		return self
+
+	def __next__(self) -> torch.Tensor:
+		if self._finished:
+			raise StopIteration
+		if self._thread is None:
+			try:
+				return next(self._source)
+			except BaseException:
+				self._finished = True
+				raise
+
+		item = self._queue.get()
+		if isinstance(item, _Done):
+			self._finished = True
+			raise StopIteration
+		if isinstance(item, BaseException):
+			self._finished = True
+			raise item
+
+		embedding, ready = item
+		if ready is not None:
+			consumer_stream = torch.cuda.current_stream()
+			consumer_stream.wait_event(ready)
+			# The tensor was allocated on the side stream; keep its memory alive until
+			# the consumer stream is done with it.
+			embedding.record_stream(consumer_stream)
+		return embedding
+
+	def close(self) -> None:
+		"""Stop the producer and release the source; safe to call more than once."""
+		self._finished = True
+		if self._thread is None:
+			close_source = getattr(self._source, "close", None)
+			if close_source is not None:
+				close_source()
+			return
+		self._stop.set()
+		# Unblock a producer waiting on a full queue.
+		while True:
+			try:
+				self._queue.get_nowait()
+			except queue.Empty:
+				break
+		self._thread.join()
+
+	def __enter__(self) -> EmbeddingPrefetcher:
+		return self
+
+	def __exit__(self, exc_type, exc, tb) -> None:
+		self.close()
+
+	def _put(self, item: _Item) -> bool:
+		while not self._stop.is_set():
+			try:
+				self._queue.put(item, timeout=_PUT_POLL_SEC)
+				return True
+			except queue.Full:
+				continue
+		return False
+
+	def _produce(self) -> None:
+		side_stream = torch.cuda.Stream() if torch.cuda.is_available() else None
+		try:
+			while not self._stop.is_set():
+				# The current stream is per-thread, so this only affects the producer.
+				if side_stream is not None:
+					with torch.cuda.stream(side_stream):
+						embedding = next(self._source)
+					ready = torch.cuda.Event()
+					ready.record(side_stream)
+				else:
+					embedding = next(self._source)
+					ready = None
+				if not self._put((embedding, ready)):
+					return
+		except StopIteration:
+			self._put(_DONE)
+		except BaseException as exc:  # noqa: BLE001 - re-raised on the consumer thread
+			self._put(exc)
+		finally:
+			close_source = getattr(self._source, "close", None)
+			if close_source is not None:
+				close_source()
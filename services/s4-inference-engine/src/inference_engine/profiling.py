@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import numpy as np
+import torch
+
+STAGES = ("embedding", "pipeline", "d2h", "encode")
+# Upper bucket edges in milliseconds for the per-stage histogram; the last bucket is open-ended.
+_BUCKET_EDGES_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+def _synchronize() -> None:
+	if torch.cuda.is_available():
+		torch.cuda.synchronize()
+
+
+class ChunkProfiler:
+	"""Opt-in per-chunk stage timings for one s4 job.
+
+	When disabled every call is a no-op, so the default path never synchronizes the
+	device. When enabled, device-bound stages synchronize around the measured
+	region so GPU time is attributed to the stage that queued it.
+	"""
+
+	def __init__(self, enabled: bool = False) -> None:
+		self.enabled = enabled
+		self._samples: defaultdict[str, list[float]] = defaultdict(list)
+
+	@contextmanager
+	def measure(self, stage: str, *, sync: bool = False) -> Iterator[None]:
+		if not self.enabled:
+			yield
+			return
+		if sync:
+			_synchronize()
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			if sync:
+				_synchronize()
+			self.record(stage, time.perf_counter() - start)
+
+	def record(self, stage: str, seconds: float) -> None:
+		if self.enabled:
+			# list.append is atomic, so the encoder thread can record concurrently.
+			self._samples[stage].append(seconds * 1000)
+
+	def summary(self) -> dict[str, dict[str, float]]:
+		stats: dict[str, dict[str, float]] = {}
+		for stage in STAGES:
+			samples = self._samples.get(stage)
+			if not samples:
+				continue
+			values = np.asarray(samples)
+			stats[stage] = {
+				"count": float(values.size),
+				"total_ms": float(values.sum()),
+				"mean_ms": float(values.mean()),
+				"p50_ms": float(np.percentile(values, 50)),
+				"p95_ms": float(np.percentile(values, 95)),
+				"max_ms": float(values.max()),
+			}
+		return stats
+
+	def histogram(self) -> str:
+		"""Render one line per stage: summary stats followed by millisecond bucket counts."""
+		lines = []
+		for stage, stats in self.summary().items():
+			counts = np.bincount(
+				np.searchsorted(_BUCKET_EDGES_MS, self._samples[stage], side="right"),
+				minlength=len(_BUCKET_EDGES_MS) + 1,
+			)
+			labels = [f"<{edge}" for edge in _BUCKET_EDGES_MS] + [f">={_BUCKET_EDGES_MS[-1]}"]
+			buckets = " ".join(f"{label}:{count}" for label, count in zip(labels, counts) if count)
+			lines.append(
+				f"{stage:<9} n={int(stats['count'])} total={stats['total_ms']:.0f}ms "
+				f"mean={stats['mean_ms']:.1f}ms p50={stats['p50_ms']:.1f}ms "
+				f"p95={stats['p95_ms']:.1f}ms max={stats['max_ms']:.1f}ms | {buckets}"
+			)
+		return "\n".join(lines)
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+
+from loguru import logger
+from media import (
+	atomic_output,
+	budget_total_kbps,
+	initial_total_kbps,
+	overlay_filter_complex,
+	probe_media,
+	progress_logger,
+	rawvideo_input_args,
+	retarget_total_kbps,
+	run_ffmpeg,
+	split_bitrate,
+)
+
+from inference_engine.profiling import ChunkProfiler
+from inference_engine.video_writer import StreamingVideoWriter
+
+
+@dataclass(frozen=True)
+class CompositionSpec:
+	"""Overlay and output-size knobs mirrored from s6 for the fused render-final mode."""
+
+	scale_ratio: float
+	margin_x: int
+	margin_y: int
+	x264_preset: str
+	x264_crf: int
+	target_total_bitrate_mbps: float
+	min_total_bitrate_mbps: float
+	audio_bitrate_kbps: int
+	max_output_size_mb: int
+	bitrate_step_kbps: int = 50
+
+
+class CompositingVideoWriter(StreamingVideoWriter):
+	"""Pipe SoulX frames straight into the s6 overlay graph and encode the final video once.
+
+	Map:
+	1) Probe the Douyin background and pick one total bitrate: the source bitrate
+	   (or the fallback), capped by what fits in `max_output_size_mb`.
+	2) ffmpeg input 0 is the background (retimed to the TTS duration like s6),
+	   input 1 is the rawvideo foreground on stdin, input 2 is the TTS audio.
+	3) If the single encode still overshoots, shrink the composited file at a
+	   bitrate derived from the measured size instead of re-running inference,
+	   retargeting again until it fits or the bitrate floor is reached.
+	"""
+
+	stops_at_target_duration = True
+
+	def __init__(
+		self,
+		*,
+		video_path: Path,
+		audio_path: Path,
+		fps: int,
+		background_path: Path,
+		target_duration: float,
+		spec: CompositionSpec,
+		max_pending_chunks: int = 2,
+		profiler: ChunkProfiler | None = None,
+	) -> None:
+		if target_duration <= 0:
+			raise RuntimeError("Foreground (TTS) duration is zero")
+		bg_info = probe_media(str(background_path))
+		bg_duration, bg_fps, bg_total_kbps = bg_info.duration_sec, bg_info.fps, bg_info.total_kbps
+		if bg_duration <= 0:
+			raise RuntimeError("Background video duration is zero")
+
+		self.background_path = background_path
+		self.target_duration = target_duration
+		self.spec = spec
+		self.bg_fps = bg_fps
+		self.bg_setpts_factor = target_duration / bg_duration
+
+		self.min_total_kbps = max(100, int(round(spec.min_total_bitrate_mbps * 1000)))
+		budget_kbps = budget_total_kbps(spec.max_output_size_mb, target_duration)
+		self.total_kbps = initial_total_kbps(
+			source_total_kbps=bg_total_kbps,
+			fallback_total_kbps=max(100, int(round(spec.target_total_bitrate_mbps * 1000))),
+			min_total_kbps=self.min_total_kbps,
+			max_output_size_mb=spec.max_output_size_mb,
+			duration_sec=target_duration,
+		)
+
+		logger.info(
+			"S4 render-final plan: s2={:.3f}s, tts={:.3f}s (target), bg_setpts_factor={:.6f}, "
+			"s2_total={} kbps, budget_total={} kbps, chosen_total={} kbps",
+			bg_duration,
+			target_duration,
+			self.bg_setpts_factor,
+			bg_total_kbps,
+			budget_kbps,
+			self.total_kbps,
+		)
+		super().__init__(
+			video_path=video_path,
+			audio_path=audio_path,
+			fps=fps,
+			expected_duration_sec=target_duration,
+			max_pending_chunks=max_pending_chunks,
+			profiler=profiler,
+		)
+
+	def close(self) -> None:
+		super().close()
+		self._enforce_size_budget()
+
+	def _build_command(self, height: int, width: int) -> list[str]:
+		spec = self.spec
+		video_kbps, audio_kbps = split_bitrate(self.total_kbps, spec.audio_bitrate_kbps)
+		filter_complex = overlay_filter_complex(
+			bg_setpts=f"PTS*{self.bg_setpts_factor:.8f}",
+			fg_setpts="PTS-STARTPTS",
+			bg_fps=self.bg_fps,
+			scale_ratio=spec.scale_ratio,
+			margin_x=spec.margin_x,
+			margin_y=spec.margin_y,
+		)
+		return [
+			"ffmpeg",
+			"-y",
+			"-loglevel",
+			"error",
+			"-i",
+			str(self.background_path),
+			*rawvideo_input_args(width=width, height=height, fps=self.fps),
+			"-i",
+			str(self.audio_path),
+			"-filter_complex",
+			filter_complex,
+			"-map",
+			"[vout]",
+			"-map",
+			"2:a?",
+			"-af",
+			"apad",
+			"-t",
+			f"{self.target_duration:.3f}",
+			"-fps_mode",
+			"cfr",
+			"-r",
+			f"{self.bg_fps:.6f}",
+			"-c:v",
+			"libx264",
+			"-preset",
+			spec.x264_preset,
+			"-crf",
+			str(spec.x264_crf),
+			"-b:v",
+			f"{video_kbps}k",
+			"-maxrate",
+			f"{video_kbps}k",
+			"-bufsize",
+			f"{video_kbps * 2}k",
+			"-c:a",
+			"aac",
+			"-b:a",
+			f"{audio_kbps}k",
+			"-movflags",
+			"+faststart",
+			str(self._output_path),
+		]
+
+	def _enforce_size_budget(self) -> None:
+		spec = self.spec
+		max_bytes = spec.max_output_size_mb * 1024 * 1024
+		output_size = self.video_path.stat().st_size
+		while output_size > max_bytes:
+			next_total_kbps = retarget_total_kbps(
+				attempt_total_kbps=self.total_kbps,
+				measured_bytes=output_size,
+				max_output_size_mb=spec.max_output_size_mb,
+				min_total_kbps=self.min_total_kbps,
+				min_step_kbps=max(10, spec.bitrate_step_kbps),
+			)
+			if next_total_kbps is None:
+				# Inference is the expensive part: hand on the smallest encode rather than fail the job.
+				logger.error(
+					"S4 render-final output still {:.2f} MB > {} MB at the minimum total={} kbps; keeping it",
+					output_size / (1024 * 1024),
+					spec.max_output_size_mb,
+					self.total_kbps,
+				)
+				return
+			logger.warning(
+				"S4 render-final oversize: {:.2f} MB > {} MB at total={} kbps; shrinking at total={} kbps",
+				output_size / (1024 * 1024),
+				spec.max_output_size_mb,
+				self.total_kbps,
+				next_total_kbps,
+			)
+			self._shrink(next_total_kbps)
+			self.total_kbps = next_total_kbps
+			output_size = self.video_path.stat().st_size
+
+	def _shrink(self, total_kbps: int) -> None:
+		"""Re-encode the composited file at `total_kbps`, replacing it once the encode finishes."""
+		video_kbps, _ = split_bitrate(total_kbps, self.spec.audio_bitrate_kbps)
+		cmd = [
+			"ffmpeg",
+			"-y",
+			"-i",
+			str(self.video_path),
+			"-map",
+			"0",
+			"-c:v",
+			"libx264",
+			"-preset",
+			self.spec.x264_preset,
+			"-b:v",
+			f"{video_kbps}k",
+			"-maxrate",
+			f"{video_kbps}k",
+			"-bufsize",
+			f"{video_kbps * 2}k",
+			"-c:a",
+			"copy",
+			"-movflags",
+			"+faststart",
+		]
+		with atomic_output(self.video_path) as shrunk_path:
+			run_ffmpeg(
+				[*cmd, str(shrunk_path)],
+				what="ffmpeg render-final shrink",
+				expected_duration_sec=self.target_duration,
+				on_progress=progress_logger("S4 render-final shrink", expected_duration_sec=self.target_duration),
+			)
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import queue
+import threading
+from collections import Counter
+from collections.abc import Callable, Iterator, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+import torch
+from loguru import logger
+
+JobSetup = Callable[[], tuple[Any, Iterator[torch.Tensor]]]
+RunBatch = Callable[[Sequence["ChunkRequest"]], Sequence[torch.Tensor]]
+
+
+@dataclass
+class ChunkRequest:
+	"""One job's next chunk inside a batch; `state` is whatever the job's setup returned."""
+
+	state: Any
+	audio_embedding: torch.Tensor
+	chunk_idx: int
+
+
+@dataclass
+class _ScheduledJob:
+	setup: JobSetup
+	on_chunk: Callable[[torch.Tensor], None]
+	done: threading.Event = field(default_factory=threading.Event)
+	state: Any = None
+	embeddings: Iterator[torch.Tensor] | None = None
+	chunk_idx: int = 0
+	error: BaseException | None = None
+
+
+class BatchScheduler:
+	"""Interleave chunks from concurrently running s4 jobs into shared scheduling rounds.
+
+	Map:
+	1) Dramatiq worker threads call `run_job()`, which queues the job and blocks
+	   until all of its chunks have been rendered and handed to `on_chunk`.
+	2) The scheduler thread admits up to `max_batch_size` jobs and runs each job's
+	   `setup` itself, so every pipeline access happens on this one thread.
+	3) Each round takes the next chunk of every active job (a job contributes at
+	   most one chunk per batch because chunk N+1 depends on chunk N), hands them
+	   to `run_batch` and routes each output back to its job's `on_chunk`.
+	   The runtime's `run_batch` stacks them into one backend forward pass.
+	4) Finished or failed jobs are released and their slot goes to the next
+	   queued job.
+	"""
+
+	def __init__(self, run_batch: RunBatch, *, max_batch_size: int) -> None:
+		self.max_batch_size = max(1, max_batch_size)
+		self.batches_run = 0
+		self.chunks_run = 0
+		self.batch_size_counts: Counter[int] = Counter()
+
+		self._run_batch = run_batch
+		self._inbox: queue.Queue[_ScheduledJob | None] = queue.Queue()
+		self._active: list[_ScheduledJob] = []
+		self._closed = False
+		self._thread = threading.Thread(target=self._loop, name="s4-batch-scheduler", daemon=True)
+		self._thread.start()
+
+	def run_job(self, setup: JobSetup, on_chunk: Callable[[torch.Tensor], None]) -> int:
+		"""Render one job through the shared scheduler; returns the number of chunks produced."""
+		if self._closed:
+			raise RuntimeError("Batch scheduler is closed")
+		job = _ScheduledJob(setup=setup, on_chunk=on_chunk)
+		self._inbox.put(job)
+		job.done.wait()
+		if job.error is not None:
+			raise job.error
+		return job.chunk_idx
+
+	def close(self) -> None:
+		self._closed = True
+		self._inbox.put(None)
+		self._thread.join()
+
+	def _admit(self) -> bool:
+		# Block for work only when idle; otherwise top up free slots without waiting.
+		while len(self._active) < self.max_batch_size:
+			try:
+				job = self._inbox.get(block=not self._active)
+			except queue.Empty:
+				return True
+			if job is None:
+				return False
+			try:
+				job.state, job.embeddings = job.setup()
+			except BaseException as exc:  # noqa: BLE001 - reported to the submitting thread
+				self._finish(job, exc)
+				continue
+			self._active.append(job)
+		return True
+
+	def _finish(self, job: _ScheduledJob, error: BaseException | None = None) -> None:
+		job.error = error
+		# Release the job's embedding source (e.g. stop a prefetch thread) before waking the submitter.
+		close_embeddings = getattr(job.embeddings, "close", None)
+		if close_embeddings is not None:
+			try:
+				close_embeddings()
+			except Exception:  # noqa: BLE001
+				logger.exception("Failed to close embedding iterator for finished s4 job")
+		if job in self._active:
+			self._active.remove(job)
+		job.done.set()
+
+	def _loop(self) -> None:
+		running = True
+		while running or self._active:
+			if running:
+				running = self._admit()
+
+			batch: list[tuple[_ScheduledJob, ChunkRequest]] = []
+			for job in list(self._active):
+				assert job.embeddings is not None
+				try:
+					embedding = next(job.embeddings)
+				except StopIteration:
+					self._finish(job)
+					continue
+				except BaseException as exc:  # noqa: BLE001
+					self._finish(job, exc)
+					continue
+				batch.append((job, ChunkRequest(job.state, embedding, job.chunk_idx)))
+
+			if not batch:
+				continue
+
+			try:
+				outputs = self._run_batch([request for _, request in batch])
+			except BaseException as exc:  # noqa: BLE001
+				for job, _ in batch:
+					self._finish(job, exc)
+				continue
+
+			self.batches_run += 1
+			self.chunks_run += len(batch)
+			self.batch_size_counts[len(batch)] += 1
+			logger.debug("S4 scheduler ran batch of {} chunk(s)", len(batch))
+
+			for (job, _), output in zip(batch, outputs):
+				try:
+					job.on_chunk(output)
+				except BaseException as exc:  # noqa: BLE001
+					self._finish(job, exc)
+					continue
+				job.chunk_idx += 1
+
+		# Close requested: fail anything still queued.
+		while True:
+			try:
+				job = self._inbox.get_nowait()
+			except queue.Empty:
+				return
+			if job is not None:
+				self._finish(job, RuntimeError("Batch scheduler is closed"))
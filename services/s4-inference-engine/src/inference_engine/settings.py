@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from core.durability import Durability
 from pydantic import AliasChoices, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -23,6 +24,21 @@ class Settings(BaseSettings):
         description="Directory to store inference results",
         validation_alias=AliasChoices("S4_OUTPUT_DIR", "output_dir"),
     )
+    artifact_store_enabled: bool = Field(
+        False,
+        description="Write outputs through the shared content-addressed artifact store instead of output_dir",
+        validation_alias=AliasChoices("S4_ARTIFACT_STORE_ENABLED", "artifact_store_enabled"),
+    )
+    artifact_store_dir: str = Field(
+        "/data/artifacts",
+        description="Root of the shared artifact store (must be on the same filesystem for every stage)",
+        validation_alias=AliasChoices("S4_ARTIFACT_STORE_DIR", "ARTIFACT_STORE_DIR", "artifact_store_dir"),
+    )
+    durability: Durability = Field(
+        "file",
+        description="How outputs are flushed before the downstream enqueue: none, file (fsync the output and its directory) or host (os.sync)",
+        validation_alias=AliasChoices("S4_DURABILITY", "durability"),
+    )
     current_queue: str = Field(
         "s4-inference-engine",
         description="Dramatiq queue consumed by this service",
@@ -51,6 +67,30 @@ class Settings(BaseSettings):
             "S4_DEBUG_LOG_PAYLOAD",
         ),
     )
+    backend: str = Field(
+        "soulx",
+        description="Inference backend: soulx (vendored SoulX-FlashHead) or synthetic (GPU-free stand-in for load tests)",
+        validation_alias=AliasChoices("S4_BACKEND", "backend"),
+    )
+    synthetic_chunk_latency_ms: float = Field(
+        250.0,
+        description="Synthetic backend: simulated run_pipeline latency per chunk in ms",
+        validation_alias=AliasChoices("S4_SYNTHETIC_CHUNK_LATENCY_MS", "synthetic_chunk_latency_ms"),
+        ge=0,
+    )
+    synthetic_embedding_latency_ms: float = Field(
+        10.0,
+        description="Synthetic backend: simulated audio embedding latency per call in ms",
+        validation_alias=AliasChoices("S4_SYNTHETIC_EMBEDDING_LATENCY_MS", "synthetic_embedding_latency_ms"),
+        ge=0,
+    )
+    synthetic_frame_size: int = Field(
+        512,
+        description="Synthetic backend: width and height of generated frames in pixels",
+        validation_alias=AliasChoices("S4_SYNTHETIC_FRAME_SIZE", "synthetic_frame_size"),
+        ge=16,
+        le=2048,
+    )
     flashhead_ckpt_dir: str = Field(
         "/models/SoulX-FlashHead-1_3B",
         description="Local path to SoulX-FlashHead checkpoint directory",
@@ -82,6 +122,156 @@ class Settings(BaseSettings):
         description="Audio encode mode: stream or once",
         validation_alias=AliasChoices("S4_AUDIO_ENCODE_MODE", "audio_encode_mode"),
     )
+    stream_encode_enabled: bool = Field(
+        True,
+        description="Encode each SoulX chunk on a background writer as soon as it is produced",
+        validation_alias=AliasChoices("S4_STREAM_ENCODE_ENABLED", "stream_encode_enabled"),
+    )
+    stream_encode_max_pending_chunks: int = Field(
+        2,
+        description="Max generated chunks queued for the streaming encoder before inference waits",
+        validation_alias=AliasChoices(
+            "S4_STREAM_ENCODE_MAX_PENDING_CHUNKS",
+            "stream_encode_max_pending_chunks",
+        ),
+        ge=1,
+        le=32,
+    )
+    render_final_enabled: bool = Field(
+        False,
+        description="Composite over the s2 background inside s4 and hand the final video straight to s7",
+        validation_alias=AliasChoices("S4_RENDER_FINAL_ENABLED", "render_final_enabled"),
+    )
+    render_final_output_dir: str = Field(
+        "/data/s6",
+        description="Directory to store composited videos produced in render-final mode",
+        validation_alias=AliasChoices("S4_RENDER_FINAL_OUTPUT_DIR", "render_final_output_dir"),
+    )
+    render_final_downstream_queue: str = Field(
+        "s7-storage-uploader",
+        description="Dramatiq queue receiving composited videos in render-final mode",
+        validation_alias=AliasChoices(
+            "S4_RENDER_FINAL_DOWNSTREAM_QUEUE",
+            "render_final_downstream_queue",
+        ),
+    )
+    render_final_downstream_actor: str = Field(
+        "s7_storage_uploader.process",
+        description="Dramatiq actor receiving composited videos in render-final mode",
+        validation_alias=AliasChoices(
+            "S4_RENDER_FINAL_DOWNSTREAM_ACTOR",
+            "render_final_downstream_actor",
+        ),
+    )
+    overlay_scale_ratio: float = Field(
+        0.18,
+        description="Render-final: foreground scale ratio relative to original size",
+        validation_alias=AliasChoices("S4_OVERLAY_SCALE_RATIO", "overlay_scale_ratio"),
+    )
+    overlay_margin_x: int = Field(
+        18,
+        description="Render-final: foreground left margin in pixels",
+        validation_alias=AliasChoices("S4_OVERLAY_MARGIN_X", "overlay_margin_x"),
+    )
+    overlay_margin_y: int = Field(
+        18,
+        description="Render-final: foreground bottom margin in pixels",
+        validation_alias=AliasChoices("S4_OVERLAY_MARGIN_Y", "overlay_margin_y"),
+    )
+    x264_preset: str = Field(
+        "veryfast",
+        description="Render-final: x264 preset",
+        validation_alias=AliasChoices("S4_X264_PRESET", "x264_preset"),
+    )
+    x264_crf: int = Field(
+        20,
+        description="Render-final: x264 CRF",
+        validation_alias=AliasChoices("S4_X264_CRF", "x264_crf"),
+    )
+    target_total_bitrate_mbps: float = Field(
+        0.6,
+        description="Render-final: total bitrate (video + audio) when the s2 source bitrate is unknown",
+        validation_alias=AliasChoices(
+            "S4_TARGET_TOTAL_BITRATE_MBPS",
+            "target_total_bitrate_mbps",
+        ),
+    )
+    min_total_bitrate_mbps: float = Field(
+        0.35,
+        description="Render-final: lowest allowed total bitrate in Mbps",
+        validation_alias=AliasChoices(
+            "S4_MIN_TOTAL_BITRATE_MBPS",
+            "min_total_bitrate_mbps",
+        ),
+    )
+    bitrate_step_kbps: int = Field(
+        50,
+        description="Render-final: minimum total bitrate reduction in kbps between shrink passes",
+        validation_alias=AliasChoices("S4_BITRATE_STEP_KBPS", "bitrate_step_kbps"),
+    )
+    audio_bitrate_kbps: int = Field(
+        96,
+        description="Render-final: AAC audio bitrate in kbps",
+        validation_alias=AliasChoices("S4_AUDIO_BITRATE_KBPS", "audio_bitrate_kbps"),
+    )
+    max_output_size_mb: int = Field(
+        30,
+        description="Render-final: maximum allowed composited output size in MB",
+        validation_alias=AliasChoices("S4_MAX_OUTPUT_SIZE_MB", "max_output_size_mb"),
+    )
+    base_data_cache_size: int = Field(
+        4,
+        description="Number of condition-image base data entries kept in the LRU cache (0 disables)",
+        validation_alias=AliasChoices("S4_BASE_DATA_CACHE_SIZE", "base_data_cache_size"),
+        ge=0,
+        le=32,
+    )
+    base_data_attrs: str = Field(
+        "",
+        description="Comma-separated SoulX pipeline attributes that hold avatar and motion state (empty = discover on the first avatar)",
+        validation_alias=AliasChoices("S4_BASE_DATA_ATTRS", "base_data_attrs"),
+    )
+    batch_max_jobs: int = Field(
+        1,
+        description="Max concurrent jobs whose chunks the s4 scheduler interleaves into one batch (1 = serial)",
+        validation_alias=AliasChoices("S4_BATCH_MAX_JOBS", "batch_max_jobs"),
+        ge=1,
+        le=16,
+    )
+    embedding_lookahead: int = Field(
+        0,
+        description="Audio embeddings computed ahead on a producer thread while the current chunk renders (0 = inline)",
+        validation_alias=AliasChoices("S4_EMBEDDING_LOOKAHEAD", "embedding_lookahead"),
+        ge=0,
+        le=8,
+    )
+    checkpoint_enabled: bool = Field(
+        False,
+        description="Persist finished chunks so a redelivered job resumes from the last finished chunk",
+        validation_alias=AliasChoices("S4_CHECKPOINT_ENABLED", "checkpoint_enabled"),
+    )
+    checkpoint_dir: str = Field(
+        "/data/s4/checkpoints",
+        description="Root directory for per-record chunk checkpoint work dirs",
+        validation_alias=AliasChoices("S4_CHECKPOINT_DIR", "checkpoint_dir"),
+    )
+    checkpoint_max_age_hours: float = Field(
+        24.0,
+        description="Checkpoint work dirs untouched for longer than this are deleted",
+        validation_alias=AliasChoices("S4_CHECKPOINT_MAX_AGE_HOURS", "checkpoint_max_age_hours"),
+        gt=0,
+    )
+    checkpoint_interval_sec: float = Field(
+        30.0,
+        description="At most this often, finished chunks are flushed to a checkpoint segment (0 = after every chunk)",
+        validation_alias=AliasChoices("S4_CHECKPOINT_INTERVAL_SEC", "checkpoint_interval_sec"),
+        ge=0,
+    )
+    profile_chunks: bool = Field(
+        False,
+        description="Record per-chunk embedding/pipeline/D2H/encode timings (adds device syncs) and log a per-job histogram",
+        validation_alias=AliasChoices("S4_PROFILE_CHUNKS", "profile_chunks"),
+    )
     use_face_crop: bool = Field(
         False,
         description="Enable face crop for extracted condition image",
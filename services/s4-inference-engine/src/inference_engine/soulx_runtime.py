@@ -1,70 +1,70 @@
 from __future__ import annotations
 
-import os
-import subprocess
-import sys
 import time
-from collections import deque
-from contextlib import contextmanager
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any
 from uuid import uuid4
 
-import imageio
 import librosa
 import numpy as np
 import torch
 from loguru import logger
 
+from inference_engine.audio_window import AudioWindow
+from inference_engine.backends import InferenceBackend
+from inference_engine.base_data_cache import BaseDataCache, BaseDataKey, restore_state
+from inference_engine.checkpoint import ChunkCheckpoint, checkpoint_key, cleanup_stale_checkpoints
+from inference_engine.prefetch import EmbeddingPrefetcher
+from inference_engine.profiling import ChunkProfiler
+from inference_engine.render_final import CompositingVideoWriter, CompositionSpec
+from inference_engine.scheduler import BatchScheduler, ChunkRequest
+from inference_engine.video_writer import StreamingVideoWriter
 
-@contextmanager
-def _pushd(path: Path):
-	old_cwd = Path.cwd()
-	os.chdir(path)
-	try:
-		yield
-	finally:
-		os.chdir(old_cwd)
 
+@dataclass
+class _BatchedJobState:
+	"""Per-job context a scheduled job carries between batches."""
 
-class SoulXRuntime:
-	def __init__(self, *, flashhead_ckpt_dir: str, wav2vec_dir: str, model_type: str) -> None:
-		self.vendor_root = Path(__file__).resolve().parents[2] / "vendor" / "SoulX-FlashHead"
-		self.flashhead_ckpt_dir = str(Path(flashhead_ckpt_dir).resolve())
-		self.wav2vec_dir = str(Path(wav2vec_dir).resolve())
-		self.model_type = model_type
-
-		if self.model_type not in {"pro", "lite"}:
-			raise ValueError(f"Invalid S4_MODEL_TYPE={self.model_type!r}; expected 'pro' or 'lite'")
-
-		if not self.vendor_root.exists():
-			raise FileNotFoundError(f"SoulX vendor repo not found at: {self.vendor_root}")
-		if not Path(self.flashhead_ckpt_dir).exists():
-			raise FileNotFoundError(f"FlashHead checkpoint dir not found: {self.flashhead_ckpt_dir}")
-		if not Path(self.wav2vec_dir).exists():
-			raise FileNotFoundError(f"wav2vec checkpoint dir not found: {self.wav2vec_dir}")
-
-		if str(self.vendor_root) not in sys.path:
-			sys.path.insert(0, str(self.vendor_root))
+	pipeline_state: dict[str, Any]
+	profiler: ChunkProfiler
 
-		with _pushd(self.vendor_root):
-			import flash_head.inference as flash_inference
 
-		self.flash_inference = flash_inference
-		logger.info(
-			"Loading SoulX pipeline at startup (model_type={}, ckpt_dir={}, wav2vec_dir={})",
-			self.model_type,
-			self.flashhead_ckpt_dir,
-			self.wav2vec_dir,
-		)
-		self.pipeline = self.flash_inference.get_pipeline(
-			world_size=1,
-			ckpt_dir=self.flashhead_ckpt_dir,
-			wav2vec_dir=self.wav2vec_dir,
-			model_type=self.model_type,
-		)
-		self.infer_params = self.flash_inference.get_infer_params()
+class SoulXRuntime:
+	def __init__(
+		self,
+		*,
+		backend: InferenceBackend,
+		base_data_cache_size: int = 4,
+		batch_max_jobs: int = 1,
+		profile_chunks: bool = False,
+		embedding_lookahead: int = 0,
+		checkpoint_dir: str | None = None,
+		checkpoint_max_age_sec: float = 24 * 3600,
+		checkpoint_interval_sec: float = 30.0,
+	) -> None:
+		self.backend = backend
+		self.pipeline = backend.pipeline
+		self.infer_params = backend.infer_params
+		self.profile_chunks = profile_chunks
+		self.embedding_lookahead = embedding_lookahead
+		self.checkpoint_root = Path(checkpoint_dir) if checkpoint_dir else None
+		self.checkpoint_max_age_sec = checkpoint_max_age_sec
+		self.checkpoint_interval_sec = checkpoint_interval_sec
+		self.base_data_cache = BaseDataCache(base_data_cache_size, state_names=self.backend.base_data_attrs)
+		self.scheduler: BatchScheduler | None = None
+		if batch_max_jobs > 1 and backend.supports_batching:
+			self.scheduler = BatchScheduler(self._run_batch, max_batch_size=batch_max_jobs)
+		elif batch_max_jobs > 1:
+			logger.warning(
+				"S4_BATCH_MAX_JOBS={} ignored: the {} backend cannot render several jobs in one forward pass",
+				batch_max_jobs,
+				self.backend.name,
+			)
 		self._is_prewarmed = False
-		logger.info("SoulX pipeline preloaded successfully")
+		logger.info("S4 {} pipeline preloaded successfully", self.backend.name)
 
 	def prewarm(
 		self,
@@ -92,37 +92,28 @@ class SoulXRuntime:
 		audio_end_idx = cached_audio_duration * tgt_fps
 
 		warmup_sec = max(cached_audio_duration, int(duration_sec))
-		warmup_audio = np.zeros(sample_rate * warmup_sec, dtype=np.float32)
+		# Warm up on the same window shape stream mode feeds to get_audio_embedding.
+		audio_window = AudioWindow(sample_rate * cached_audio_duration)
+		audio_window.push(np.zeros(sample_rate * warmup_sec, dtype=np.float32))
 
 		logger.info(
-			"Starting SoulX startup prewarm (duration_sec={}, cond_image={}, model_type={})",
+			"Starting SoulX startup prewarm (duration_sec={}, cond_image={}, backend={})",
 			warmup_sec,
 			cond_image,
-			self.model_type,
+			self.backend.identity(),
 		)
 
-		with _pushd(self.vendor_root):
-			self.flash_inference.get_base_data(
-				self.pipeline,
-				cond_image_path_or_dir=str(cond_image),
-				base_seed=base_seed,
-				use_face_crop=use_face_crop,
-			)
+		self._load_base_data(cond_image, base_seed=base_seed, use_face_crop=use_face_crop)
 
-			audio_embedding = self.flash_inference.get_audio_embedding(
-				self.pipeline,
-				warmup_audio,
-				audio_start_idx,
-				audio_end_idx,
-			)
+		audio_embedding = self.backend.get_audio_embedding(audio_window.view(), audio_start_idx, audio_end_idx)
 
-			if torch.cuda.is_available():
-				torch.cuda.synchronize()
-			start_ts = time.time()
-			self._run_pipeline(audio_embedding, chunk_idx=-1)
-			if torch.cuda.is_available():
-				torch.cuda.synchronize()
-			elapsed = time.time() - start_ts
+		if torch.cuda.is_available():
+			torch.cuda.synchronize()
+		start_ts = time.time()
+		self._run_pipeline(audio_embedding, chunk_idx=-1)
+		if torch.cuda.is_available():
+			torch.cuda.synchronize()
+		elapsed = time.time() - start_ts
 
 		self._is_prewarmed = True
 		logger.info("SoulX startup prewarm completed in {:.2f}s", elapsed)
@@ -138,7 +129,158 @@ class SoulXRuntime:
 		base_seed: int,
 		use_face_crop: bool,
 		audio_encode_mode: str,
+		stream_encode: bool = True,
+		max_pending_chunks: int = 2,
+	) -> str:
+		cond_image, source_audio, output_root = self._prepare_job(
+			cond_image_path=cond_image_path,
+			audio_path=audio_path,
+			output_dir=output_dir,
+			audio_encode_mode=audio_encode_mode,
+		)
+
+		profiler = ChunkProfiler(enabled=self.profile_chunks)
+		checkpoint = self._open_checkpoint(
+			record_id=record_id,
+			cond_image=cond_image,
+			audio_path=source_audio,
+			base_seed=base_seed,
+			use_face_crop=use_face_crop,
+			audio_encode_mode=audio_encode_mode,
+		)
+
+		def _render(on_chunk: Callable[[torch.Tensor], None]) -> int:
+			return self._render_chunks(
+				cond_image=cond_image,
+				base_seed=base_seed,
+				use_face_crop=use_face_crop,
+				audio_path=source_audio,
+				audio_encode_mode=audio_encode_mode,
+				on_chunk=on_chunk,
+				profiler=profiler,
+				checkpoint=checkpoint,
+			)
+
+		with self._keep_checkpoint_on_error(checkpoint):
+			out_path = output_root / f"record_{record_id}_{uuid4().hex}_soulx.mp4"
+			fps = int(self.infer_params["tgt_fps"])
+
+			if not stream_encode:
+				generated_frames: list[torch.Tensor] = []
+				_render(generated_frames.append)
+				if not generated_frames:
+					raise RuntimeError("SoulX produced no video chunks from the provided audio")
+				self._save_video(
+					frames_list=generated_frames,
+					video_path=out_path,
+					audio_path=source_audio,
+					fps=fps,
+					profiler=profiler,
+				)
+				self._finish_checkpoint(checkpoint)
+				self._log_profile(record_id, profiler)
+				return str(out_path)
+
+			# Streaming: each chunk is encoded on the writer thread while the next one renders.
+			with StreamingVideoWriter(
+				video_path=out_path,
+				audio_path=source_audio,
+				fps=fps,
+				expected_duration_sec=float(librosa.get_duration(path=str(source_audio))),
+				max_pending_chunks=max_pending_chunks,
+				profiler=profiler,
+			) as writer:
+				_render(writer.write)
+			logger.info(
+				"SoulX video encoded in a single pass (chunks={}, frames={}, bytes_written={})",
+				writer.chunks_written,
+				writer.frames_written,
+				writer.bytes_written,
+			)
+			self._finish_checkpoint(checkpoint)
+			self._log_profile(record_id, profiler)
+			return str(out_path)
+
+	def render_final(
+		self,
+		*,
+		record_id: int,
+		cond_image_path: str,
+		audio_path: str,
+		background_video_path: str,
+		output_dir: str,
+		base_seed: int,
+		use_face_crop: bool,
+		audio_encode_mode: str,
+		composition: CompositionSpec,
+		max_pending_chunks: int = 2,
 	) -> str:
+		"""Generate the talking head and composite it over the background in one encode."""
+		background = Path(background_video_path)
+		if not background.exists():
+			raise FileNotFoundError(f"Background video not found: {background}")
+
+		cond_image, source_audio, output_root = self._prepare_job(
+			cond_image_path=cond_image_path,
+			audio_path=audio_path,
+			output_dir=output_dir,
+			audio_encode_mode=audio_encode_mode,
+		)
+
+		profiler = ChunkProfiler(enabled=self.profile_chunks)
+		checkpoint = self._open_checkpoint(
+			record_id=record_id,
+			cond_image=cond_image,
+			audio_path=source_audio,
+			base_seed=base_seed,
+			use_face_crop=use_face_crop,
+			audio_encode_mode=audio_encode_mode,
+		)
+
+		def _render(on_chunk: Callable[[torch.Tensor], None]) -> int:
+			return self._render_chunks(
+				cond_image=cond_image,
+				base_seed=base_seed,
+				use_face_crop=use_face_crop,
+				audio_path=source_audio,
+				audio_encode_mode=audio_encode_mode,
+				on_chunk=on_chunk,
+				profiler=profiler,
+				checkpoint=checkpoint,
+			)
+
+		with self._keep_checkpoint_on_error(checkpoint):
+			out_path = output_root / f"record_{record_id}_{uuid4().hex}_composited.mp4"
+			with CompositingVideoWriter(
+				video_path=out_path,
+				audio_path=source_audio,
+				fps=int(self.infer_params["tgt_fps"]),
+				background_path=background,
+				target_duration=float(librosa.get_duration(path=str(source_audio))),
+				spec=composition,
+				max_pending_chunks=max_pending_chunks,
+				profiler=profiler,
+			) as writer:
+				_render(writer.write)
+			logger.info(
+				"SoulX render-final complete (chunks={}, frames={}, total_kbps={}, bytes_written={})",
+				writer.chunks_written,
+				writer.frames_written,
+				writer.total_kbps,
+				writer.bytes_written,
+			)
+			self._finish_checkpoint(checkpoint)
+			self._log_profile(record_id, profiler)
+			return str(out_path)
+
+	def _prepare_job(
+		self,
+		*,
+		cond_image_path: str,
+		audio_path: str,
+		output_dir: str,
+		audio_encode_mode: str,
+	) -> tuple[Path, Path, Path]:
 		cond_image = Path(cond_image_path)
 		source_audio = Path(audio_path)
 		if not cond_image.exists():
@@ -153,29 +295,222 @@ class SoulXRuntime:
 
 		output_root = Path(output_dir)
 		output_root.mkdir(parents=True, exist_ok=True)
+		return cond_image, source_audio, output_root
 
-		with _pushd(self.vendor_root):
-			self.flash_inference.get_base_data(
-				self.pipeline,
-				cond_image_path_or_dir=str(cond_image),
-				base_seed=base_seed,
-				use_face_crop=use_face_crop,
+	def _load_base_data(self, cond_image: Path, *, base_seed: int, use_face_crop: bool) -> None:
+		key = BaseDataKey.for_image(cond_image, base_seed=base_seed, use_face_crop=use_face_crop)
+
+		def _compute() -> None:
+			self.backend.get_base_data(cond_image, base_seed=base_seed, use_face_crop=use_face_crop)
+
+		hit = self.base_data_cache.load(self.pipeline, key, _compute)
+		logger.info(
+			"SoulX base data {} (cond_image={}, hits={}, misses={}, cached_avatars={})",
+			"cache hit" if hit else "computed",
+			cond_image,
+			self.base_data_cache.hits,
+			self.base_data_cache.misses,
+			len(self.base_data_cache),
+		)
+
+	def _open_checkpoint(
+		self,
+		*,
+		record_id: int,
+		cond_image: Path,
+		audio_path: Path,
+		base_seed: int,
+		use_face_crop: bool,
+		audio_encode_mode: str,
+	) -> ChunkCheckpoint | None:
+		if self.checkpoint_root is None:
+			return None
+		cleanup_stale_checkpoints(self.checkpoint_root, max_age_sec=self.checkpoint_max_age_sec)
+		key = checkpoint_key(
+			audio_path,
+			cond_image_sha256=BaseDataKey.for_image(
+				cond_image, base_seed=base_seed, use_face_crop=use_face_crop
+			).image_sha256,
+			base_seed=base_seed,
+			use_face_crop=use_face_crop,
+			audio_encode_mode=audio_encode_mode,
+			backend=self.backend.identity(),
+			infer_params={name: self.infer_params[name] for name in sorted(self.infer_params)},
+		)
+		checkpoint = ChunkCheckpoint(
+			self.checkpoint_root,
+			record_id=record_id,
+			key=key,
+			flush_interval_sec=self.checkpoint_interval_sec,
+		)
+		if checkpoint.completed_chunks:
+			logger.info(
+				"Resuming SoulX job for record {} from chunk {} ({})",
+				record_id,
+				checkpoint.completed_chunks,
+				checkpoint.work_dir,
 			)
+		return checkpoint
 
-		generated_frames = self._run_inference(source_audio, audio_encode_mode)
-		if not generated_frames:
-			raise RuntimeError("SoulX produced no video chunks from the provided audio")
+	@staticmethod
+	@contextmanager
+	def _keep_checkpoint_on_error(checkpoint: ChunkCheckpoint | None) -> Iterator[None]:
+		"""On failure, flush the chunks finished so far so the redelivered job resumes from them."""
+		try:
+			yield
+		except BaseException:
+			if checkpoint is not None:
+				checkpoint.close()
+			raise
 
-		out_path = output_root / f"record_{record_id}_{uuid4().hex}_soulx.mp4"
-		self._save_video(
-			frames_list=generated_frames,
-			video_path=out_path,
-			audio_path=source_audio,
-			fps=int(self.infer_params["tgt_fps"]),
+	@staticmethod
+	def _finish_checkpoint(checkpoint: ChunkCheckpoint | None) -> None:
+		# The final MP4 exists now; a redelivery would start a fresh job anyway.
+		if checkpoint is not None:
+			checkpoint.discard()
+
+	@staticmethod
+	def _resume_checkpoint(
+		checkpoint: ChunkCheckpoint | None,
+		on_chunk: Callable[[torch.Tensor], None],
+	) -> tuple[int, dict[str, Any]]:
+		"""Replay finished chunks into `on_chunk`; return the next chunk index and the state to restore."""
+		if checkpoint is None or not checkpoint.completed_chunks:
+			return 0, {}
+		state = checkpoint.load_state()
+		for frames in checkpoint.iter_chunks():
+			on_chunk(frames)
+		return checkpoint.completed_chunks, state
+
+	@staticmethod
+	def _checkpointing(
+		on_chunk: Callable[[torch.Tensor], None],
+		checkpoint: ChunkCheckpoint | None,
+		carried_state: Callable[[], dict[str, Any]],
+	) -> Callable[[torch.Tensor], None]:
+		if checkpoint is None:
+			return on_chunk
+
+		def _save_then_forward(video: torch.Tensor) -> None:
+			checkpoint.save(checkpoint.completed_chunks, video, carried_state())
+			on_chunk(video)
+
+		return _save_then_forward
+
+	def _carried_state(self) -> dict[str, Any]:
+		"""Pipeline attributes that carry over from one chunk to the next.
+
+		That is the avatar base data plus any tensor stored directly on the
+		pipeline (motion frames, latents); model weights live inside modules and
+		are skipped.
+		"""
+		names = set(self.base_data_cache.state_names)
+		names.update(name for name, value in vars(self.pipeline).items() if isinstance(value, torch.Tensor))
+		return {name: getattr(self.pipeline, name) for name in names}
+
+	def _render_chunks(
+		self,
+		*,
+		cond_image: Path,
+		base_seed: int,
+		use_face_crop: bool,
+		audio_path: Path,
+		audio_encode_mode: str,
+		on_chunk: Callable[[torch.Tensor], None],
+		profiler: ChunkProfiler,
+		checkpoint: ChunkCheckpoint | None = None,
+	) -> int:
+		"""Run every chunk of one job and hand each output to `on_chunk`; returns the chunk count.
+
+		With a checkpoint, chunks it already holds are replayed to `on_chunk` first and
+		generation continues from the saved pipeline state; each new chunk is saved
+		before it is handed on.
+		"""
+		if self.scheduler is None:
+			self._load_base_data(cond_image, base_seed=base_seed, use_face_crop=use_face_crop)
+			start_chunk, state = self._resume_checkpoint(checkpoint, on_chunk)
+			restore_state(self.pipeline, state, clone=False)
+			emit = self._checkpointing(on_chunk, checkpoint, self._carried_state)
+			chunk_count = start_chunk
+			with self._prefetch_audio_embeddings(audio_path, audio_encode_mode, profiler, start_chunk) as embeddings:
+				for chunk_idx, audio_embedding in enumerate(embeddings, start=start_chunk):
+					emit(self._run_pipeline(audio_embedding, chunk_idx, profiler))
+					chunk_count += 1
+			return chunk_count
+
+		start_chunk = 0
+		job_state: _BatchedJobState | None = None
+
+		def _setup() -> tuple[_BatchedJobState, Iterator[torch.Tensor]]:
+			# Runs on the scheduler thread, which owns all pipeline access.
+			nonlocal job_state, start_chunk
+			self._load_base_data(cond_image, base_seed=base_seed, use_face_crop=use_face_crop)
+			job_state = _BatchedJobState(
+				pipeline_state={name: getattr(self.pipeline, name) for name in self.base_data_cache.state_names},
+				profiler=profiler,
+			)
+			start_chunk, state = self._resume_checkpoint(checkpoint, on_chunk)
+			job_state.pipeline_state.update(state)
+			# No producer thread here: the embedding model lives on `self.pipeline`, which
+			# only the scheduler thread may touch while other jobs load their base data.
+			return job_state, self._prefetch_audio_embeddings(
+				audio_path, audio_encode_mode, profiler, start_chunk, depth=0
+			)
+
+		def _job_pipeline_state() -> dict[str, Any]:
+			assert job_state is not None
+			return job_state.pipeline_state
+
+		new_chunks = self.scheduler.run_job(_setup, self._checkpointing(on_chunk, checkpoint, _job_pipeline_state))
+		return start_chunk + new_chunks
+
+	def _run_batch(self, requests: Sequence[ChunkRequest]) -> list[torch.Tensor]:
+		"""Scheduler hook: stack one chunk per job on dim 0 and render them in one forward pass.
+
+		Each job's carried state travels in its `_BatchedJobState`, so the pipeline
+		object is never swapped; the backend returns every job's next state.
+		"""
+		jobs: list[_BatchedJobState] = [request.state for request in requests]
+		audio_embeddings = torch.cat([request.audio_embedding for request in requests], dim=0)
+		with ExitStack() as stack:
+			for job in jobs:
+				stack.enter_context(job.profiler.measure("pipeline", sync=True))
+			videos, states = self.backend.run_pipeline_batch(audio_embeddings, [job.pipeline_state for job in jobs])
+		with ExitStack() as stack:
+			for job in jobs:
+				stack.enter_context(job.profiler.measure("d2h"))
+			videos = videos.cpu()
+		for job, state in zip(jobs, states):
+			job.pipeline_state.update(state)
+		logger.debug("SoulX generated a batch of {} chunk(s)", len(requests))
+		return list(videos.unbind(0))
+
+	def _prefetch_audio_embeddings(
+		self,
+		audio_path: Path,
+		audio_encode_mode: str,
+		profiler: ChunkProfiler,
+		start_chunk: int = 0,
+		depth: int | None = None,
+	) -> EmbeddingPrefetcher:
+		"""Embed upcoming audio windows on a producer thread while the current chunk renders.
+
+		Each window's embedding depends only on the audio, never on the previous video
+		chunk, so up to `embedding_lookahead` of them are computed ahead of `run_pipeline`.
+		`depth` overrides that lookahead; 0 embeds inline on the caller's thread.
+		"""
+		return EmbeddingPrefetcher(
+			self._iter_audio_embeddings(audio_path, audio_encode_mode, profiler, start_chunk),
+			depth=self.embedding_lookahead if depth is None else depth,
 		)
-		return str(out_path)
 
-	def _run_inference(self, audio_path: Path, audio_encode_mode: str) -> list[torch.Tensor]:
+	def _iter_audio_embeddings(
+		self,
+		audio_path: Path,
+		audio_encode_mode: str,
+		profiler: ChunkProfiler,
+		start_chunk: int = 0,
+	) -> Iterator[torch.Tensor]:
 		sample_rate = int(self.infer_params["sample_rate"])
 		tgt_fps = int(self.infer_params["tgt_fps"])
 		cached_audio_duration = int(self.infer_params["cached_audio_duration"])
@@ -187,24 +522,23 @@ class SoulXRuntime:
 		if audio_array_all.size == 0:
 			raise RuntimeError("Input TTS audio is empty")
 
-		generated_list: list[torch.Tensor] = []
 		if audio_encode_mode == "once":
-			audio_embedding_all = self.flash_inference.get_audio_embedding(self.pipeline, audio_array_all)
+			with profiler.measure("embedding", sync=True):
+				audio_embedding_all = self.backend.get_audio_embedding(audio_array_all)
 			total_frames = int(audio_embedding_all.shape[1])
 			if total_frames < frame_num:
-				return generated_list
+				return
 			chunk_count = 1 + (total_frames - frame_num) // slice_len
-			for chunk_idx in range(chunk_count):
+			for chunk_idx in range(start_chunk, chunk_count):
 				start = chunk_idx * slice_len
 				end = start + frame_num
-				audio_embedding_chunk = audio_embedding_all[:, start:end].contiguous()
-				generated_list.append(self._run_pipeline(audio_embedding_chunk, chunk_idx))
-			return generated_list
+				yield audio_embedding_all[:, start:end].contiguous()
+			return
 
 		cached_audio_length_sum = sample_rate * cached_audio_duration
 		audio_end_idx = cached_audio_duration * tgt_fps
 		audio_start_idx = audio_end_idx - frame_num
-		audio_dq = deque([0.0] * cached_audio_length_sum, maxlen=cached_audio_length_sum)
+		audio_window = AudioWindow(cached_audio_length_sum)
 
 		human_speech_array_slice_len = max(1, slice_len * sample_rate // tgt_fps)
 		clipped = audio_array_all[
@@ -214,58 +548,61 @@ class SoulXRuntime:
 			clipped = np.pad(audio_array_all, (0, human_speech_array_slice_len - len(audio_array_all)))
 		speech_slices = clipped.reshape(-1, human_speech_array_slice_len)
 
-		for chunk_idx, speech_slice in enumerate(speech_slices):
-			audio_dq.extend(speech_slice.tolist())
-			audio_array = np.array(audio_dq)
-			audio_embedding = self.flash_inference.get_audio_embedding(
-				self.pipeline,
-				audio_array,
-				audio_start_idx,
-				audio_end_idx,
-			)
-			generated_list.append(self._run_pipeline(audio_embedding, chunk_idx))
-		return generated_list
-
-	def _run_pipeline(self, audio_embedding: torch.Tensor, chunk_idx: int) -> torch.Tensor:
-		if torch.cuda.is_available():
-			torch.cuda.synchronize()
-		video = self.flash_inference.run_pipeline(self.pipeline, audio_embedding)
-		if torch.cuda.is_available():
-			torch.cuda.synchronize()
+		# Resumed jobs only need the window contents, not embeddings, for chunks already done.
+		for speech_slice in speech_slices[:start_chunk]:
+			audio_window.push(speech_slice)
+
+		for speech_slice in speech_slices[start_chunk:]:
+			with profiler.measure("embedding", sync=True):
+				audio_window.push(speech_slice)
+				audio_embedding = self.backend.get_audio_embedding(
+					audio_window.view(),
+					audio_start_idx,
+					audio_end_idx,
+				)
+			yield audio_embedding
+
+	def _run_pipeline(
+		self,
+		audio_embedding: torch.Tensor,
+		chunk_idx: int,
+		profiler: ChunkProfiler | None = None,
+	) -> torch.Tensor:
+		# No explicit device syncs here: `.cpu()` already waits for this chunk's kernels,
+		# and syncing earlier would stall CPU-side prep of the next window. The profiler
+		# syncs around each stage only when S4_PROFILE_CHUNKS is on.
+		profiler = profiler or ChunkProfiler(enabled=False)
+		with profiler.measure("pipeline", sync=True):
+			video = self.backend.run_pipeline(audio_embedding)
+		with profiler.measure("d2h"):
+			video = video.cpu()
 		logger.debug("SoulX generated chunk {}", chunk_idx)
-		return video.cpu()
+		return video
+
+	@staticmethod
+	def _log_profile(record_id: int, profiler: ChunkProfiler) -> None:
+		if not profiler.enabled:
+			return
+		logger.bind(event="chunk_profile", stage="s4", record_id=record_id).info(
+			"SoulX chunk profile for record {}:\n{}",
+			record_id,
+			profiler.histogram(),
+		)
 
 	@staticmethod
-	def _save_video(frames_list: list[torch.Tensor], video_path: Path, audio_path: Path, fps: int) -> None:
-		temp_video_path = video_path.with_name(video_path.stem + "_tmp.mp4")
-		with imageio.get_writer(
-			str(temp_video_path),
-			format="mp4",
-			mode="I",
+	def _save_video(
+		frames_list: list[torch.Tensor],
+		video_path: Path,
+		audio_path: Path,
+		fps: int,
+		profiler: ChunkProfiler | None = None,
+	) -> None:
+		with StreamingVideoWriter(
+			video_path=video_path,
+			audio_path=audio_path,
 			fps=fps,
-			codec="h264",
-			ffmpeg_params=["-bf", "0"],
+			expected_duration_sec=float(librosa.get_duration(path=str(audio_path))),
+			profiler=profiler,
 		) as writer:
 			for frames in frames_list:
-				np_frames = frames.numpy().astype(np.uint8)
-				for idx in range(np_frames.shape[0]):
-					writer.append_data(np_frames[idx])
-
-		cmd = [
-			"ffmpeg",
-			"-i",
-			str(temp_video_path),
-			"-i",
-			str(audio_path),
-			"-c:v",
-			"copy",
-			"-c:a",
-			"aac",
-			"-shortest",
-			str(video_path),
-			"-y",
-		]
-		result = subprocess.run(cmd, capture_output=True, text=True)
-		if result.returncode != 0:
-			raise RuntimeError(f"ffmpeg merge failed: {result.stderr}")
-		temp_video_path.unlink(missing_ok=True)
+				writer.write(frames)
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import torch
+from loguru import logger
+from media import RawVideoPipe, progress_logger, rawvideo_input_args, temp_path_for
+
+from inference_engine.profiling import ChunkProfiler
+
+_STOP = object()
+_STDERR_TAIL_LINES = 50
+# A write or close blocked this long without an ffmpeg progress report means a hung encoder.
+_STALL_TIMEOUT_SEC = 120.0
+
+
+class StreamingVideoWriter:
+	"""Encode SoulX chunks on a background thread while inference keeps running.
+
+	Map:
+	1) `write()` hands a chunk to a bounded queue (blocks when the encoder lags,
+	   so at most `max_pending_chunks` chunks live in host memory at once).
+	2) On the first chunk the encoder thread starts a single ffmpeg process that
+	   reads raw RGB frames on stdin, takes the TTS audio as a second input and
+	   writes the final muxed MP4 to a hidden temp file next to `video_path`.
+	3) Each chunk is converted to uint8 and piped to ffmpeg.
+	4) `close()` drains the queue, closes stdin, waits for ffmpeg to finish and
+	   renames the temp file to `video_path`; a failed encode leaves nothing there.
+
+	ffmpeg reports progress while it runs. It is killed if a write or `close()`
+	sees no progress for `_STALL_TIMEOUT_SEC`, or if `close()` outlasts the
+	watchdog deadline for the part of `expected_duration_sec` (the TTS audio
+	length) not yet encoded when stdin closed.
+	"""
+
+	# Subclasses whose ffmpeg command caps output with `-t` may see stdin close early.
+	stops_at_target_duration = False
+
+	def __init__(
+		self,
+		*,
+		video_path: Path,
+		audio_path: Path,
+		fps: int,
+		expected_duration_sec: float | None = None,
+		max_pending_chunks: int = 2,
+		profiler: ChunkProfiler | None = None,
+	) -> None:
+		self.video_path = video_path
+		self.audio_path = audio_path
+		self.fps = fps
+		self.expected_duration_sec = expected_duration_sec
+		self.frames_written = 0
+		self.chunks_written = 0
+		self.profiler = profiler or ChunkProfiler(enabled=False)
+
+		self._output_path = temp_path_for(video_path)
+		self._pipe: RawVideoPipe | None = None
+		self._queue: queue.Queue[Any] = queue.Queue(maxsize=max(1, max_pending_chunks))
+		self._error: BaseException | None = None
+		self._output_complete = False
+		self._closed = False
+		self._thread = threading.Thread(target=self._encode_loop, name="soulx-encoder", daemon=True)
+		self._thread.start()
+
+	def __enter__(self) -> StreamingVideoWriter:
+		return self
+
+	def __exit__(self, exc_type, exc, tb) -> None:
+		if exc_type is None:
+			self.close()
+		else:
+			self.abort()
+
+	@property
+	def bytes_written(self) -> int:
+		return self.video_path.stat().st_size if self.video_path.exists() else 0
+
+	def write(self, frames: torch.Tensor) -> None:
+		self._raise_if_failed()
+		self._put(frames)
+
+	def close(self) -> None:
+		if self._closed:
+			return
+		self._closed = True
+		self._put(_STOP)
+		self._thread.join()
+		try:
+			self._raise_if_failed()
+			if self._pipe is None:
+				raise RuntimeError("SoulX produced no video chunks from the provided audio")
+			self._pipe.close()
+			os.replace(self._output_path, self.video_path)
+		except BaseException:
+			if self._pipe is not None:
+				self._pipe.kill()
+			raise
+		finally:
+			self._output_path.unlink(missing_ok=True)
+
+	def abort(self) -> None:
+		if not self._closed:
+			self._closed = True
+			self._drain_queue()
+			self._put(_STOP)
+			self._thread.join()
+		if self._pipe is not None:
+			self._pipe.kill()
+		self._output_path.unlink(missing_ok=True)
+
+	def _put(self, item: Any) -> None:
+		# Poll so a dead encoder thread cannot leave the producer blocked on a full queue.
+		while True:
+			try:
+				self._queue.put(item, timeout=0.5)
+				return
+			except queue.Full:
+				if item is not _STOP:
+					self._raise_if_failed()
+				elif not self._thread.is_alive():
+					return
+
+	def _raise_if_failed(self) -> None:
+		if self._error is not None:
+			raise RuntimeError(f"SoulX encoder thread failed: {self._error}") from self._error
+
+	def _drain_queue(self) -> None:
+		while True:
+			try:
+				self._queue.get_nowait()
+			except queue.Empty:
+				return
+
+	def _build_command(self, height: int, width: int) -> list[str]:
+		cmd = [
+			"ffmpeg",
+			"-y",
+			"-loglevel",
+			"error",
+			*rawvideo_input_args(width=width, height=height, fps=self.fps),
+			"-i",
+			str(self.audio_path),
+			"-map",
+			"0:v:0",
+			"-map",
+			"1:a:0",
+		]
+		if width % 2 or height % 2:
+			# yuv420p needs even dimensions.
+			cmd += ["-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2"]
+		cmd += [
+			"-c:v",
+			"libx264",
+			"-pix_fmt",
+			"yuv420p",
+			"-bf",
+			"0",
+			"-c:a",
+			"aac",
+			"-shortest",
+			str(self._output_path),
+		]
+		return cmd
+
+	def _start_pipe(self, height: int, width: int) -> RawVideoPipe:
+		return RawVideoPipe(
+			self._build_command(height, width),
+			what="ffmpeg encode",
+			stderr_tail_lines=_STDERR_TAIL_LINES,
+			expected_duration_sec=self.expected_duration_sec,
+			stall_timeout_sec=_STALL_TIMEOUT_SEC,
+			on_progress=progress_logger("S4 encode", expected_duration_sec=self.expected_duration_sec),
+		)
+
+	def _encode_loop(self) -> None:
+		try:
+			while True:
+				frames = self._queue.get()
+				if frames is _STOP:
+					break
+				if self._output_complete:
+					continue
+				with self.profiler.measure("encode"):
+					np_frames = np.ascontiguousarray(frames.numpy().astype(np.uint8))
+					if self._pipe is None:
+						self._pipe = self._start_pipe(np_frames.shape[1], np_frames.shape[2])
+					try:
+						self._pipe.write(np_frames)
+					except BrokenPipeError:
+						if not self.stops_at_target_duration:
+							raise
+						# ffmpeg reached its `-t` limit; later frames fall outside the output.
+						self._output_complete = True
+						continue
+				self.frames_written += np_frames.shape[0]
+				self.chunks_written += 1
+				logger.debug("SoulX encoded chunk {} ({} frames)", self.chunks_written - 1, np_frames.shape[0])
+		except BaseException as exc:  # noqa: BLE001 - surfaced to the producer via _raise_if_failed
+			if isinstance(exc, BrokenPipeError):
+				exc = RuntimeError(f"ffmpeg exited early: {self._pipe.stderr_tail if self._pipe else ''}")
+			self._error = exc
+			self._drain_queue()
+		finally:
+			if self._pipe is not None:
+				self._pipe.close_stdin()
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
-import os
 from typing import Any
 
 import dramatiq
+from core.durability import make_durable
 from core.logging import configure_service_logger, get_logger
 from dramatiq.brokers.rabbitmq import RabbitmqBroker
+from storage import ArtifactStore
 
+from inference_engine.backends import build_backend
+from inference_engine.render_final import CompositionSpec
 from inference_engine.settings import get_settings
 from inference_engine.soulx_runtime import SoulXRuntime
 
@@ -19,21 +22,39 @@ _url_parts = settings.rabbitmq_url.split("@")
 _masked_url = _url_parts[-1] if len(_url_parts) > 1 else settings.rabbitmq_url
 
 logger.bind(event="worker_init", stage="s4").info(
-    "Initializing s4-inference-engine worker (broker={}, current_queue={}, downstream_queue={}, model_type={})",
+    "Initializing s4-inference-engine worker (broker={}, current_queue={}, downstream_queue={}, backend={}, model_type={}, render_final={})",
     _masked_url,
     settings.current_queue,
-    settings.downstream_queue,
+    settings.render_final_downstream_queue if settings.render_final_enabled else settings.downstream_queue,
+    settings.backend,
     settings.model_type,
+    settings.render_final_enabled,
 )
 
 broker = RabbitmqBroker(url=settings.rabbitmq_url)
 dramatiq.set_broker(broker)
 broker.declare_queue(settings.current_queue, ensure=True)
 
+artifact_store = ArtifactStore(settings.artifact_store_dir) if settings.artifact_store_enabled else None
+
 runtime = SoulXRuntime(
-    flashhead_ckpt_dir=settings.flashhead_ckpt_dir,
-    wav2vec_dir=settings.wav2vec_dir,
-    model_type=settings.model_type,
+    backend=build_backend(
+        settings.backend,
+        flashhead_ckpt_dir=settings.flashhead_ckpt_dir,
+        wav2vec_dir=settings.wav2vec_dir,
+        model_type=settings.model_type,
+        base_data_attrs=tuple(name.strip() for name in settings.base_data_attrs.split(",") if name.strip()) or None,
+        synthetic_chunk_latency_ms=settings.synthetic_chunk_latency_ms,
+        synthetic_embedding_latency_ms=settings.synthetic_embedding_latency_ms,
+        synthetic_frame_size=settings.synthetic_frame_size,
+    ),
+    base_data_cache_size=settings.base_data_cache_size,
+    batch_max_jobs=settings.batch_max_jobs,
+    profile_chunks=settings.profile_chunks,
+    embedding_lookahead=settings.embedding_lookahead,
+    checkpoint_dir=settings.checkpoint_dir if settings.checkpoint_enabled else None,
+    checkpoint_max_age_sec=settings.checkpoint_max_age_hours * 3600,
+    checkpoint_interval_sec=settings.checkpoint_interval_sec,
 )
 
 if settings.startup_prewarm_enabled:
@@ -76,6 +97,64 @@ def _enqueue_downstream(
     broker.enqueue(message)
 
 
+def _render_final(
+    settings: Any,
+    job_logger: Any,
+    record_id: int,
+    table_id: str,
+    douyin_video_path: str,
+    tts_audio_path: str,
+) -> None:
+    composited_video_path = runtime.render_final(
+        record_id=record_id,
+        cond_image_path=settings.cond_image_path,
+        audio_path=tts_audio_path,
+        background_video_path=douyin_video_path,
+        output_dir=settings.render_final_output_dir,
+        base_seed=settings.base_seed,
+        use_face_crop=settings.use_face_crop,
+        audio_encode_mode=settings.audio_encode_mode,
+        composition=CompositionSpec(
+            scale_ratio=settings.overlay_scale_ratio,
+            margin_x=settings.overlay_margin_x,
+            margin_y=settings.overlay_margin_y,
+            x264_preset=settings.x264_preset,
+            x264_crf=settings.x264_crf,
+            target_total_bitrate_mbps=settings.target_total_bitrate_mbps,
+            min_total_bitrate_mbps=settings.min_total_bitrate_mbps,
+            bitrate_step_kbps=settings.bitrate_step_kbps,
+            audio_bitrate_kbps=settings.audio_bitrate_kbps,
+            max_output_size_mb=settings.max_output_size_mb,
+        ),
+        max_pending_chunks=settings.stream_encode_max_pending_chunks,
+    )
+    if artifact_store is not None:
+        composited_video_path = str(
+            artifact_store.put_file(composited_video_path, table_id=table_id, record_id=record_id, name="s4-composited")
+        )
+    make_durable(composited_video_path, level=settings.durability)
+    job_logger.bind(
+        event="composition_completed",
+        output_path=composited_video_path,
+        base_data_cache_hits=runtime.base_data_cache.hits,
+        base_data_cache_misses=runtime.base_data_cache.misses,
+    ).info("SoulX render-final complete")
+
+    # Skip s5/s6 and hand the final video straight to s7-storage-uploader
+    broker = dramatiq.get_broker()
+    message = dramatiq.Message(
+        queue_name=settings.render_final_downstream_queue,
+        actor_name=settings.render_final_downstream_actor,
+        args=[record_id, table_id, composited_video_path],
+        kwargs={},
+        options={},
+    )
+    broker.enqueue(message)
+    job_logger.bind(event="downstream_enqueued", queue=settings.render_final_downstream_queue).info(
+        "Enqueued downstream message"
+    )
+
+
 @dramatiq.actor(actor_name="s4_inference_engine.ping", queue_name=settings.current_queue)
 def ping() -> None:
     logger.bind(event="ping", stage="s4", queue=settings.current_queue).info("Worker ping")
@@ -111,6 +190,10 @@ def process(
         )
 
     try:
+        if settings.render_final_enabled:
+            _render_final(settings, job_logger, record_id, table_id, douyin_video_path, tts_audio_path)
+            return
+
         inference_video_path = runtime.generate(
             record_id=record_id,
             cond_image_path=settings.cond_image_path,
@@ -119,11 +202,21 @@ def process(
             base_seed=settings.base_seed,
             use_face_crop=settings.use_face_crop,
             audio_encode_mode=settings.audio_encode_mode,
+            stream_encode=settings.stream_encode_enabled,
+            max_pending_chunks=settings.stream_encode_max_pending_chunks,
         )
-
-        job_logger.bind(event="inference_completed", inference_video_path=inference_video_path).info(
-            "SoulX inference complete"
-        )
+        if artifact_store is not None:
+            inference_video_path = str(
+                artifact_store.put_file(inference_video_path, table_id=table_id, record_id=record_id, name="s4-inference")
+            )
+        make_durable(inference_video_path, level=settings.durability)
+
+        job_logger.bind(
+            event="inference_completed",
+            inference_video_path=inference_video_path,
+            base_data_cache_hits=runtime.base_data_cache.hits,
+            base_data_cache_misses=runtime.base_data_cache.misses,
+        ).info("SoulX inference complete")
 
         # Enqueue for downstream (s5-broll-selector)
         _enqueue_downstream(
@@ -141,8 +234,6 @@ def process(
     except Exception:
         job_logger.bind(event="job_failed").exception("Failed SoulX inference")
         raise
-    finally:
-        os.sync() if hasattr(os, "sync") else None
 
 
 logger.bind(event="worker_started", stage="s4").info(
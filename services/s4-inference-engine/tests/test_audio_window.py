@@ -0,0 +1,35 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+from inference_engine.audio_window import AudioWindow
+
+
+def test_audio_window_matches_deque_reference():
+    rng = np.random.default_rng(0)
+    window = AudioWindow(1000)
+    reference = deque([0.0] * 1000, maxlen=1000)
+
+    for size in (1, 7, 333, 999, 1000, 1500, 250, 250, 250, 250, 3):
+        chunk = rng.standard_normal(size).astype(np.float32)
+        window.push(chunk)
+        reference.extend(chunk.tolist())
+        np.testing.assert_array_equal(window.view(), np.array(reference, dtype=np.float32))
+
+
+def test_audio_window_view_is_contiguous_float32_and_read_only():
+    window = AudioWindow(16)
+    window.push(np.arange(5, dtype=np.float64))
+    view = window.view()
+
+    assert view.dtype == np.float32
+    assert view.flags.c_contiguous
+    assert view.shape == (16,)
+    with pytest.raises(ValueError):
+        view[0] = 1.0
+
+
+def test_audio_window_rejects_empty_length():
+    with pytest.raises(ValueError):
+        AudioWindow(0)
@@ -0,0 +1,268 @@
+import shutil
+import threading
+import wave
+
+import numpy as np
+import pytest
+import torch
+
+from inference_engine.backends import SyntheticBackend, build_backend
+from inference_engine.checkpoint import ChunkCheckpoint
+from inference_engine.profiling import ChunkProfiler
+from inference_engine.soulx_runtime import SoulXRuntime
+
+
+def _write_wav(path, seconds: float, sample_rate: int = 16000) -> None:
+    samples = (np.sin(np.arange(int(seconds * sample_rate)) / 20) * 8000).astype(np.int16)
+    with wave.open(str(path), "wb") as handle:
+        handle.setnchannels(1)
+        handle.setsampwidth(2)
+        handle.setframerate(sample_rate)
+        handle.writeframes(samples.tobytes())
+
+
+@pytest.fixture
+def job_files(tmp_path):
+    cond_image = tmp_path / "avatar.png"
+    cond_image.write_bytes(b"not-really-a-png")
+    audio = tmp_path / "tts.wav"
+    _write_wav(audio, seconds=2.5)
+    return cond_image, audio
+
+
+def _render(runtime: SoulXRuntime, cond_image, audio, mode: str, checkpoint=None) -> list[torch.Tensor]:
+    chunks: list[torch.Tensor] = []
+    runtime._render_chunks(
+        cond_image=cond_image,
+        base_seed=42,
+        use_face_crop=False,
+        audio_path=audio,
+        audio_encode_mode=mode,
+        on_chunk=chunks.append,
+        profiler=ChunkProfiler(enabled=False),
+        checkpoint=checkpoint,
+    )
+    return chunks
+
+
+def test_synthetic_backend_produces_soulx_shaped_tensors(tmp_path):
+    backend = SyntheticBackend(chunk_latency_sec=0, embedding_latency_sec=0, frame_size=32)
+    cond_image = tmp_path / "avatar.png"
+    cond_image.write_bytes(b"avatar")
+    backend.get_base_data(cond_image, base_seed=42, use_face_crop=False)
+
+    window = np.zeros(16000 * 8, dtype=np.float32)
+    assert backend.get_audio_embedding(window, 167, 200).shape == (1, 33, 768)
+    assert backend.get_audio_embedding(np.zeros(16000 * 2, dtype=np.float32)).shape == (1, 50, 768)
+
+    frames = backend.run_pipeline(torch.zeros(1, 33, 768))
+    assert frames.shape == (28, 32, 32, 3)
+    assert frames.dtype == torch.uint8
+    assert int(backend.pipeline.motion_frames[0]) == 1
+
+
+def test_synthetic_backend_batch_matches_serial_chunks(tmp_path):
+    states, expected = [], []
+    for job_id in range(2):
+        backend = SyntheticBackend(chunk_latency_sec=0, embedding_latency_sec=0, frame_size=16)
+        cond_image = tmp_path / f"avatar_{job_id}.png"
+        cond_image.write_bytes(f"avatar-{job_id}".encode())
+        backend.get_base_data(cond_image, base_seed=42, use_face_crop=False)
+        backend.pipeline.motion_frames = backend.pipeline.motion_frames + job_id
+        states.append({name: getattr(backend.pipeline, name) for name in backend.base_data_attrs})
+        expected.append(backend.run_pipeline(torch.zeros(1, 33, 768)))
+
+    batched = SyntheticBackend(chunk_latency_sec=0, embedding_latency_sec=0, frame_size=16)
+    frames, next_states = batched.run_pipeline_batch(torch.zeros(2, 33, 768), states)
+
+    assert frames.shape == (2, 28, 16, 16, 3)
+    for job_id in range(2):
+        assert torch.equal(frames[job_id], expected[job_id])
+        assert int(next_states[job_id]["motion_frames"][0]) == job_id + 1
+    assert batched.pipeline.ref_color is None
+    with pytest.raises(ValueError, match="2 embeddings for 1 job"):
+        batched.run_pipeline_batch(torch.zeros(2, 33, 768), states[:1])
+
+
+@pytest.mark.parametrize("mode", ["stream", "once"])
+def test_runtime_renders_chunks_on_synthetic_backend(job_files, mode):
+    cond_image, audio = job_files
+    runtime = SoulXRuntime(backend=SyntheticBackend(chunk_latency_sec=0, embedding_latency_sec=0, frame_size=16))
+
+    chunks = _render(runtime, cond_image, audio, mode)
+
+    # 2.5 s of audio at 25 fps, 28 new frames per chunk.
+    assert len(chunks) == 2
+    assert all(chunk.shape == (28, 16, 16, 3) for chunk in chunks)
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_runtime_resume_from_checkpoint_matches_uninterrupted_run(job_files, tmp_path):
+    cond_image, audio = job_files
+    _write_wav(audio, seconds=5.0)
+    backend = SyntheticBackend(chunk_latency_sec=0, embedding_latency_sec=0, frame_size=16)
+    expected = _render(SoulXRuntime(backend=backend), cond_image, audio, "stream")
+    assert len(expected) == 4
+
+    checkpoint_root = tmp_path / "checkpoints"
+    interrupted = ChunkCheckpoint(checkpoint_root, record_id=1, key="f" * 64)
+    failing = SoulXRuntime(backend=SyntheticBackend(chunk_latency_sec=0, embedding_latency_sec=0, frame_size=16))
+
+    def _fail_on_third(chunk):
+        if interrupted.completed_chunks == 3:
+            raise RuntimeError("worker killed")
+
+    with pytest.raises(RuntimeError, match="worker killed"):
+        failing._render_chunks(
+            cond_image=cond_image,
+            base_seed=42,
+            use_face_crop=False,
+            audio_path=audio,
+            audio_encode_mode="stream",
+            on_chunk=_fail_on_third,
+            profiler=ChunkProfiler(enabled=False),
+            checkpoint=interrupted,
+        )
+    # What SoulXRuntime.run does when rendering fails, before Dramatiq redelivers.
+    interrupted.close()
+
+    resumed = ChunkCheckpoint(checkpoint_root, record_id=1, key="f" * 64)
+    assert resumed.completed_chunks == 3
+    fresh_runtime = SoulXRuntime(backend=SyntheticBackend(chunk_latency_sec=0, embedding_latency_sec=0, frame_size=16))
+    chunks = _render(fresh_runtime, cond_image, audio, "stream", checkpoint=resumed)
+
+    assert len(chunks) == len(expected)
+    for got, want in zip(chunks, expected):
+        assert torch.equal(got, want)
+
+
+def test_build_backend_rejects_unknown_name():
+    with pytest.raises(ValueError, match="S4_BACKEND"):
+        build_backend("nope", flashhead_ckpt_dir="", wav2vec_dir="", model_type="lite")
+
+
+def test_runtime_base_data_cache_hit_matches_miss(job_files):
+    cond_image, audio = job_files
+
+    def _run(base_data_cache_size: int) -> tuple[list[torch.Tensor], torch.Tensor]:
+        runtime = SoulXRuntime(
+            backend=SyntheticBackend(chunk_latency_sec=0, embedding_latency_sec=0, frame_size=16),
+            base_data_cache_size=base_data_cache_size,
+        )
+        _render(runtime, cond_image, audio, "stream")
+        # Unrelated work between jobs moves the global RNG on.
+        torch.rand(16)
+        frames = _render(runtime, cond_image, audio, "stream")
+        runtime._load_base_data(cond_image, base_seed=42, use_face_crop=False)
+        return frames, torch.get_rng_state()
+
+    hit_frames, hit_rng = _run(base_data_cache_size=4)
+    miss_frames, miss_rng = _run(base_data_cache_size=0)
+
+    assert len(hit_frames) == len(miss_frames)
+    for hit, miss in zip(hit_frames, miss_frames):
+        assert torch.equal(hit, miss)
+    assert torch.equal(hit_rng, miss_rng)
+
+
+def test_runtime_scheduler_path_matches_serial_runs(tmp_path):
+    # Two jobs with different avatars and lengths go through the batch scheduler
+    # together; each must get exactly the frames a serial run produces.
+    jobs = []
+    for job_id, seconds in enumerate((5.0, 2.5)):
+        cond_image = tmp_path / f"avatar_{job_id}.png"
+        cond_image.write_bytes(f"avatar-{job_id}".encode())
+        audio = tmp_path / f"tts_{job_id}.wav"
+        _write_wav(audio, seconds=seconds)
+        jobs.append((cond_image, audio))
+
+    batch_shapes: list[tuple[tuple[int, ...], tuple[int, ...]]] = []
+
+    class _RecordingBackend(SyntheticBackend):
+        def run_pipeline_batch(self, audio_embeddings, states):
+            frames, next_states = super().run_pipeline_batch(audio_embeddings, states)
+            batch_shapes.append((tuple(audio_embeddings.shape), tuple(frames.shape)))
+            return frames, next_states
+
+    def _backend():
+        return _RecordingBackend(chunk_latency_sec=0.01, embedding_latency_sec=0, frame_size=16)
+
+    expected = [_render(SoulXRuntime(backend=_backend()), cond_image, audio, "stream") for cond_image, audio in jobs]
+
+    runtime = SoulXRuntime(backend=_backend(), batch_max_jobs=2)
+    assert runtime.scheduler is not None
+    results: dict[int, list[torch.Tensor]] = {}
+    errors: list[BaseException] = []
+    started = threading.Barrier(len(jobs))
+
+    def _submit(job_id: int) -> None:
+        started.wait()
+        try:
+            results[job_id] = _render(runtime, *jobs[job_id], "stream")
+        except BaseException as exc:  # noqa: BLE001 - surfaced by the assertion below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=_submit, args=(job_id,)) for job_id in range(len(jobs))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+    runtime.scheduler.close()
+
+    assert not errors
+    assert runtime.scheduler.batch_size_counts[2] > 0
+    # Both jobs' chunks go through one forward pass, stacked on dim 0.
+    assert ((2, 33, 768), (2, 28, 16, 16, 3)) in batch_shapes
+    assert sum(embeddings[0] for embeddings, _ in batch_shapes) == sum(len(want) for want in expected)
+    for job_id, want in enumerate(expected):
+        assert len(results[job_id]) == len(want)
+        for got, frames in zip(results[job_id], want):
+            assert torch.equal(got, frames)
+
+
+def test_runtime_without_batch_support_runs_jobs_serially(job_files):
+    cond_image, audio = job_files
+
+    class _SerialOnlyBackend(SyntheticBackend):
+        supports_batching = False
+
+    runtime = SoulXRuntime(
+        backend=_SerialOnlyBackend(chunk_latency_sec=0, embedding_latency_sec=0, frame_size=16),
+        batch_max_jobs=4,
+    )
+
+    assert runtime.scheduler is None
+    assert len(_render(runtime, cond_image, audio, "stream")) == 2
+
+
+def test_runtime_prewarm_then_scheduled_job(job_files):
+    cond_image, audio = job_files
+    runtime = SoulXRuntime(
+        backend=SyntheticBackend(chunk_latency_sec=0, embedding_latency_sec=0, frame_size=16),
+        batch_max_jobs=2,
+    )
+
+    assert runtime.prewarm(cond_image_path=str(cond_image), base_seed=42, use_face_crop=False, duration_sec=1)
+    assert len(_render(runtime, cond_image, audio, "stream")) == 2
+    runtime.scheduler.close()
+
+
+def test_runtime_scheduler_path_embeds_on_scheduler_thread(job_files):
+    cond_image, audio = job_files
+    embedding_threads: set[str] = set()
+
+    class _RecordingBackend(SyntheticBackend):
+        def get_audio_embedding(self, *args, **kwargs):
+            embedding_threads.add(threading.current_thread().name)
+            return super().get_audio_embedding(*args, **kwargs)
+
+    runtime = SoulXRuntime(
+        backend=_RecordingBackend(chunk_latency_sec=0, embedding_latency_sec=0, frame_size=16),
+        batch_max_jobs=2,
+        embedding_lookahead=2,
+    )
+    chunks = _render(runtime, cond_image, audio, "stream")
+    runtime.scheduler.close()
+
+    assert len(chunks) == 2
+    assert embedding_threads == {"s4-batch-scheduler"}
@@ -0,0 +1,136 @@
+import torch
+
+from inference_engine.base_data_cache import BaseDataCache, BaseDataKey
+
+
+class _StubPipeline:
+    def __init__(self):
+        self.weights = torch.ones(2)
+        self.ref_latent = None
+        self.motion_frames = None
+
+
+def _stub_get_base_data(pipeline, avatar: float, calls: list[float]):
+    def _compute():
+        calls.append(avatar)
+        pipeline.ref_latent = torch.full((2,), avatar)
+        pipeline.motion_frames = torch.full((2,), avatar)
+
+    return _compute
+
+
+def _key(name: str) -> BaseDataKey:
+    return BaseDataKey(image_sha256=name, base_seed=42, use_face_crop=False)
+
+
+def test_cache_hit_restores_state_without_recomputing():
+    pipeline = _StubPipeline()
+    cache = BaseDataCache(capacity=2)
+    calls: list[float] = []
+
+    assert cache.load(pipeline, _key("a"), _stub_get_base_data(pipeline, 1.0, calls)) is False
+    # run_pipeline mutates motion frames in place during a job
+    pipeline.motion_frames.add_(5)
+    assert cache.load(pipeline, _key("b"), _stub_get_base_data(pipeline, 2.0, calls)) is False
+    assert cache.load(pipeline, _key("a"), _stub_get_base_data(pipeline, 1.0, calls)) is True
+
+    assert calls == [1.0, 2.0]
+    assert torch.equal(pipeline.ref_latent, torch.full((2,), 1.0))
+    assert torch.equal(pipeline.motion_frames, torch.full((2,), 1.0))
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_cache_evicts_least_recently_used():
+    pipeline = _StubPipeline()
+    cache = BaseDataCache(capacity=2)
+    calls: list[float] = []
+
+    for avatar, name in ((1.0, "a"), (2.0, "b"), (1.0, "a"), (3.0, "c"), (2.0, "b")):
+        cache.load(pipeline, _key(name), _stub_get_base_data(pipeline, avatar, calls))
+
+    assert calls == [1.0, 2.0, 3.0, 2.0]
+    assert len(cache) == 2
+
+
+def test_cache_disabled_always_recomputes():
+    pipeline = _StubPipeline()
+    cache = BaseDataCache(capacity=0)
+    calls: list[float] = []
+
+    for _ in range(3):
+        assert cache.load(pipeline, _key("a"), _stub_get_base_data(pipeline, 1.0, calls)) is False
+
+    assert calls == [1.0, 1.0, 1.0]
+    assert len(cache) == 0
+
+
+def test_cache_snapshots_in_place_writes_and_mutable_state():
+    pipeline = _StubPipeline()
+    pipeline.ref_latent = torch.zeros(2)
+    cache = BaseDataCache(capacity=2)
+
+    def _compute(avatar: float):
+        def _run():
+            # SoulX-style: refill an existing buffer and keep plain-Python metadata
+            pipeline.ref_latent.fill_(avatar)
+            pipeline.crop = {"box": [avatar, avatar]}
+
+        return _run
+
+    assert cache.load(pipeline, _key("a"), _compute(1.0)) is False
+    assert set(cache.state_names) == {"ref_latent", "crop"}
+    pipeline.crop["box"].append(99.0)
+    assert cache.load(pipeline, _key("b"), _compute(2.0)) is False
+    assert cache.load(pipeline, _key("a"), _compute(1.0)) is True
+
+    assert torch.equal(pipeline.ref_latent, torch.full((2,), 1.0))
+    assert pipeline.crop == {"box": [1.0, 1.0]}
+
+
+def test_cache_uses_declared_state_names_and_restores_rng():
+    pipeline = _StubPipeline()
+    cache = BaseDataCache(capacity=2, state_names=("ref_latent",))
+
+    def _compute():
+        torch.manual_seed(7)
+        pipeline.ref_latent = torch.rand(2)
+        pipeline.scratch = torch.ones(1)
+
+    cache.load(pipeline, _key("a"), _compute)
+    expected_rng = torch.get_rng_state()
+    torch.rand(5)
+    assert cache.load(pipeline, _key("a"), _compute) is True
+
+    assert cache.state_names == ("ref_latent",)
+    assert torch.equal(torch.get_rng_state(), expected_rng)
+
+
+def test_declared_state_names_cover_attributes_reset_to_the_same_value():
+    pipeline = _StubPipeline()
+    pipeline.crop = None
+    cache = BaseDataCache(capacity=2, state_names=("ref_latent", "motion_frames", "crop"))
+
+    def _compute(avatar: float, crop):
+        def _run():
+            pipeline.ref_latent = torch.full((2,), avatar)
+            pipeline.motion_frames = torch.zeros(2)
+            # Discovery cannot see this on the first avatar: None was already there.
+            pipeline.crop = crop
+
+        return _run
+
+    cache.load(pipeline, _key("a"), _compute(1.0, None))
+    cache.load(pipeline, _key("b"), _compute(2.0, (4, 4)))
+    assert cache.load(pipeline, _key("a"), _compute(1.0, None)) is True
+
+    assert cache.state_names == ("ref_latent", "motion_frames", "crop")
+    assert pipeline.crop is None
+
+
+def test_stale_declared_state_names_fall_back_to_discovery():
+    pipeline = _StubPipeline()
+    cache = BaseDataCache(capacity=2, state_names=("ref_latent", "renamed_upstream"))
+
+    cache.load(pipeline, _key("a"), _stub_get_base_data(pipeline, 1.0, []))
+
+    assert cache.state_names == ("ref_latent", "motion_frames")
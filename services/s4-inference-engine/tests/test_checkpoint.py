@@ -0,0 +1,100 @@
+import json
+import os
+import shutil
+import time
+
+import pytest
+import torch
+
+from inference_engine.checkpoint import ChunkCheckpoint, checkpoint_key, cleanup_stale_checkpoints
+
+
+_requires_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+
+
+def _frames(value: int) -> torch.Tensor:
+    return torch.full((3, 4, 4, 3), float(value))
+
+
+def test_checkpoint_key_depends_on_audio_and_settings(tmp_path):
+    audio = tmp_path / "tts.wav"
+    audio.write_bytes(b"audio-a")
+    base = checkpoint_key(audio, base_seed=42, model_type="lite")
+
+    assert checkpoint_key(audio, model_type="lite", base_seed=42) == base
+    assert checkpoint_key(audio, base_seed=7, model_type="lite") != base
+    audio.write_bytes(b"audio-b")
+    assert checkpoint_key(audio, base_seed=42, model_type="lite") != base
+
+
+@_requires_ffmpeg
+def test_checkpoint_resumes_with_saved_chunks_and_latest_state(tmp_path):
+    # Interval 0 flushes after every chunk, so each chunk lands in its own segment.
+    checkpoint = ChunkCheckpoint(tmp_path, record_id=7, key="a" * 64, flush_interval_sec=0)
+    assert checkpoint.completed_chunks == 0
+    for chunk_idx in range(3):
+        checkpoint.save(chunk_idx, _frames(chunk_idx), {"motion_frames": torch.tensor([chunk_idx]), "step": chunk_idx})
+    checkpoint.close()
+
+    resumed = ChunkCheckpoint(tmp_path, record_id=7, key="a" * 64)
+    assert resumed.completed_chunks == 3
+    replayed = list(resumed.iter_chunks())
+    assert [int(frames[0, 0, 0, 0]) for frames in replayed] == [0, 1, 2]
+    assert all(frames.dtype == torch.uint8 and frames.shape == (3, 4, 4, 3) for frames in replayed)
+    state = resumed.load_state()
+    assert state["step"] == 2
+    assert torch.equal(state["motion_frames"], torch.tensor([2]))
+    assert sorted(path.name for path in resumed.work_dir.glob("state_*.pt")) == ["state_00002.pt"]
+    assert len(list(resumed.work_dir.glob("segment_*.mkv"))) == 3
+
+
+@_requires_ffmpeg
+def test_checkpoint_batches_chunks_between_flushes(tmp_path):
+    checkpoint = ChunkCheckpoint(tmp_path, record_id=8, key="9" * 64, flush_interval_sec=3600)
+    state = {"motion_frames": torch.tensor([0])}
+    for chunk_idx in range(3):
+        checkpoint.save(chunk_idx, _frames(chunk_idx), state)
+        # The caller's state object keeps changing after save(); the checkpoint keeps its own copy.
+        state["motion_frames"] += 1
+
+    # Nothing is durable until the interval elapses or the job fails and closes the checkpoint.
+    assert ChunkCheckpoint(tmp_path, record_id=8, key="9" * 64).completed_chunks == 0
+    checkpoint.close()
+
+    resumed = ChunkCheckpoint(tmp_path, record_id=8, key="9" * 64)
+    assert resumed.completed_chunks == 3
+    assert [path.name for path in resumed.work_dir.glob("segment_*.mkv")] == ["segment_00000.mkv"]
+    assert [int(frames[0, 0, 0, 0]) for frames in resumed.iter_chunks()] == [0, 1, 2]
+    assert torch.equal(resumed.load_state()["motion_frames"], torch.tensor([2]))
+
+
+@_requires_ffmpeg
+def test_checkpoint_ignores_inconsistent_progress(tmp_path):
+    checkpoint = ChunkCheckpoint(tmp_path, record_id=7, key="b" * 64)
+    checkpoint.save(0, _frames(0), {})
+    checkpoint.save(1, _frames(1), {})
+    checkpoint.close()
+
+    (checkpoint.work_dir / "segment_00000.mkv").unlink()
+    assert ChunkCheckpoint(tmp_path, record_id=7, key="b" * 64).completed_chunks == 0
+
+    progress_path = checkpoint.work_dir / "progress.json"
+    progress_path.write_text(json.dumps({"key": "other", "completed_chunks": 2}), encoding="utf-8")
+    assert ChunkCheckpoint(tmp_path, record_id=7, key="b" * 64).completed_chunks == 0
+
+
+def test_checkpoint_rejects_out_of_order_chunks(tmp_path):
+    checkpoint = ChunkCheckpoint(tmp_path, record_id=1, key="c" * 64)
+    with pytest.raises(ValueError):
+        checkpoint.save(1, _frames(1), {})
+
+
+def test_cleanup_removes_only_stale_work_dirs(tmp_path):
+    stale = ChunkCheckpoint(tmp_path, record_id=1, key="d" * 64)
+    fresh = ChunkCheckpoint(tmp_path, record_id=2, key="e" * 64)
+    old = time.time() - 3 * 3600
+    os.utime(stale.work_dir, (old, old))
+
+    assert cleanup_stale_checkpoints(tmp_path, max_age_sec=3600) == 1
+    assert not stale.work_dir.exists()
+    assert fresh.work_dir.exists()
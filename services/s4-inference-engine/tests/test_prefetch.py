@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+import torch
+
+from inference_engine.prefetch import EmbeddingPrefetcher
+
+
+def _stub_embeddings(count: int, events: list[tuple[str, int]], embedded: dict[int, threading.Event] | None = None):
+    for chunk_idx in range(count):
+        events.append(("embedding", chunk_idx))
+        if embedded is not None:
+            embedded[chunk_idx].set()
+        yield torch.full((1, 4, 3), float(chunk_idx))
+
+
+def test_prefetcher_overlaps_next_embedding_with_current_render():
+    # Render N blocks until embedding N+1 exists; with strict alternation it never would.
+    count = 4
+    events: list[tuple[str, int]] = []
+    embedded = {chunk_idx: threading.Event() for chunk_idx in range(count)}
+    outputs = []
+
+    with EmbeddingPrefetcher(_stub_embeddings(count, events, embedded), depth=1) as embeddings:
+        for chunk_idx, embedding in enumerate(embeddings):
+            events.append(("render_start", chunk_idx))
+            if chunk_idx + 1 < count:
+                assert embedded[chunk_idx + 1].wait(timeout=5), f"embedding {chunk_idx + 1} did not overlap render"
+            outputs.append(float(embedding[0, 0, 0]) * 10)
+            events.append(("render_end", chunk_idx))
+
+    assert outputs == [0.0, 10.0, 20.0, 30.0]
+    assert [event for event in events if event[0] == "embedding"] == [("embedding", idx) for idx in range(count)]
+    for chunk_idx in range(count - 1):
+        assert events.index(("embedding", chunk_idx + 1)) < events.index(("render_end", chunk_idx))
+
+
+def test_prefetcher_bounds_lookahead_depth():
+    produced = []
+
+    def _source():
+        for chunk_idx in range(10):
+            produced.append(chunk_idx)
+            yield torch.tensor([chunk_idx])
+
+    prefetcher = EmbeddingPrefetcher(_source(), depth=2)
+    try:
+        first = next(prefetcher)
+        threading.Event().wait(0.2)
+        # Two queued plus at most one held by the producer while it waits for a slot.
+        assert len(produced) <= 1 + 2 + 1
+        assert [int(first)] + [int(item) for item in prefetcher] == list(range(10))
+    finally:
+        prefetcher.close()
+
+
+def test_prefetcher_depth_zero_runs_inline():
+    events: list[tuple[str, int]] = []
+    prefetcher = EmbeddingPrefetcher(_stub_embeddings(3, events), depth=0)
+    for chunk_idx, _embedding in enumerate(prefetcher):
+        events.append(("render", chunk_idx))
+
+    assert events == [
+        ("embedding", 0),
+        ("render", 0),
+        ("embedding", 1),
+        ("render", 1),
+        ("embedding", 2),
+        ("render", 2),
+    ]
+
+
+def test_prefetcher_reraises_source_errors_in_order():
+    def _source():
+        yield torch.tensor([0.0])
+        raise RuntimeError("wav2vec failed")
+
+    with EmbeddingPrefetcher(_source(), depth=2) as prefetcher:
+        assert float(next(prefetcher)) == 0.0
+        with pytest.raises(RuntimeError, match="wav2vec failed"):
+            next(prefetcher)
+        with pytest.raises(StopIteration):
+            next(prefetcher)
+
+
+def test_prefetcher_close_stops_producer_early():
+    closed = threading.Event()
+
+    def _source():
+        try:
+            for chunk_idx in range(1000):
+                yield torch.tensor([chunk_idx])
+        finally:
+            closed.set()
+
+    prefetcher = EmbeddingPrefetcher(_source(), depth=1)
+    next(prefetcher)
+    prefetcher.close()
+
+    assert closed.is_set()
@@ -0,0 +1,30 @@
+from inference_engine.profiling import ChunkProfiler
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = ChunkProfiler(enabled=False)
+    with profiler.measure("pipeline", sync=True):
+        pass
+    profiler.record("encode", 0.5)
+
+    assert profiler.summary() == {}
+    assert profiler.histogram() == ""
+
+
+def test_profiler_summary_and_histogram():
+    profiler = ChunkProfiler(enabled=True)
+    for seconds in (0.002, 0.004, 0.030, 0.030, 3.0):
+        profiler.record("pipeline", seconds)
+    with profiler.measure("embedding"):
+        pass
+
+    summary = profiler.summary()
+    assert list(summary) == ["embedding", "pipeline"]
+    assert summary["pipeline"]["count"] == 5
+    assert summary["pipeline"]["max_ms"] == 3000.0
+
+    lines = profiler.histogram().splitlines()
+    pipeline_line = next(line for line in lines if line.startswith("pipeline"))
+    assert "<5:2" in pipeline_line
+    assert "<50:2" in pipeline_line
+    assert ">=2500:1" in pipeline_line
@@ -0,0 +1,204 @@
+import dataclasses
+import shutil
+import subprocess
+import wave
+
+import numpy as np
+import pytest
+import torch
+from media import MediaInfo, budget_total_kbps, read_rawvideo_frames, split_bitrate
+
+from inference_engine import render_final
+from inference_engine.render_final import CompositingVideoWriter, CompositionSpec
+
+
+_requires_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+
+_SPEC = CompositionSpec(
+    scale_ratio=0.5,
+    margin_x=4,
+    margin_y=6,
+    x264_preset="ultrafast",
+    x264_crf=20,
+    target_total_bitrate_mbps=0.6,
+    min_total_bitrate_mbps=0.35,
+    audio_bitrate_kbps=96,
+    max_output_size_mb=1,
+)
+
+
+def _write_wav(path, seconds: float, sample_rate: int = 16000) -> None:
+    samples = (np.sin(np.arange(int(seconds * sample_rate)) / 20) * 8000).astype(np.int16)
+    with wave.open(str(path), "wb") as handle:
+        handle.setnchannels(1)
+        handle.setsampwidth(2)
+        handle.setframerate(sample_rate)
+        handle.writeframes(samples.tobytes())
+
+
+def _fake_probe(monkeypatch, *, duration_sec: float, total_kbps: int, width: int = 160, height: int = 90) -> None:
+    info = MediaInfo(
+        path="bg.mp4",
+        duration_sec=duration_sec,
+        total_kbps=total_kbps,
+        fps=25.0,
+        width=width,
+        height=height,
+        video_codec="h264",
+        audio_codec=None,
+    )
+    monkeypatch.setattr(render_final, "probe_media", lambda path: info)
+
+
+def _write_background(path, *, seconds: float, size: str, noise: bool = False) -> None:
+    # Full-frame temporal noise defeats x264, so the encode runs into its bitrate cap.
+    source = f"testsrc2=size={size}:rate=25" + (",noise=alls=100:allf=t+u" if noise else "")
+    subprocess.run(
+        [
+            "ffmpeg",
+            "-y",
+            "-loglevel",
+            "error",
+            "-f",
+            "lavfi",
+            "-i",
+            source,
+            "-t",
+            str(seconds),
+            "-c:v",
+            "libx264",
+            "-preset",
+            "ultrafast",
+            "-qp",
+            "0",
+            str(path),
+        ],
+        check=True,
+    )
+
+
+def _writer(tmp_path, *, target_duration: float, spec: CompositionSpec = _SPEC) -> CompositingVideoWriter:
+    return CompositingVideoWriter(
+        video_path=tmp_path / "out.mp4",
+        audio_path=tmp_path / "tts.wav",
+        fps=25,
+        background_path=tmp_path / "bg.mp4",
+        target_duration=target_duration,
+        spec=spec,
+    )
+
+
+def _chunk(frames: int, size: int = 32) -> torch.Tensor:
+    return torch.full((frames, size, size, 3), 128.0)
+
+
+def test_command_overlays_the_piped_foreground_on_the_retimed_background(tmp_path, monkeypatch):
+    _fake_probe(monkeypatch, duration_sec=4.0, total_kbps=20_000)
+    writer = _writer(tmp_path, target_duration=2.0)
+    try:
+        cmd = writer._build_command(height=90, width=160)
+    finally:
+        writer.abort()
+
+    # The s2 bitrate would overshoot 1 MB over 2 s, so the plan starts at the size budget.
+    assert writer.total_kbps == budget_total_kbps(1, 2.0)
+    video_kbps, audio_kbps = split_bitrate(writer.total_kbps, _SPEC.audio_bitrate_kbps)
+    assert cmd[cmd.index("-b:v") + 1] == cmd[cmd.index("-maxrate") + 1] == f"{video_kbps}k"
+    assert cmd[cmd.index("-b:a") + 1] == f"{audio_kbps}k"
+    assert cmd[cmd.index("-t") + 1] == "2.000"
+    assert cmd[cmd.index("-s") + 1] == "160x90"
+    assert [cmd[index + 1] for index, arg in enumerate(cmd) if arg == "-i"] == [
+        str(tmp_path / "bg.mp4"),
+        "pipe:0",
+        str(tmp_path / "tts.wav"),
+    ]
+    filter_complex = cmd[cmd.index("-filter_complex") + 1]
+    assert "setpts=PTS*0.50000000" in filter_complex
+    assert "overlay=4:H-h-6" in filter_complex
+    assert cmd[-1] != str(tmp_path / "out.mp4")
+
+
+def test_rejects_an_empty_target_duration(tmp_path, monkeypatch):
+    _fake_probe(monkeypatch, duration_sec=4.0, total_kbps=20_000)
+
+    with pytest.raises(RuntimeError, match="duration is zero"):
+        _writer(tmp_path, target_duration=0.0)
+
+
+@_requires_ffmpeg
+def test_frames_past_the_target_duration_are_dropped_not_failed(tmp_path, monkeypatch):
+    _write_background(tmp_path / "bg.mp4", seconds=3, size="160x90")
+    _write_wav(tmp_path / "tts.wav", seconds=3.0)
+    _fake_probe(monkeypatch, duration_sec=3.0, total_kbps=2_000)
+
+    # Ten seconds of foreground for a one-second output: ffmpeg hits `-t` and closes stdin.
+    with _writer(tmp_path, target_duration=1.0) as writer:
+        for _ in range(10):
+            writer.write(_chunk(25))
+
+    assert writer._output_complete
+    assert writer.frames_written < 250
+    frames = list(read_rawvideo_frames(tmp_path / "out.mp4", width=160, height=90))
+    assert len(frames) == 25
+    assert [path.name for path in tmp_path.iterdir() if path.name.startswith(".")] == []
+
+
+@_requires_ffmpeg
+def test_oversized_output_is_shrunk_to_the_budget(tmp_path, monkeypatch):
+    _write_background(tmp_path / "bg.mp4", seconds=4, size="640x360", noise=True)
+    _write_wav(tmp_path / "tts.wav", seconds=4.0)
+    _fake_probe(monkeypatch, duration_sec=4.0, total_kbps=20_000, width=640, height=360)
+    roomy = dataclasses.replace(_SPEC, max_output_size_mb=50)
+    with _writer(tmp_path, target_duration=4.0, spec=roomy) as writer:
+        for _ in range(4):
+            writer.write(_chunk(25))
+    first_size = (tmp_path / "out.mp4").stat().st_size
+    first_kbps = writer.total_kbps
+    assert first_size > 1024 * 1024
+
+    # Tighten the budget below the first encode and run the shrink pass `close()` ends with.
+    writer.spec = dataclasses.replace(_SPEC, max_output_size_mb=1)
+    writer._enforce_size_budget()
+
+    assert (tmp_path / "out.mp4").stat().st_size <= 1024 * 1024
+    assert writer.min_total_kbps <= writer.total_kbps < first_kbps
+    assert len(list(read_rawvideo_frames(tmp_path / "out.mp4", width=640, height=360))) == 100
+
+
+def test_shrink_retargets_until_the_output_fits(tmp_path, monkeypatch):
+    _fake_probe(monkeypatch, duration_sec=4.0, total_kbps=20_000)
+    writer = _writer(tmp_path, target_duration=4.0)
+    writer.abort()
+    (tmp_path / "out.mp4").write_bytes(b"x" * 3 * 1024 * 1024)
+    passes = []
+    # The first shrink still overshoots, so the loop has to retarget from its size.
+    shrunk_sizes = iter([1536 * 1024, 900 * 1024])
+
+    def _shrink(total_kbps):
+        passes.append(total_kbps)
+        (tmp_path / "out.mp4").write_bytes(b"x" * next(shrunk_sizes))
+
+    monkeypatch.setattr(writer, "_shrink", _shrink)
+    start_kbps = writer.total_kbps
+    writer._enforce_size_budget()
+
+    assert len(passes) == 2
+    assert start_kbps > passes[0] > passes[1] >= writer.min_total_kbps
+    assert writer.total_kbps == passes[-1]
+    assert (tmp_path / "out.mp4").stat().st_size <= 1024 * 1024
+
+
+def test_output_over_budget_at_the_floor_is_kept(tmp_path, monkeypatch):
+    _fake_probe(monkeypatch, duration_sec=4.0, total_kbps=20_000)
+    writer = _writer(tmp_path, target_duration=4.0)
+    writer.abort()
+    (tmp_path / "out.mp4").write_bytes(b"x" * 2 * 1024 * 1024)
+    passes = []
+    monkeypatch.setattr(writer, "_shrink", passes.append)
+    writer.total_kbps = writer.min_total_kbps
+
+    # Inference already ran: the job hands on the oversized file instead of failing.
+    writer._enforce_size_budget()
+
+    assert passes == []
+    assert (tmp_path / "out.mp4").stat().st_size == 2 * 1024 * 1024
@@ -0,0 +1,93 @@
+import threading
+
+import pytest
+import torch
+
+from inference_engine.scheduler import BatchScheduler
+
+
+class _RecordingPipeline:
+    """Stub batched pipeline: concatenates chunks on the batch dim and records shapes."""
+
+    def __init__(self):
+        self.batch_shapes: list[tuple[int, ...]] = []
+
+    def run_batch(self, requests):
+        batch = torch.cat([request.audio_embedding for request in requests], dim=0)
+        self.batch_shapes.append(tuple(batch.shape))
+        return list((batch * 10).split(1, dim=0))
+
+
+def _job(job_id: int, chunk_count: int, outputs: dict[int, list[float]], started: threading.Barrier):
+    def _setup():
+        def _embeddings():
+            for chunk_idx in range(chunk_count):
+                yield torch.full((1, 4, 3), float(job_id * 100 + chunk_idx))
+
+        return job_id, _embeddings()
+
+    def _on_chunk(video: torch.Tensor):
+        outputs[job_id].append(float(video[0, 0, 0]))
+
+    def _submit(scheduler: BatchScheduler):
+        started.wait()
+        scheduler.run_job(_setup, _on_chunk)
+
+    return _submit
+
+
+def _run_jobs(scheduler: BatchScheduler, chunk_counts: list[int]) -> dict[int, list[float]]:
+    outputs: dict[int, list[float]] = {job_id: [] for job_id in range(len(chunk_counts))}
+    started = threading.Barrier(len(chunk_counts))
+    threads = [
+        threading.Thread(target=_job(job_id, count, outputs, started), args=(scheduler,))
+        for job_id, count in enumerate(chunk_counts)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return outputs
+
+
+def test_scheduler_batches_chunks_across_jobs_and_routes_outputs():
+    pipeline = _RecordingPipeline()
+    scheduler = BatchScheduler(pipeline.run_batch, max_batch_size=3)
+    try:
+        outputs = _run_jobs(scheduler, [4, 2, 3])
+    finally:
+        scheduler.close()
+
+    assert outputs == {
+        0: [0.0, 10.0, 20.0, 30.0],
+        1: [1000.0, 1010.0],
+        2: [2000.0, 2010.0, 2020.0],
+    }
+    assert max(shape[0] for shape in pipeline.batch_shapes) > 1
+    assert all(shape[1:] == (4, 3) for shape in pipeline.batch_shapes)
+    assert sum(shape[0] for shape in pipeline.batch_shapes) == 9
+    assert scheduler.chunks_run == 9
+
+
+def test_scheduler_serial_mode_runs_one_chunk_per_call():
+    pipeline = _RecordingPipeline()
+    scheduler = BatchScheduler(pipeline.run_batch, max_batch_size=1)
+    try:
+        outputs = _run_jobs(scheduler, [2, 2])
+    finally:
+        scheduler.close()
+
+    assert outputs == {0: [0.0, 10.0], 1: [1000.0, 1010.0]}
+    assert all(shape[0] == 1 for shape in pipeline.batch_shapes)
+
+
+def test_scheduler_reports_job_failures_to_submitter():
+    def _failing_setup():
+        raise FileNotFoundError("missing cond image")
+
+    scheduler = BatchScheduler(lambda requests: [], max_batch_size=2)
+    try:
+        with pytest.raises(FileNotFoundError, match="missing cond image"):
+            scheduler.run_job(_failing_setup, lambda _video: None)
+    finally:
+        scheduler.close()
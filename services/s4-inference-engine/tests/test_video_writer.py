@@ -0,0 +1,156 @@
+import re
+import shutil
+import subprocess
+import threading
+import wave
+
+import numpy as np
+import pytest
+import torch
+from media import read_rawvideo_frames
+
+from inference_engine.video_writer import StreamingVideoWriter
+
+
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+
+
+def _write_wav(path, seconds: float, sample_rate: int = 16000) -> None:
+    samples = (np.sin(np.arange(int(seconds * sample_rate)) / 20) * 8000).astype(np.int16)
+    with wave.open(str(path), "wb") as handle:
+        handle.setnchannels(1)
+        handle.setsampwidth(2)
+        handle.setframerate(sample_rate)
+        handle.writeframes(samples.tobytes())
+
+
+def _chunk(frames: int = 25, size: int = 32) -> torch.Tensor:
+    return torch.full((frames, size, size, 3), 128.0)
+
+
+def _writer(tmp_path, *, audio_name: str = "tts.wav", max_pending_chunks: int = 2) -> StreamingVideoWriter:
+    return StreamingVideoWriter(
+        video_path=tmp_path / "out.mp4",
+        audio_path=tmp_path / audio_name,
+        fps=25,
+        expected_duration_sec=2.0,
+        max_pending_chunks=max_pending_chunks,
+    )
+
+
+def _container_duration_sec(path) -> float:
+    # No ffprobe here: ffmpeg prints the container duration while opening the input.
+    stderr = subprocess.run(["ffmpeg", "-hide_banner", "-i", str(path)], capture_output=True, text=True).stderr
+    hours, minutes, seconds = re.search(r"Duration: (\d+):(\d+):([\d.]+)", stderr).groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def _leftovers(tmp_path) -> list[str]:
+    return sorted(path.name for path in tmp_path.iterdir() if path.name.startswith("."))
+
+
+def _run_with_deadline(target, timeout_sec: float = 30.0):
+    # Runs `target` on a thread so a deadlock fails the test instead of hanging the suite.
+    outcome = {}
+
+    def _run():
+        try:
+            outcome["result"] = target()
+        except BaseException as exc:  # noqa: BLE001 - handed back to the test
+            outcome["error"] = exc
+
+    thread = threading.Thread(target=_run, daemon=True)
+    thread.start()
+    thread.join(timeout_sec)
+    assert not thread.is_alive(), "producer deadlocked"
+    return outcome
+
+
+def test_chunks_are_encoded_and_muxed_in_one_pass(tmp_path):
+    _write_wav(tmp_path / "tts.wav", seconds=2.0)
+
+    with _writer(tmp_path) as writer:
+        for _ in range(2):
+            writer.write(_chunk())
+
+    assert (writer.chunks_written, writer.frames_written) == (2, 50)
+    assert len(list(read_rawvideo_frames(tmp_path / "out.mp4", width=32, height=32))) == 50
+    assert _leftovers(tmp_path) == []
+
+
+@pytest.mark.parametrize(
+    ("width", "height", "audio_sec"),
+    [(32, 32, 2.0), (33, 17, 2.0), (33, 17, 3.0)],
+)
+def test_single_pass_mux_keeps_every_frame_and_the_video_duration(tmp_path, width, height, audio_sec):
+    _write_wav(tmp_path / "tts.wav", seconds=audio_sec)
+    frames = torch.full((25, height, width, 3), 200.0)
+
+    with _writer(tmp_path) as writer:
+        for _ in range(2):
+            writer.write(frames)
+
+    # yuv420p needs even sizes, so odd frames are padded by one pixel on the right/bottom.
+    padded_width, padded_height = width + width % 2, height + height % 2
+    decoded = list(read_rawvideo_frames(tmp_path / "out.mp4", width=padded_width, height=padded_height))
+    assert len(decoded) == 50
+    first = np.frombuffer(decoded[0], dtype=np.uint8).reshape(padded_height, padded_width, 3)
+    assert abs(int(first[:height, :width].mean()) - 200) <= 3
+    # `-shortest` ends the file with the 2 s of video even when the TTS audio runs longer.
+    assert _container_duration_sec(tmp_path / "out.mp4") == pytest.approx(2.0, abs=0.1)
+
+
+def test_failed_encode_surfaces_from_close_and_leaves_no_output(tmp_path):
+    # The audio input does not exist, so ffmpeg exits non-zero once it tries to open it.
+    writer = _writer(tmp_path, audio_name="missing.wav")
+    writer.write(_chunk(frames=1))
+
+    with pytest.raises(RuntimeError, match="missing.wav"):
+        writer.close()
+
+    assert not (tmp_path / "out.mp4").exists()
+    assert _leftovers(tmp_path) == []
+    assert writer._pipe._process.poll() is not None
+
+
+def test_failed_encode_surfaces_from_write_without_deadlocking(tmp_path):
+    writer = _writer(tmp_path, audio_name="missing.wav", max_pending_chunks=1)
+
+    def _produce():
+        # Far more than the pipe and queue can buffer: the dead encoder must stop the producer.
+        for _ in range(200):
+            writer.write(_chunk(size=256))
+
+    outcome = _run_with_deadline(_produce)
+    assert isinstance(outcome.get("error"), RuntimeError)
+    assert "encoder thread failed" in str(outcome["error"])
+
+    outcome = _run_with_deadline(writer.close)
+    assert isinstance(outcome.get("error"), RuntimeError)
+    assert not (tmp_path / "out.mp4").exists()
+    assert _leftovers(tmp_path) == []
+
+
+def test_abort_kills_ffmpeg_and_leaves_no_output(tmp_path):
+    _write_wav(tmp_path / "tts.wav", seconds=2.0)
+    writer = _writer(tmp_path)
+    writer.write(_chunk())
+    writer.write(_chunk())
+
+    writer.abort()
+
+    assert not (tmp_path / "out.mp4").exists()
+    assert _leftovers(tmp_path) == []
+    assert writer._pipe is None or writer._pipe._process.poll() is not None
+
+
+def test_exception_in_the_with_block_aborts(tmp_path):
+    _write_wav(tmp_path / "tts.wav", seconds=2.0)
+
+    with pytest.raises(ValueError):
+        with _writer(tmp_path) as writer:
+            writer.write(_chunk())
+            raise ValueError("inference failed")
+
+    assert not (tmp_path / "out.mp4").exists()
+    assert _leftovers(tmp_path) == []
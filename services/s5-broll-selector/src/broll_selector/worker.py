@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import json
-import os
 from typing import Any
 
 import dramatiq
@@ -91,8 +90,6 @@ def process(
     except Exception:
         job_logger.bind(event="job_failed").exception("Failed pass-through")
         raise
-    finally:
-        os.sync() if hasattr(os, "sync") else None
 
 
 logger.bind(event="worker_started", stage="s5").info(
@@ -0,0 +1,91 @@
+"""s6 jobs/hour at different numbers of concurrent encodes on this host.
+
+Each configuration runs `--jobs` full `compose_video` calls through
+`EncodeSlots`, so concurrent encodes share the detected CPUs exactly like
+Dramatiq worker threads do. `1` matches the old single-threaded worker where
+one ffmpeg ran at a time with its own thread heuristics.
+
+Inputs are short synthetic clips generated with ffmpeg's lavfi sources.
+
+Usage:
+    uv run python benchmarks/bench_concurrency.py [--jobs 8] [--duration-sec 20] [--levels 1,2,4]
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from loguru import logger
+
+from video_compositor.compose import compose_video
+from video_compositor.concurrency import EncodeSlots, available_cpus, plan_concurrency
+from video_compositor.encoder_profiles import build_profiles
+
+
+def _make_input(path: Path, source: str, duration_sec: int) -> None:
+    subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i", f"{source}:duration={duration_sec}", str(path)],
+        check=True,
+    )
+
+
+def _run_level(root: Path, bg: Path, fg: Path, tts: Path, slots: EncodeSlots, jobs: int) -> float:
+    profile = build_profiles(x264_preset="veryfast", x264_crf=23)["balanced"]
+
+    def job(idx: int) -> None:
+        with slots.acquire() as thread_budget:
+            compose_video(
+                bg_video_path=str(bg),
+                fg_video_path=str(fg),
+                tts_audio_path=str(tts),
+                output_path=str(root / f"out_{idx}.mp4"),
+                scale_ratio=0.35,
+                margin_x=20,
+                margin_y=20,
+                encoder_profile=profile,
+                target_total_bitrate_mbps=0.6,
+                min_total_bitrate_mbps=0.35,
+                bitrate_step_kbps=50,
+                audio_bitrate_kbps=96,
+                max_output_size_mb=30,
+                thread_budget=thread_budget,
+            )
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=slots.plan.max_concurrent_encodes) as pool:
+        list(pool.map(job, range(jobs)))
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    logger.disable("video_compositor")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=8)
+    parser.add_argument("--duration-sec", type=int, default=20)
+    parser.add_argument("--levels", default="1,2,4")
+    args = parser.parse_args()
+
+    cpus = available_cpus()
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        bg, fg, tts = root / "bg.mp4", root / "fg.mp4", root / "tts.wav"
+        _make_input(bg, "testsrc2=size=720x1280:rate=30", args.duration_sec)
+        _make_input(fg, "testsrc=size=512x512:rate=25", args.duration_sec)
+        _make_input(tts, "sine=f=220", args.duration_sec)
+
+        for level in (int(value) for value in args.levels.split(",")):
+            slots = EncodeSlots(plan_concurrency(cpus=cpus, max_concurrent_encodes=level, min_threads_per_encode=1))
+            elapsed = _run_level(root, bg, fg, tts, slots, args.jobs)
+            print(
+                f"{slots.plan.max_concurrent_encodes} x {slots.plan.threads_per_encode:>2} threads: "
+                f"{elapsed:7.2f} s for {args.jobs} jobs, {args.jobs * 3600 / elapsed:7.1f} jobs/hour"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""NumPy `OverlayCompositor` vs the ffmpeg overlay graph: pixel equivalence and frames/sec.
+
+Both paths get the same decoded rgb24 frames (raw files, so decode cost is
+excluded from both). Two ffmpeg graphs are measured: `production` is the
+filter chain `compose_video` uses (overlay negotiates yuv420p, as in the real
+encode) and `rgb` keeps the overlay in RGB, isolating the scaler difference.
+Equivalence is reported as PSNR and max abs error over every pixel.
+
+Inputs are synthetic testsrc clips generated with ffmpeg's lavfi sources.
+
+Usage:
+    uv run --extra frames python benchmarks/bench_overlay.py [--frames 250] [--scale-ratio 0.35]
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from video_compositor.overlay import OverlayCompositor
+
+_BG_SIZE = (1280, 720)
+_FG_SIZE = (512, 512)
+
+
+def _raw_frames(path: Path, source: str, size: tuple[int, int], frames: int) -> np.ndarray:
+    height, width = size
+    subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i", f"{source}=size={width}x{height}:rate=25"]
+        + ["-frames:v", str(frames), "-f", "rawvideo", "-pix_fmt", "rgb24", str(path)],
+        check=True,
+    )
+    return np.fromfile(path, dtype=np.uint8).reshape(frames, height, width, 3)
+
+
+def _ffmpeg_overlay(bg: Path, fg: Path, frames: int, overlay_args: str, args: argparse.Namespace) -> tuple[np.ndarray, float]:
+    raw_input = ["-f", "rawvideo", "-pix_fmt", "rgb24", "-r", "25"]
+    graph = (
+        f"[1:v]setpts=PTS-STARTPTS,scale=iw*{args.scale_ratio:.4f}:ih*{args.scale_ratio:.4f}[fg];"
+        f"[0:v][fg]overlay={args.margin_x}:H-h-{args.margin_y}{overlay_args}[vout]"
+    )
+    cmd = (
+        ["ffmpeg", "-loglevel", "error", *raw_input, "-s", f"{_BG_SIZE[1]}x{_BG_SIZE[0]}", "-i", str(bg)]
+        + [*raw_input, "-s", f"{_FG_SIZE[1]}x{_FG_SIZE[0]}", "-i", str(fg)]
+        + ["-filter_complex", graph, "-map", "[vout]", "-f", "rawvideo", "-pix_fmt", "rgb24", "-"]
+    )
+    start = time.perf_counter()
+    result = subprocess.run(cmd, capture_output=True, check=True)
+    elapsed = time.perf_counter() - start
+    return np.frombuffer(result.stdout, dtype=np.uint8).reshape(frames, *_BG_SIZE, 3), elapsed
+
+
+def _psnr(a: np.ndarray, b: np.ndarray) -> float:
+    mse = float(np.mean((a.astype(np.float64) - b.astype(np.float64)) ** 2))
+    return float("inf") if mse == 0 else 10 * np.log10(255**2 / mse)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=250)
+    parser.add_argument("--scale-ratio", type=float, default=0.35)
+    parser.add_argument("--margin-x", type=int, default=20)
+    parser.add_argument("--margin-y", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        bg_path, fg_path = root / "bg.rgb", root / "fg.rgb"
+        bg_frames = _raw_frames(bg_path, "testsrc2", _BG_SIZE, args.frames)
+        fg_frames = _raw_frames(fg_path, "testsrc", _FG_SIZE, args.frames)
+
+        compositor = OverlayCompositor(
+            bg_size=_BG_SIZE,
+            fg_size=_FG_SIZE,
+            scale_ratio=args.scale_ratio,
+            margin_x=args.margin_x,
+            margin_y=args.margin_y,
+        )
+        numpy_out = np.empty_like(bg_frames)
+        start = time.perf_counter()
+        for idx in range(args.frames):
+            numpy_out[idx] = compositor.compose(bg_frames[idx], fg_frames[idx])
+        numpy_elapsed = time.perf_counter() - start
+        print(f"{'numpy':>10}: {args.frames / numpy_elapsed:8.1f} frames/sec")
+
+        for name, overlay_args in (("production", ""), ("rgb", ":format=rgb")):
+            ffmpeg_out, elapsed = _ffmpeg_overlay(bg_path, fg_path, args.frames, overlay_args, args)
+            print(
+                f"{name:>10}: {args.frames / elapsed:8.1f} frames/sec (incl. process start), "
+                f"PSNR vs numpy {_psnr(numpy_out, ffmpeg_out):6.2f} dB, "
+                f"max abs diff {int(np.abs(numpy_out.astype(np.int16) - ffmpeg_out).max())}"
+            )
+
+
+if __name__ == "__main__":
+    main()
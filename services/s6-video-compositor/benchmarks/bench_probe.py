@@ -0,0 +1,119 @@
+"""ffprobe subprocesses and wall-clock time spent on metadata per s6 job.
+
+Legacy: the separate duration/fps/bitrate probes `_compose_video` used to run
+(three on the background, one on the foreground). Current: one `probe_media`
+call per input, served from the (path, mtime, size) cache when the same job
+is redelivered or its encode is retried.
+
+Inputs are short synthetic clips generated with ffmpeg's lavfi sources.
+
+Usage:
+    uv run python benchmarks/bench_probe.py [--jobs 20] [--duration-sec 30]
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from media.probe import ProbeCache
+
+_LEGACY_ENTRIES = (
+    ("format=duration", "default=noprint_wrappers=1:nokey=1"),
+    ("stream=avg_frame_rate,r_frame_rate", "json"),
+    ("format=bit_rate", "default=noprint_wrappers=1:nokey=1"),
+)
+
+
+def _make_clip(path: Path, duration_sec: int, size: str) -> None:
+    subprocess.run(
+        [
+            "ffmpeg",
+            "-y",
+            "-loglevel",
+            "error",
+            "-f",
+            "lavfi",
+            "-i",
+            f"testsrc2=size={size}:rate=30:duration={duration_sec}",
+            "-f",
+            "lavfi",
+            "-i",
+            f"sine=f=220:d={duration_sec}",
+            "-c:v",
+            "libx264",
+            "-preset",
+            "ultrafast",
+            "-c:a",
+            "aac",
+            "-shortest",
+            str(path),
+        ],
+        check=True,
+    )
+
+
+def _legacy_job(bg: Path, fg: Path) -> int:
+    calls = 0
+    for entries, output_format in _LEGACY_ENTRIES:
+        subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", entries, "-of", output_format, str(bg)],
+            capture_output=True,
+            check=True,
+        )
+        calls += 1
+    subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", _LEGACY_ENTRIES[0][0], "-of", _LEGACY_ENTRIES[0][1], str(fg)],
+        capture_output=True,
+        check=True,
+    )
+    return calls + 1
+
+
+def _cached_job(cache: ProbeCache, bg: Path, fg: Path) -> int:
+    misses_before = cache.misses
+    cache.probe(str(bg))
+    cache.probe(str(fg))
+    return cache.misses - misses_before
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--duration-sec", type=int, default=30)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        bg, fg = root / "bg.mp4", root / "fg.mp4"
+        _make_clip(bg, args.duration_sec, "720x1280")
+        _make_clip(fg, args.duration_sec, "512x512")
+
+        start = time.perf_counter()
+        legacy_calls = sum(_legacy_job(bg, fg) for _ in range(args.jobs))
+        legacy_ms = (time.perf_counter() - start) * 1000 / args.jobs
+
+        # Fresh cache per job: distinct records, each probed once.
+        start = time.perf_counter()
+        single_calls = sum(_cached_job(ProbeCache(), bg, fg) for _ in range(args.jobs))
+        single_ms = (time.perf_counter() - start) * 1000 / args.jobs
+
+        # Shared cache: the same record redelivered or retried.
+        shared = ProbeCache()
+        start = time.perf_counter()
+        redelivered_calls = sum(_cached_job(shared, bg, fg) for _ in range(args.jobs))
+        redelivered_ms = (time.perf_counter() - start) * 1000 / args.jobs
+
+    for name, calls, per_job_ms in (
+        ("legacy per-field probes", legacy_calls, legacy_ms),
+        ("single probe per file", single_calls, single_ms),
+        ("single probe, redelivered", redelivered_calls, redelivered_ms),
+    ):
+        print(f"{name:>26}: {calls / args.jobs:4.1f} ffprobe/job, {per_job_ms:7.2f} ms/job")
+
+
+if __name__ == "__main__":
+    main()
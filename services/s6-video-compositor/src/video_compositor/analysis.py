@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from media import CONTAINER_OVERHEAD_RATIO
+
+from video_compositor.encoder_profiles import RateControl
+
+# Under CRF, x264's bitrate grows a little slower than the pixel rate (bigger frames
+# predict better); measured between 0.8 and 1.0 across scales and CRFs.
+PIXEL_RATE_EXPONENT = 0.9
+
+
+@dataclass(frozen=True)
+class AnalysisPolicy:
+    """How the pre-analysis encode decimates the composition; see the S6_SIZE_ANALYSIS_* settings.
+
+    `size_factor` multiplies the extrapolated video bitrate. It starts at 1.0 and
+    is tuned from the predicted vs actual sizes logged on every job.
+    """
+
+    scale: float
+    fps_divisor: int
+    size_factor: float
+
+    def analysis_fps(self, fps: float) -> float:
+        return fps / max(1, self.fps_divisor)
+
+    def pixel_rate_ratio(self) -> float:
+        """Pixels per second of the full encode over those of the analysis encode."""
+        return max(1, self.fps_divisor) / (self.scale * self.scale)
+
+
+def predict_output_bytes(
+    *,
+    analysis_video_bytes: int,
+    analysis_duration_sec: float,
+    duration_sec: float,
+    audio_kbps: int,
+    size_factor: float,
+    rate_control: RateControl,
+    pixel_rate_ratio: float,
+    video_kbps: int,
+) -> int:
+    """Full-encode size extrapolated from the analysis encode's video bits per second.
+
+    With `abr` the encoder spends the target bitrate at any resolution, so the
+    analysis bitrate carries over as is. With `capped_crf` the CRF decides the
+    size, so the analysis bitrate is scaled up by the pixel-rate ratio (to the
+    power `PIXEL_RATE_EXPONENT`) and then clipped to the `video_kbps` cap both
+    encodes share. Audio and container overhead are added on top.
+    """
+    video_bps = analysis_video_bytes * 8 / max(analysis_duration_sec, 0.001)
+    if rate_control == "capped_crf":
+        video_bps = min(video_bps * pixel_rate_ratio**PIXEL_RATE_EXPONENT, video_kbps * 1000)
+    elif rate_control != "abr":
+        raise ValueError(f"Unknown rate control mode: {rate_control!r}")
+    payload_bits = (video_bps * size_factor + audio_kbps * 1000) * duration_sec
+    return int(payload_bits / 8 / (1 - CONTAINER_OVERHEAD_RATIO))
+
+
+def scale_prediction(predicted_bytes: int, *, predicted_total_kbps: int, total_kbps: int) -> int:
+    """Prediction made at `predicted_total_kbps`, carried over to an encode at `total_kbps`."""
+    return int(predicted_bytes * total_kbps / max(predicted_total_kbps, 1))
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+from loguru import logger
+from media import atomic_output, run_ffmpeg
+
+from video_compositor.concurrency import ThreadBudget
+
+# Keyframe every this many seconds: cheap seeks for segment-parallel encodes
+# without the size of an all-intra file.
+INTERMEDIATE_GOP_SEC = 0.5
+_INTERMEDIATE_SUFFIX = ".mp4"
+
+
+def _file_sha256(path: str) -> str:
+    with open(path, "rb") as handle:
+        return hashlib.file_digest(handle, "sha256").hexdigest()
+
+
+class BackgroundCache:
+    """On-disk LRU of time-remapped s2 backgrounds.
+
+    An entry is the background already retimed to the composition's duration and
+    resampled to its fps (`setpts` + `fps`), encoded at high quality with a
+    short GOP. Entries are keyed by the content hash of the source plus the
+    target duration and fps, so a re-submitted source URL (downloaded again to a
+    new path) reuses the work. The least recently used entries are removed once
+    the directory grows past `max_bytes`.
+    """
+
+    def __init__(self, root: str | Path, *, max_bytes: int, crf: int) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.crf = crf
+        self.hits = 0
+        self.misses = 0
+        self._hashes: dict[tuple[str, int, int], str] = {}
+        self._lock = threading.Lock()
+        self._key_locks: dict[str, threading.Lock] = {}
+
+    def source_hash(self, path: str) -> str:
+        """sha256 of `path`, memoized per (path, mtime, size) for the worker's lifetime."""
+        stat = Path(path).stat()
+        memo_key = (str(Path(path).resolve()), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            digest = self._hashes.get(memo_key)
+        if digest is None:
+            digest = _file_sha256(path)
+            with self._lock:
+                self._hashes[memo_key] = digest
+        return digest
+
+    def entry_path(self, source_hash: str, *, duration_sec: float, fps: float) -> Path:
+        return self.root / f"{source_hash[:32]}_{round(duration_sec * 1000)}ms_{fps:.6f}fps{_INTERMEDIATE_SUFFIX}"
+
+    def get_or_create(
+        self,
+        source_path: str,
+        *,
+        duration_sec: float,
+        fps: float,
+        setpts_factor: float,
+        thread_budget: ThreadBudget | None = None,
+    ) -> str:
+        """Path of the remapped background for this source/duration/fps, building it on a miss."""
+        entry = self.entry_path(self.source_hash(source_path), duration_sec=duration_sec, fps=fps)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(entry.name, threading.Lock())
+
+        # Concurrent jobs for the same background wait for one build instead of racing.
+        with key_lock:
+            if entry.exists():
+                os.utime(entry)
+                with self._lock:
+                    self.hits += 1
+                logger.info("S6 background cache hit: {}", entry.name)
+                return str(entry)
+
+            with self._lock:
+                self.misses += 1
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._build(source_path, entry, duration_sec, fps, setpts_factor, thread_budget)
+            logger.info("S6 background cache miss, built {} ({} bytes)", entry.name, entry.stat().st_size)
+
+        self.evict(keep=entry)
+        return str(entry)
+
+    def _build(
+        self,
+        source_path: str,
+        entry: Path,
+        duration_sec: float,
+        fps: float,
+        setpts_factor: float,
+        thread_budget: ThreadBudget | None,
+    ) -> None:
+        thread_args = thread_budget.input_args() if thread_budget is not None else []
+        cmd = [
+            "ffmpeg",
+            "-y",
+            *thread_args,
+            "-i",
+            source_path,
+            "-vf",
+            f"setpts=PTS*{setpts_factor:.8f},fps={fps:.6f}:round=near",
+            "-an",
+            "-t",
+            f"{duration_sec:.3f}",
+            "-fps_mode",
+            "cfr",
+            "-r",
+            f"{fps:.6f}",
+            "-c:v",
+            "libx264",
+            "-preset",
+            "veryfast",
+            "-crf",
+            str(self.crf),
+            "-g",
+            str(max(1, round(fps * INTERMEDIATE_GOP_SEC))),
+            *thread_args,
+        ]
+        # Readers only ever see complete entries.
+        with atomic_output(entry) as tmp_path:
+            run_ffmpeg([*cmd, str(tmp_path)], what="ffmpeg background remap", expected_duration_sec=duration_sec)
+
+    def evict(self, *, keep: Path | None = None) -> list[Path]:
+        """Delete least recently used entries until the cache fits in `max_bytes`, sparing `keep`."""
+        entries = []
+        for path in self.root.glob(f"*{_INTERMEDIATE_SUFFIX}"):
+            if path.name.startswith(".") or path == keep:
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        if keep is not None and keep.exists():
+            total += keep.stat().st_size
+        removed = []
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed.append(path)
+        if removed:
+            logger.info("S6 background cache evicted {} entries, {} bytes left", len(removed), total)
+        return removed
@@ -0,0 +1,542 @@
+from __future__ import annotations
+
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+from loguru import logger
+from media import (
+    atomic_output,
+    budget_total_kbps,
+    initial_total_kbps,
+    overlay_filter_complex,
+    probe_media,
+    progress_logger,
+    retarget_total_kbps,
+    run_ffmpeg,
+    split_bitrate,
+)
+
+from video_compositor.analysis import AnalysisPolicy, predict_output_bytes, scale_prediction
+from video_compositor.background_cache import BackgroundCache
+from video_compositor.concurrency import ThreadBudget, available_cpus
+from video_compositor.encoder_profiles import EncoderProfile
+from video_compositor.segments import Segment, SegmentPolicy, gop_frames, seek_offset
+
+
+@dataclass(frozen=True)
+class ComposeResult:
+    encode_attempts: int
+    total_kbps: int
+    output_size_bytes: int
+    segment_count: int
+    predicted_size_bytes: int | None
+
+
+def _run_ffmpeg(cmd: list[str], what: str, *, expected_duration_sec: float | None = None) -> None:
+    # Streams progress into the logs and kills the encode if it stalls past the
+    # watchdog derived from the output duration; errors carry only the stderr tail.
+    run_ffmpeg(
+        cmd,
+        what=f"ffmpeg {what}",
+        expected_duration_sec=expected_duration_sec,
+        on_progress=progress_logger(f"S6 {what}", expected_duration_sec=expected_duration_sec),
+    )
+
+
+def _encode_segment(
+    *,
+    segment: Segment,
+    bg_video_path: str,
+    fg_video_path: str,
+    output_path: str,
+    bg_setpts_factor: float,
+    bg_fps: float,
+    scale_ratio: float,
+    margin_x: int,
+    margin_y: int,
+    video_args: list[str],
+    gop: int,
+    thread_budget: ThreadBudget,
+) -> None:
+    # Seek both inputs a little before the segment and shift their timestamps back,
+    # so the graph sees the same absolute timeline as the one-piece encode, then
+    # drop the preroll frames by output time.
+    start_sec = segment.start_sec(bg_fps)
+    bg_seek = seek_offset(start_sec / bg_setpts_factor)
+    fg_seek = seek_offset(start_sec)
+    output_filter = ""
+    if segment.start_frame > 0:
+        output_filter = f",select=gte(t\\,{(segment.start_frame - 0.5) / bg_fps:.6f}),setpts=PTS-STARTPTS"
+    filter_complex = overlay_filter_complex(
+        bg_setpts=f"(PTS+{bg_seek:.1f}/TB)*{bg_setpts_factor:.8f}",
+        fg_setpts=f"PTS+{fg_seek:.1f}/TB",
+        bg_fps=bg_fps,
+        scale_ratio=scale_ratio,
+        margin_x=margin_x,
+        margin_y=margin_y,
+        output_filter=output_filter,
+    )
+    input_args = thread_budget.input_args()
+    cmd = [
+        "ffmpeg",
+        "-y",
+        *thread_budget.filter_args(),
+        *input_args,
+        "-ss",
+        f"{bg_seek:.1f}",
+        "-i",
+        bg_video_path,
+        *input_args,
+        "-ss",
+        f"{fg_seek:.1f}",
+        "-i",
+        fg_video_path,
+        "-filter_complex",
+        filter_complex,
+        "-map",
+        "[vout]",
+        "-frames:v",
+        str(segment.frame_count),
+        "-fps_mode",
+        "cfr",
+        "-r",
+        f"{bg_fps:.6f}",
+        *video_args,
+        "-g",
+        str(gop),
+        "-an",
+        output_path,
+    ]
+    _run_ffmpeg(cmd, f"segment {segment.index} encode", expected_duration_sec=segment.frame_count / bg_fps)
+
+
+def _analysis_encode(
+    *,
+    analysis_policy: AnalysisPolicy,
+    bg_video_path: str,
+    fg_video_path: str,
+    output_dir: Path,
+    target_duration: float,
+    bg_setpts_factor: float,
+    bg_fps: float,
+    scale_ratio: float,
+    margin_x: int,
+    margin_y: int,
+    encoder_profile: EncoderProfile,
+    video_kbps: int,
+    thread_budget: ThreadBudget | None,
+) -> int:
+    """Encode a downscaled, frame-decimated composition with `ultrafast` and return its video bytes."""
+    scale = analysis_policy.scale
+    filter_complex = overlay_filter_complex(
+        bg_setpts=f"PTS*{bg_setpts_factor:.8f}",
+        fg_setpts="PTS-STARTPTS",
+        bg_fps=bg_fps,
+        scale_ratio=scale_ratio,
+        margin_x=margin_x,
+        margin_y=margin_y,
+        output_filter=f",scale=trunc(iw*{scale:.4f}/2)*2:trunc(ih*{scale:.4f}/2)*2",
+    )
+    # Same rate control as the real encode, cheapest preset.
+    profile = replace(encoder_profile, preset="ultrafast")
+    input_args = thread_budget.input_args() if thread_budget is not None else []
+    with tempfile.TemporaryDirectory(prefix=".analysis_", dir=output_dir) as tmp:
+        analysis_path = Path(tmp) / "analysis.mp4"
+        cmd = [
+            "ffmpeg",
+            "-y",
+            *input_args,
+            "-i",
+            bg_video_path,
+            *input_args,
+            "-i",
+            fg_video_path,
+            "-filter_complex",
+            filter_complex,
+            "-map",
+            "[vout]",
+            "-t",
+            f"{target_duration:.3f}",
+            "-fps_mode",
+            "cfr",
+            "-r",
+            f"{analysis_policy.analysis_fps(bg_fps):.6f}",
+            *profile.video_args(video_kbps),
+            "-an",
+            str(analysis_path),
+        ]
+        _run_ffmpeg(cmd, "size analysis", expected_duration_sec=target_duration)
+        return analysis_path.stat().st_size
+
+
+def _encode_segmented(
+    *,
+    segments: list[Segment],
+    segment_policy: SegmentPolicy,
+    bg_video_path: str,
+    fg_video_path: str,
+    tts_audio_path: str,
+    output_path: str,
+    target_duration: float,
+    bg_setpts_factor: float,
+    bg_fps: float,
+    scale_ratio: float,
+    margin_x: int,
+    margin_y: int,
+    encoder_profile: EncoderProfile,
+    video_kbps: int,
+    audio_kbps: int,
+    thread_budget: ThreadBudget | None,
+) -> None:
+    threads = thread_budget.threads if thread_budget is not None else available_cpus()
+    workers = min(len(segments), segment_policy.workers or max(1, threads // 2))
+    segment_budget = ThreadBudget(threads=max(1, threads // workers))
+    if encoder_profile.threads == 0:
+        encoder_profile = replace(encoder_profile, threads=segment_budget.threads)
+    video_args = encoder_profile.video_args(video_kbps)
+    gop = gop_frames(bg_fps, segment_policy.gop_sec)
+
+    output = Path(output_path)
+    with tempfile.TemporaryDirectory(prefix=f".{output.stem}_segments_", dir=output.parent) as tmp:
+        segment_paths = [str(Path(tmp) / f"segment_{segment.index:04d}.mp4") for segment in segments]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="s6-segment") as pool:
+            futures = [
+                pool.submit(
+                    _encode_segment,
+                    segment=segment,
+                    bg_video_path=bg_video_path,
+                    fg_video_path=fg_video_path,
+                    output_path=segment_path,
+                    bg_setpts_factor=bg_setpts_factor,
+                    bg_fps=bg_fps,
+                    scale_ratio=scale_ratio,
+                    margin_x=margin_x,
+                    margin_y=margin_y,
+                    video_args=video_args,
+                    gop=gop,
+                    thread_budget=segment_budget,
+                )
+                for segment, segment_path in zip(segments, segment_paths)
+            ]
+            for future in futures:
+                future.result()
+
+        concat_list = Path(tmp) / "segments.txt"
+        # Entries are resolved relative to the list file, which sits next to the segments.
+        concat_list.write_text(
+            "".join(f"file '{Path(path).name}'\n" for path in segment_paths),
+            encoding="utf-8",
+        )
+        # Video is stream-copied; audio is encoded once over the whole timeline.
+        concat_cmd = [
+            "ffmpeg",
+            "-y",
+            "-f",
+            "concat",
+            "-safe",
+            "0",
+            "-i",
+            str(concat_list),
+            "-i",
+            tts_audio_path,
+            "-map",
+            "0:v",
+            "-map",
+            "1:a?",
+            "-c:v",
+            "copy",
+            "-af",
+            "apad",
+            "-t",
+            f"{target_duration:.3f}",
+            "-c:a",
+            "aac",
+            "-b:a",
+            f"{audio_kbps}k",
+            "-movflags",
+            "+faststart",
+            output_path,
+        ]
+        _run_ffmpeg(concat_cmd, "segment concat", expected_duration_sec=target_duration)
+
+
+def compose_video(
+    *,
+    bg_video_path: str,
+    fg_video_path: str,
+    tts_audio_path: str,
+    output_path: str,
+    scale_ratio: float,
+    margin_x: int,
+    margin_y: int,
+    encoder_profile: EncoderProfile,
+    target_total_bitrate_mbps: float,
+    min_total_bitrate_mbps: float,
+    bitrate_step_kbps: int,
+    audio_bitrate_kbps: int,
+    max_output_size_mb: int,
+    thread_budget: ThreadBudget | None = None,
+    segment_policy: SegmentPolicy | None = None,
+    background_cache: BackgroundCache | None = None,
+    analysis_policy: AnalysisPolicy | None = None,
+) -> ComposeResult:
+    # One ffprobe per input (cached across retries and redeliveries) instead of one per field.
+    bg_info = probe_media(bg_video_path)
+    fg_info = probe_media(fg_video_path)
+    logger.debug("S6 probed media: bg={}, fg={}", bg_info.to_json(), fg_info.to_json())
+    bg_duration = bg_info.duration_sec
+    fg_duration = fg_info.duration_sec
+    bg_fps = bg_info.fps
+    bg_total_kbps = bg_info.total_kbps
+
+    if bg_duration <= 0:
+        raise RuntimeError("Background video duration is zero")
+    if fg_duration <= 0:
+        raise RuntimeError("Foreground video duration is zero")
+
+    target_duration = fg_duration
+    bg_setpts_factor = target_duration / bg_duration
+    is_slowdown = bg_setpts_factor > 1.0001
+
+    fallback_total_kbps = max(100, int(round(target_total_bitrate_mbps * 1000)))
+    min_total_kbps = max(100, int(round(min_total_bitrate_mbps * 1000)))
+    step_kbps = max(10, bitrate_step_kbps)
+    budget_kbps = budget_total_kbps(max_output_size_mb, target_duration)
+    start_total_kbps = initial_total_kbps(
+        source_total_kbps=bg_total_kbps,
+        fallback_total_kbps=fallback_total_kbps,
+        min_total_kbps=min_total_kbps,
+        max_output_size_mb=max_output_size_mb,
+        duration_sec=target_duration,
+    )
+
+    # With the cache, the background is already retimed to the target duration and fps.
+    bg_source_path = bg_video_path
+    graph_setpts_factor = bg_setpts_factor
+    if background_cache is not None:
+        bg_source_path = background_cache.get_or_create(
+            bg_video_path,
+            duration_sec=float(f"{target_duration:.3f}"),
+            fps=bg_fps,
+            setpts_factor=bg_setpts_factor,
+            thread_budget=thread_budget,
+        )
+        graph_setpts_factor = 1.0
+
+    filter_complex = overlay_filter_complex(
+        bg_setpts=f"PTS*{graph_setpts_factor:.8f}",
+        fg_setpts="PTS-STARTPTS",
+        bg_fps=bg_fps,
+        scale_ratio=scale_ratio,
+        margin_x=margin_x,
+        margin_y=margin_y,
+    )
+
+    logger.info(
+        "S6 duration reconcile: s2={:.3f}s, s4={:.3f}s (target), bg_setpts_factor={:.6f}, mode={}",
+        bg_duration,
+        fg_duration,
+        bg_setpts_factor,
+        "slow_down_s2" if is_slowdown else "speed_up_s2",
+    )
+
+    logger.info(
+        "S6 bitrate strategy: s2_total={} kbps, budget_total={} kbps, initial_total={} kbps, fallback_total={} kbps, min_total={} kbps, min_step={} kbps, max_output={} MB",
+        bg_total_kbps,
+        budget_kbps,
+        start_total_kbps,
+        fallback_total_kbps,
+        min_total_kbps,
+        step_kbps,
+        max_output_size_mb,
+    )
+
+    segments: list[Segment] = []
+    if segment_policy is not None:
+        # Plan on the duration ffmpeg actually cuts at (`-t` below), so frame counts match.
+        segments = segment_policy.plan(duration_sec=float(f"{target_duration:.3f}"), fps=bg_fps)
+    if segments:
+        logger.info(
+            "S6 segment-parallel encode: {} segments of up to {} frames",
+            len(segments),
+            max(segment.frame_count for segment in segments),
+        )
+
+    base_profile = encoder_profile
+    if thread_budget is not None and encoder_profile.threads == 0:
+        encoder_profile = replace(encoder_profile, threads=thread_budget.threads)
+    input_args = thread_budget.input_args() if thread_budget is not None else []
+    filter_args = thread_budget.filter_args() if thread_budget is not None else []
+
+    predicted_size_bytes = None
+    if analysis_policy is not None:
+        # Estimate the full encode's size from a cheap one, and lower the bitrate
+        # before the full encode instead of after an oversized one.
+        analysis_video_kbps, analysis_audio_kbps = split_bitrate(start_total_kbps, audio_bitrate_kbps)
+        analysis_bytes = _analysis_encode(
+            analysis_policy=analysis_policy,
+            bg_video_path=bg_source_path,
+            fg_video_path=fg_video_path,
+            output_dir=Path(output_path).parent,
+            target_duration=target_duration,
+            bg_setpts_factor=graph_setpts_factor,
+            bg_fps=bg_fps,
+            scale_ratio=scale_ratio,
+            margin_x=margin_x,
+            margin_y=margin_y,
+            encoder_profile=encoder_profile,
+            video_kbps=analysis_video_kbps,
+            thread_budget=thread_budget,
+        )
+        predicted_size_bytes = predict_output_bytes(
+            analysis_video_bytes=analysis_bytes,
+            analysis_duration_sec=target_duration,
+            duration_sec=target_duration,
+            audio_kbps=analysis_audio_kbps,
+            size_factor=analysis_policy.size_factor,
+            rate_control=encoder_profile.rate_control,
+            pixel_rate_ratio=analysis_policy.pixel_rate_ratio(),
+            video_kbps=analysis_video_kbps,
+        )
+        analysed_total_kbps = start_total_kbps
+        if predicted_size_bytes > max_output_size_mb * 1024 * 1024:
+            start_total_kbps = (
+                retarget_total_kbps(
+                    attempt_total_kbps=start_total_kbps,
+                    measured_bytes=predicted_size_bytes,
+                    max_output_size_mb=max_output_size_mb,
+                    min_total_kbps=min_total_kbps,
+                    min_step_kbps=step_kbps,
+                )
+                or start_total_kbps
+            )
+            predicted_size_bytes = scale_prediction(
+                predicted_size_bytes,
+                predicted_total_kbps=analysed_total_kbps,
+                total_kbps=start_total_kbps,
+            )
+        logger.info(
+            "S6 size analysis: analysis={} bytes at total={} kbps, predicted={} bytes at total={} kbps",
+            analysis_bytes,
+            analysed_total_kbps,
+            predicted_size_bytes,
+            start_total_kbps,
+        )
+
+    attempt_total_kbps = start_total_kbps
+    attempt_idx = 0
+
+    while True:
+        attempt_idx += 1
+        target_video_kbps, target_audio_kbps = split_bitrate(attempt_total_kbps, audio_bitrate_kbps)
+
+        logger.info(
+            "S6 encode attempt #{} ({} profile): total={} kbps (video={} kbps, audio={} kbps)",
+            attempt_idx,
+            encoder_profile.name,
+            attempt_total_kbps,
+            target_video_kbps,
+            target_audio_kbps,
+        )
+
+        # Each attempt replaces the output only once its encode has finished.
+        with atomic_output(output_path) as attempt_path:
+            if segments:
+                _encode_segmented(
+                    segments=segments,
+                    segment_policy=segment_policy,
+                    bg_video_path=bg_source_path,
+                    fg_video_path=fg_video_path,
+                    tts_audio_path=tts_audio_path,
+                    output_path=str(attempt_path),
+                    target_duration=target_duration,
+                    bg_setpts_factor=graph_setpts_factor,
+                    bg_fps=bg_fps,
+                    scale_ratio=scale_ratio,
+                    margin_x=margin_x,
+                    margin_y=margin_y,
+                    encoder_profile=base_profile,
+                    video_kbps=target_video_kbps,
+                    audio_kbps=target_audio_kbps,
+                    thread_budget=thread_budget,
+                )
+            else:
+                common_cmd = [
+                    "ffmpeg",
+                    "-y",
+                    *filter_args,
+                    *input_args,
+                    "-i",
+                    bg_source_path,
+                    *input_args,
+                    "-i",
+                    fg_video_path,
+                    "-i",
+                    tts_audio_path,
+                    "-filter_complex",
+                    filter_complex,
+                    "-map",
+                    "[vout]",
+                    "-map",
+                    "2:a?",
+                    "-af",
+                    "apad",
+                    "-t",
+                    f"{target_duration:.3f}",
+                    "-fps_mode",
+                    "cfr",
+                    "-r",
+                    f"{bg_fps:.6f}",
+                    *encoder_profile.video_args(target_video_kbps),
+                    "-c:a",
+                    "aac",
+                    "-b:a",
+                    f"{target_audio_kbps}k",
+                    "-movflags",
+                    "+faststart",
+                    str(attempt_path),
+                ]
+                _run_ffmpeg(common_cmd, "compose", expected_duration_sec=target_duration)
+
+        output_size_bytes = Path(output_path).stat().st_size
+        output_size_mb = output_size_bytes / (1024 * 1024)
+        if attempt_idx == 1 and predicted_size_bytes is not None:
+            logger.info(
+                "S6 size prediction: predicted={} bytes, actual={} bytes, actual/predicted={:.3f}",
+                predicted_size_bytes,
+                output_size_bytes,
+                output_size_bytes / max(predicted_size_bytes, 1),
+            )
+        if output_size_mb <= max_output_size_mb:
+            return ComposeResult(
+                encode_attempts=attempt_idx,
+                total_kbps=attempt_total_kbps,
+                output_size_bytes=output_size_bytes,
+                segment_count=max(1, len(segments)),
+                predicted_size_bytes=predicted_size_bytes,
+            )
+
+        logger.warning(
+            "S6 encode oversize on attempt #{}: {:.2f} MB > {} MB at total={} kbps",
+            attempt_idx,
+            output_size_mb,
+            max_output_size_mb,
+            attempt_total_kbps,
+        )
+
+        next_total_kbps = retarget_total_kbps(
+            attempt_total_kbps=attempt_total_kbps,
+            measured_bytes=output_size_bytes,
+            max_output_size_mb=max_output_size_mb,
+            min_total_kbps=min_total_kbps,
+            min_step_kbps=step_kbps,
+        )
+        if next_total_kbps is None:
+            raise RuntimeError(
+                "ffmpeg compose exceeded max output size even at minimum bitrate: "
+                f"{output_size_mb:.2f} MB > {max_output_size_mb} MB (min_total={min_total_kbps} kbps)"
+            )
+
+        attempt_total_kbps = next_total_kbps
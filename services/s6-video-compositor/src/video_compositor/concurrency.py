@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import math
+import os
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+_CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+
+def _cgroup_cpu_limit(root: Path = _CGROUP_ROOT) -> float | None:
+    """CPU quota of this container in cores (cgroup v2 `cpu.max` or v1 CFS files), None when unlimited."""
+    cpu_max = root / "cpu.max"
+    try:
+        if cpu_max.exists():
+            quota, period = cpu_max.read_text(encoding="utf-8").split()[:2]
+            return None if quota == "max" else int(quota) / int(period)
+        quota_path = root / "cpu" / "cpu.cfs_quota_us"
+        period_path = root / "cpu" / "cpu.cfs_period_us"
+        if quota_path.exists() and period_path.exists():
+            quota_us = int(quota_path.read_text(encoding="utf-8"))
+            period_us = int(period_path.read_text(encoding="utf-8"))
+            return quota_us / period_us if quota_us > 0 and period_us > 0 else None
+    except (OSError, ValueError):
+        return None
+    return None
+
+
+def available_cpus(cgroup_root: Path = _CGROUP_ROOT) -> int:
+    """CPUs this process may actually use: the affinity mask, capped by any container CPU quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = _cgroup_cpu_limit(cgroup_root)
+    if quota is not None:
+        cpus = min(cpus, max(1, math.floor(quota)))
+    return max(1, cpus)
+
+
+@dataclass(frozen=True)
+class ThreadBudget:
+    """Threads one ffmpeg process may use for decoding, filtering and encoding."""
+
+    threads: int
+
+    def input_args(self) -> list[str]:
+        # Placed before an `-i`: decoder threads for that input.
+        return ["-threads", str(self.threads)]
+
+    def filter_args(self) -> list[str]:
+        return ["-filter_threads", str(self.threads), "-filter_complex_threads", str(self.threads)]
+
+
+@dataclass(frozen=True)
+class ConcurrencyPlan:
+    cpus: int
+    max_concurrent_encodes: int
+    threads_per_encode: int
+
+
+def plan_concurrency(*, cpus: int, max_concurrent_encodes: int, min_threads_per_encode: int) -> ConcurrencyPlan:
+    """Split `cpus` across concurrent encodes so their thread budgets add up to at most `cpus`.
+
+    `max_concurrent_encodes=0` sizes the pool automatically: as many encodes as
+    fit with at least `min_threads_per_encode` threads each.
+    """
+    cpus = max(1, cpus)
+    if max_concurrent_encodes <= 0:
+        concurrent = max(1, cpus // max(1, min_threads_per_encode))
+    else:
+        concurrent = min(max_concurrent_encodes, cpus)
+    return ConcurrencyPlan(
+        cpus=cpus,
+        max_concurrent_encodes=concurrent,
+        threads_per_encode=max(1, cpus // concurrent),
+    )
+
+
+class EncodeSlots:
+    """Bounded pool of concurrent s6 encodes, each holding an equal share of the host CPUs.
+
+    Dramatiq worker threads beyond the pool size wait for a free slot instead of
+    starting another ffmpeg and oversubscribing the cores.
+    """
+
+    def __init__(self, plan: ConcurrencyPlan) -> None:
+        self.plan = plan
+        self._semaphore = threading.BoundedSemaphore(plan.max_concurrent_encodes)
+
+    @contextmanager
+    def acquire(self) -> Iterator[ThreadBudget]:
+        with self._semaphore:
+            yield ThreadBudget(threads=self.plan.threads_per_encode)
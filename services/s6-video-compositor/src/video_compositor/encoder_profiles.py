@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from typing import Literal
+
+RateControl = Literal["capped_crf", "abr"]
+ProfileName = Literal["quality", "balanced", "throughput"]
+
+
+@dataclass(frozen=True)
+class EncoderProfile:
+    """Codec settings for one s6 encode.
+
+    `rate_control` is either `capped_crf` (CRF with the size-budget bitrate as a
+    VBV cap, best quality per bit) or `abr` (plain average bitrate with a tight
+    VBV, cheapest to encode and most predictable in size).
+    """
+
+    name: str
+    codec: str
+    preset: str
+    tune: str | None
+    threads: int
+    rate_control: RateControl
+    crf: int
+
+    def video_args(self, video_kbps: int) -> list[str]:
+        args = ["-c:v", self.codec, "-preset", self.preset]
+        if self.tune:
+            args += ["-tune", self.tune]
+        if self.threads > 0:
+            args += ["-threads", str(self.threads)]
+        if self.rate_control == "capped_crf":
+            args += [
+                "-crf",
+                str(self.crf),
+                "-b:v",
+                f"{video_kbps}k",
+                "-maxrate",
+                f"{video_kbps}k",
+                "-bufsize",
+                f"{video_kbps * 2}k",
+            ]
+        elif self.rate_control == "abr":
+            args += ["-b:v", f"{video_kbps}k", "-maxrate", f"{video_kbps}k", "-bufsize", f"{video_kbps}k"]
+        else:
+            raise ValueError(f"Unknown rate control mode: {self.rate_control!r}")
+        return args
+
+
+def build_profiles(*, x264_preset: str, x264_crf: int, threads: int = 0) -> dict[ProfileName, EncoderProfile]:
+    """Named profiles; `balanced` keeps the configured S6_X264_PRESET / S6_X264_CRF."""
+    profiles = {
+        "quality": EncoderProfile(
+            name="quality",
+            codec="libx264",
+            preset="medium",
+            tune=None,
+            threads=0,
+            rate_control="capped_crf",
+            crf=min(x264_crf, 20),
+        ),
+        "balanced": EncoderProfile(
+            name="balanced",
+            codec="libx264",
+            preset=x264_preset,
+            tune=None,
+            threads=0,
+            rate_control="capped_crf",
+            crf=x264_crf,
+        ),
+        "throughput": EncoderProfile(
+            name="throughput",
+            codec="libx264",
+            preset="ultrafast",
+            # No lookahead or B-frames: the cheapest x264 configuration.
+            tune="zerolatency",
+            threads=0,
+            rate_control="abr",
+            crf=x264_crf,
+        ),
+    }
+    if threads > 0:
+        profiles = {name: replace(profile, threads=threads) for name, profile in profiles.items()}
+    return profiles
+
+
+@dataclass(frozen=True)
+class ProfilePolicy:
+    """Pick a profile from backlog pressure: the deeper the queue or the older the job, the faster the encode."""
+
+    throughput_queue_depth: int
+    throughput_job_age_sec: float
+    quality_max_queue_depth: int
+    quality_max_job_age_sec: float
+
+    def select(self, *, queue_depth: int | None, job_age_sec: float | None) -> ProfileName:
+        depth = queue_depth if queue_depth is not None else 0
+        age = job_age_sec if job_age_sec is not None else 0.0
+        if depth >= self.throughput_queue_depth or age >= self.throughput_job_age_sec:
+            return "throughput"
+        # Quality is only worth its extra encode time when nothing is waiting and depth is known.
+        if queue_depth is not None and depth <= self.quality_max_queue_depth and age <= self.quality_max_job_age_sec:
+            return "quality"
+        return "balanced"
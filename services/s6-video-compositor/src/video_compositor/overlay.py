@@ -0,0 +1,163 @@
+"""Frame-level counterpart of the s6 overlay filter graph.
+
+`compose_video` overlays the s4 avatar with ffmpeg
+(`scale=iw*r:ih*r` + `overlay=margin_x:H-h-margin_y`). `OverlayCompositor`
+does the same on uint8 RGB frames already in memory, e.g. frames handed over by
+an inference worker, so they can be composited without a decode/encode round
+trip. Needs the `frames` extra (NumPy).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class OverlayGeometry:
+    """Where the scaled foreground lands on the background, clipped to the frame."""
+
+    scaled_width: int
+    scaled_height: int
+    x: int
+    y: int
+
+    @classmethod
+    def compute(
+        cls,
+        *,
+        bg_size: tuple[int, int],
+        fg_size: tuple[int, int],
+        scale_ratio: float,
+        margin_x: int,
+        margin_y: int,
+    ) -> OverlayGeometry:
+        bg_height, _ = bg_size
+        fg_height, fg_width = fg_size
+        # ffmpeg's scale filter truncates `iw*r` / `ih*r` to integers.
+        scaled_width = max(1, int(fg_width * scale_ratio))
+        scaled_height = max(1, int(fg_height * scale_ratio))
+        return cls(
+            scaled_width=scaled_width,
+            scaled_height=scaled_height,
+            x=margin_x,
+            y=bg_height - scaled_height - margin_y,
+        )
+
+
+def _cubic(x: np.ndarray, b: float = 0.0, c: float = 0.6) -> np.ndarray:
+    # swscale's SWS_BICUBIC kernel (the scale filter default): B=0, C=0.6.
+    x = np.abs(x)
+    near = ((12 - 9 * b - 6 * c) * x**3 + (-18 + 12 * b + 6 * c) * x**2 + (6 - 2 * b)) / 6
+    far = ((-b - 6 * c) * x**3 + (6 * b + 30 * c) * x**2 + (-12 * b - 48 * c) * x + (8 * b + 24 * c)) / 6
+    return np.where(x < 1, near, np.where(x < 2, far, 0.0))
+
+
+def _resample_taps(src_len: int, dst_len: int) -> tuple[np.ndarray, np.ndarray]:
+    """Source indices and normalized weights, shape (dst_len, taps), for one axis.
+
+    Pixel centres are aligned as in swscale, and on downscale the kernel is
+    widened by the scale factor so every source pixel contributes (no aliasing).
+    """
+    step = src_len / dst_len
+    stretch = max(1.0, step)
+    support = 2.0 * stretch
+    centre = (np.arange(dst_len, dtype=np.float64) + 0.5) * step - 0.5
+    taps = int(np.ceil(2 * support)) + 1
+    idx = np.floor(centre - support)[:, None] + 1 + np.arange(taps)[None, :]
+    weights = _cubic((idx - centre[:, None]) / stretch)
+    weights /= weights.sum(axis=1, keepdims=True)
+    return np.clip(idx, 0, src_len - 1).astype(np.intp), weights.astype(np.float32)
+
+
+class OverlayCompositor:
+    """Scale a foreground frame and paste it bottom-left onto a background, with NumPy.
+
+    Sampling taps and all intermediate buffers are computed once for the fixed
+    background/foreground sizes, so `compose` allocates nothing per frame. The
+    returned array is the compositor's own output buffer and is overwritten by
+    the next call; copy it if it must outlive that.
+    """
+
+    def __init__(
+        self,
+        *,
+        bg_size: tuple[int, int],
+        fg_size: tuple[int, int],
+        scale_ratio: float,
+        margin_x: int,
+        margin_y: int,
+        channels: int = 3,
+    ) -> None:
+        self.bg_size = bg_size
+        self.fg_size = fg_size
+        self.geometry = OverlayGeometry.compute(
+            bg_size=bg_size,
+            fg_size=fg_size,
+            scale_ratio=scale_ratio,
+            margin_x=margin_x,
+            margin_y=margin_y,
+        )
+        geo = self.geometry
+        bg_height, bg_width = bg_size
+        fg_height, fg_width = fg_size
+
+        # Visible part of the scaled foreground (overlay clips at the frame edges).
+        self._dst_y = slice(max(0, geo.y), min(bg_height, geo.y + geo.scaled_height))
+        self._dst_x = slice(max(0, geo.x), min(bg_width, geo.x + geo.scaled_width))
+        self._src_y = slice(self._dst_y.start - geo.y, self._dst_y.stop - geo.y)
+        self._src_x = slice(self._dst_x.start - geo.x, self._dst_x.stop - geo.x)
+        self._visible = self._dst_y.stop > self._dst_y.start and self._dst_x.stop > self._dst_x.start
+
+        self._identity = (geo.scaled_height, geo.scaled_width) == (fg_height, fg_width)
+        y_idx, y_weights = _resample_taps(fg_height, geo.scaled_height)
+        x_idx, x_weights = _resample_taps(fg_width, geo.scaled_width)
+        # Only the visible rows/columns are ever computed.
+        self._y_idx, self._y_weights = y_idx[self._src_y], y_weights[self._src_y, :, None, None]
+        self._x_idx, self._x_weights = x_idx[self._src_x], x_weights[None, self._src_x, :, None]
+        rows = self._y_idx.shape[0]
+        cols = self._x_idx.shape[0]
+
+        self._out = np.empty((bg_height, bg_width, channels), dtype=np.uint8)
+        self._gather = np.empty((rows, fg_width, channels), dtype=np.uint8)
+        self._rows_tap = np.empty((rows, fg_width, channels), dtype=np.float32)
+        self._rows = np.empty((rows, fg_width, channels), dtype=np.float32)
+        self._cols_tap = np.empty((rows, cols, channels), dtype=np.float32)
+        self._scaled = np.empty((rows, cols, channels), dtype=np.float32)
+
+    def _scale(self, fg: np.ndarray) -> np.ndarray:
+        # Separable resample: vertical pass over whole source rows, then horizontal,
+        # one weighted gather per tap into preallocated buffers.
+        self._rows.fill(0)
+        for tap in range(self._y_idx.shape[1]):
+            np.take(fg, self._y_idx[:, tap], axis=0, out=self._gather)
+            np.copyto(self._rows_tap, self._gather)
+            self._rows_tap *= self._y_weights[:, tap]
+            self._rows += self._rows_tap
+
+        self._scaled.fill(0.5)
+        for tap in range(self._x_idx.shape[1]):
+            np.take(self._rows, self._x_idx[:, tap], axis=1, out=self._cols_tap)
+            self._cols_tap *= self._x_weights[:, :, tap]
+            self._scaled += self._cols_tap
+        # The cubic kernel overshoots at edges; the +0.5 above makes the uint8 cast round.
+        np.clip(self._scaled, 0, 255, out=self._scaled)
+        return self._scaled
+
+    def compose(self, bg: np.ndarray, fg: np.ndarray | None) -> np.ndarray:
+        """Composite one frame pair; `fg=None` passes the background through (eof_action=pass)."""
+        if bg.shape[:2] != self.bg_size:
+            raise ValueError(f"Background frame is {bg.shape[:2]}, compositor expects {self.bg_size}")
+        np.copyto(self._out, bg)
+        if fg is None or not self._visible:
+            return self._out
+        if fg.shape[:2] != self.fg_size:
+            raise ValueError(f"Foreground frame is {fg.shape[:2]}, compositor expects {self.fg_size}")
+
+        region = self._out[self._dst_y, self._dst_x]
+        if self._identity:
+            np.copyto(region, fg[self._src_y, self._src_x])
+        else:
+            np.copyto(region, self._scale(fg), casting="unsafe")
+        return self._out
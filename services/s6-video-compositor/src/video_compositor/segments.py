@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+
+# Inputs are seeked this far before a segment so every frame the filter graph
+# needs at the segment start (previous fg frame, nearest bg frame) is decoded.
+SEEK_PREROLL_SEC = 1.0
+
+
+@dataclass(frozen=True)
+class Segment:
+    """A run of output frames `[start_frame, start_frame + frame_count)` encoded on its own."""
+
+    index: int
+    start_frame: int
+    frame_count: int
+
+    def start_sec(self, fps: float) -> float:
+        return self.start_frame / fps
+
+
+def gop_frames(fps: float, gop_sec: float) -> int:
+    return max(1, int(round(fps * gop_sec)))
+
+
+def plan_segments(*, total_frames: int, segment_frames: int, gop: int) -> list[Segment]:
+    """Split `total_frames` into GOP-aligned segments of about `segment_frames` each.
+
+    Every segment but the last is a whole number of GOPs, so each starts on the
+    keyframe the monolithic encode would have placed there. A tail shorter than
+    one GOP is folded into the previous segment.
+    """
+    if total_frames <= 0:
+        return []
+    gop = max(1, gop)
+    length = max(gop, segment_frames // gop * gop)
+    starts = list(range(0, total_frames, length))
+    if len(starts) > 1 and total_frames - starts[-1] < gop:
+        starts.pop()
+    bounds = starts + [total_frames]
+    return [
+        Segment(index=idx, start_frame=start, frame_count=end - start)
+        for idx, (start, end) in enumerate(zip(bounds, bounds[1:]))
+    ]
+
+
+def seek_offset(timeline_sec: float) -> float:
+    """Whole-second input seek point at least `SEEK_PREROLL_SEC` before `timeline_sec`.
+
+    Whole seconds are exact in every stream time base, so shifting the seeked
+    input back by this offset reproduces the unseeked timestamps bit for bit
+    and the fps/overlay filters pick the same frames as the monolithic encode.
+    """
+    return float(max(0, math.floor(timeline_sec - SEEK_PREROLL_SEC)))
+
+
+@dataclass(frozen=True)
+class SegmentPolicy:
+    """When and how `compose_video` splits the timeline; see the S6_SEGMENT_* settings."""
+
+    min_duration_sec: float
+    segment_duration_sec: float
+    gop_sec: float
+    workers: int
+
+    def plan(self, *, duration_sec: float, fps: float) -> list[Segment]:
+        """Segments for a composition, or an empty list when it should be encoded in one piece."""
+        if duration_sec < self.min_duration_sec:
+            return []
+        segments = plan_segments(
+            total_frames=int(round(duration_sec * fps)),
+            segment_frames=int(round(self.segment_duration_sec * fps)),
+            gop=gop_frames(fps, self.gop_sec),
+        )
+        return segments if len(segments) > 1 else []
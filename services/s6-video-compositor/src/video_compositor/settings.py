@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+from typing import Literal
+
+from core.durability import Durability
 from pydantic import AliasChoices, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -23,6 +26,21 @@ class Settings(BaseSettings):
         description="Directory to store composed videos",
         validation_alias=AliasChoices("S6_OUTPUT_DIR", "output_dir"),
     )
+    artifact_store_enabled: bool = Field(
+        False,
+        description="Write outputs through the shared content-addressed artifact store instead of output_dir",
+        validation_alias=AliasChoices("S6_ARTIFACT_STORE_ENABLED", "artifact_store_enabled"),
+    )
+    artifact_store_dir: str = Field(
+        "/data/artifacts",
+        description="Root of the shared artifact store (must be on the same filesystem for every stage)",
+        validation_alias=AliasChoices("S6_ARTIFACT_STORE_DIR", "ARTIFACT_STORE_DIR", "artifact_store_dir"),
+    )
+    durability: Durability = Field(
+        "file",
+        description="How outputs are flushed before the downstream enqueue: none, file (fsync the output and its directory) or host (os.sync)",
+        validation_alias=AliasChoices("S6_DURABILITY", "durability"),
+    )
     current_queue: str = Field(
         "s6-video-compositor",
         description="Dramatiq queue consumed by this service",
@@ -55,17 +73,158 @@ class Settings(BaseSettings):
     )
     x264_preset: str = Field(
         "veryfast",
-        description="x264 preset when using libx264",
+        description="x264 preset of the balanced encoder profile",
         validation_alias=AliasChoices("S6_X264_PRESET", "x264_preset"),
     )
     x264_crf: int = Field(
         20,
-        description="x264 CRF when using libx264",
+        description="x264 CRF of the balanced encoder profile (quality uses at most 20)",
         validation_alias=AliasChoices("S6_X264_CRF", "x264_crf"),
     )
+    encoder_profile: Literal["auto", "quality", "balanced", "throughput"] = Field(
+        "balanced",
+        description="Encoder profile: a fixed profile name, or auto (opt-in: pick from queue depth / job age)",
+        validation_alias=AliasChoices("S6_ENCODER_PROFILE", "encoder_profile"),
+    )
+    encoder_threads: int = Field(
+        0,
+        description="ffmpeg encoder threads for every profile (0 = let ffmpeg decide)",
+        validation_alias=AliasChoices("S6_ENCODER_THREADS", "encoder_threads"),
+        ge=0,
+    )
+    cpu_limit: int = Field(
+        0,
+        description="CPUs shared by concurrent encodes (0 = detect from affinity and cgroup quota)",
+        validation_alias=AliasChoices("S6_CPU_LIMIT", "cpu_limit"),
+        ge=0,
+    )
+    max_concurrent_encodes: int = Field(
+        0,
+        description="Upper bound on ffmpeg encodes running at once (0 = as many as the CPU budget allows)",
+        validation_alias=AliasChoices("S6_MAX_CONCURRENT_ENCODES", "max_concurrent_encodes"),
+        ge=0,
+    )
+    min_threads_per_encode: int = Field(
+        2,
+        description="Auto concurrency: CPUs each encode gets at minimum",
+        validation_alias=AliasChoices("S6_MIN_THREADS_PER_ENCODE", "min_threads_per_encode"),
+        ge=1,
+    )
+    size_analysis: bool = Field(
+        False,
+        description="Run a fast decimated encode first and pick the full encode's bitrate from its size",
+        validation_alias=AliasChoices("S6_SIZE_ANALYSIS", "size_analysis"),
+    )
+    size_analysis_scale: float = Field(
+        0.5,
+        description="Size analysis: resolution scale of the analysis encode",
+        validation_alias=AliasChoices("S6_SIZE_ANALYSIS_SCALE", "size_analysis_scale"),
+        gt=0,
+        le=1,
+    )
+    size_analysis_fps_divisor: int = Field(
+        2,
+        description="Size analysis: the analysis encode runs at the output fps divided by this",
+        validation_alias=AliasChoices("S6_SIZE_ANALYSIS_FPS_DIVISOR", "size_analysis_fps_divisor"),
+        ge=1,
+    )
+    size_analysis_factor: float = Field(
+        1.0,
+        description="Size analysis: calibration multiplier on the predicted video bitrate",
+        validation_alias=AliasChoices("S6_SIZE_ANALYSIS_FACTOR", "size_analysis_factor"),
+        gt=0,
+    )
+    bg_cache_enabled: bool = Field(
+        False,
+        description="Reuse time-remapped backgrounds across jobs with the same source, duration and fps",
+        validation_alias=AliasChoices("S6_BG_CACHE_ENABLED", "bg_cache_enabled"),
+    )
+    bg_cache_dir: str = Field(
+        "/data/s6/bg-cache",
+        description="Directory holding remapped background intermediates",
+        validation_alias=AliasChoices("S6_BG_CACHE_DIR", "bg_cache_dir"),
+    )
+    bg_cache_max_mb: int = Field(
+        2048,
+        description="Disk cap for the background cache in MB; least recently used entries are removed first",
+        validation_alias=AliasChoices("S6_BG_CACHE_MAX_MB", "bg_cache_max_mb"),
+        ge=0,
+    )
+    bg_cache_crf: int = Field(
+        16,
+        description="x264 CRF of cached background intermediates",
+        validation_alias=AliasChoices("S6_BG_CACHE_CRF", "bg_cache_crf"),
+        ge=0,
+        le=51,
+    )
+    segment_parallel: bool = Field(
+        False,
+        description="Encode long compositions as GOP-aligned segments in parallel and concatenate them",
+        validation_alias=AliasChoices("S6_SEGMENT_PARALLEL", "segment_parallel"),
+    )
+    segment_min_duration_sec: float = Field(
+        60.0,
+        description="Segment-parallel mode: compositions shorter than this are encoded in one piece",
+        validation_alias=AliasChoices("S6_SEGMENT_MIN_DURATION_SEC", "segment_min_duration_sec"),
+        ge=0,
+    )
+    segment_duration_sec: float = Field(
+        20.0,
+        description="Segment-parallel mode: target segment length in seconds (rounded to whole GOPs)",
+        validation_alias=AliasChoices("S6_SEGMENT_DURATION_SEC", "segment_duration_sec"),
+        gt=0,
+    )
+    segment_gop_sec: float = Field(
+        2.0,
+        description="Segment-parallel mode: keyframe interval in seconds; segment boundaries fall on it",
+        validation_alias=AliasChoices("S6_SEGMENT_GOP_SEC", "segment_gop_sec"),
+        gt=0,
+    )
+    segment_workers: int = Field(
+        0,
+        description="Segment-parallel mode: segments encoded at once (0 = half the encode's thread budget)",
+        validation_alias=AliasChoices("S6_SEGMENT_WORKERS", "segment_workers"),
+        ge=0,
+    )
+    profile_throughput_queue_depth: int = Field(
+        10,
+        description="Auto profile: queued messages at or above which the throughput profile is used",
+        validation_alias=AliasChoices(
+            "S6_PROFILE_THROUGHPUT_QUEUE_DEPTH",
+            "profile_throughput_queue_depth",
+        ),
+        ge=1,
+    )
+    profile_throughput_job_age_sec: float = Field(
+        300.0,
+        description="Auto profile: job age in seconds at or above which the throughput profile is used",
+        validation_alias=AliasChoices(
+            "S6_PROFILE_THROUGHPUT_JOB_AGE_SEC",
+            "profile_throughput_job_age_sec",
+        ),
+        gt=0,
+    )
+    profile_quality_max_queue_depth: int = Field(
+        0,
+        description="Auto profile: quality profile is used only when at most this many messages are queued",
+        validation_alias=AliasChoices(
+            "S6_PROFILE_QUALITY_MAX_QUEUE_DEPTH",
+            "profile_quality_max_queue_depth",
+        ),
+        ge=0,
+    )
+    profile_quality_max_job_age_sec: float = Field(
+        60.0,
+        description="Auto profile: quality profile is used only for jobs younger than this many seconds",
+        validation_alias=AliasChoices(
+            "S6_PROFILE_QUALITY_MAX_JOB_AGE_SEC",
+            "profile_quality_max_job_age_sec",
+        ),
+        ge=0,
+    )
     target_total_bitrate_mbps: float = Field(
         0.6,
-        description="Fallback total bitrate budget in Mbps (video + audio) when reduction is needed",
+        description="Total bitrate in Mbps (video + audio) used when the s2 source bitrate is unknown",
         validation_alias=AliasChoices(
             "S6_TARGET_TOTAL_BITRATE_MBPS",
             "target_total_bitrate_mbps",
@@ -81,7 +240,7 @@ class Settings(BaseSettings):
     )
     bitrate_step_kbps: int = Field(
         50,
-        description="Step size in kbps when reducing total bitrate across retries",
+        description="Minimum total bitrate reduction in kbps between oversize retries",
         validation_alias=AliasChoices("S6_BITRATE_STEP_KBPS", "bitrate_step_kbps"),
     )
     audio_bitrate_kbps: int = Field(
@@ -0,0 +1,147 @@
+import shutil
+import subprocess
+
+import pytest
+
+from media.bitrate import CONTAINER_OVERHEAD_RATIO
+
+from video_compositor import compose
+from video_compositor.analysis import PIXEL_RATE_EXPONENT, AnalysisPolicy, predict_output_bytes, scale_prediction
+from video_compositor.encoder_profiles import build_profiles
+
+
+_ABR = dict(rate_control="abr", pixel_rate_ratio=8.0, video_kbps=10_000)
+
+
+def test_abr_prediction_extrapolates_video_bitrate_and_adds_audio():
+    predicted = predict_output_bytes(
+        analysis_video_bytes=1_000_000,
+        analysis_duration_sec=40.0,
+        duration_sec=40.0,
+        audio_kbps=96,
+        size_factor=1.0,
+        **_ABR,
+    )
+
+    payload = 1_000_000 + 96_000 * 40 / 8
+    assert predicted == int(payload / (1 - CONTAINER_OVERHEAD_RATIO))
+
+
+def test_capped_crf_prediction_scales_by_pixel_rate_up_to_the_cap():
+    kwargs = dict(analysis_duration_sec=10.0, duration_sec=10.0, audio_kbps=0, size_factor=1.0)
+    kwargs.update(rate_control="capped_crf", pixel_rate_ratio=8.0, video_kbps=2_000)
+
+    uncapped = predict_output_bytes(analysis_video_bytes=100_000, **kwargs)
+    capped = predict_output_bytes(analysis_video_bytes=1_000_000, **kwargs)
+
+    assert uncapped == int(100_000 * 8.0**PIXEL_RATE_EXPONENT / (1 - CONTAINER_OVERHEAD_RATIO))
+    assert capped == int(2_000_000 * 10 / 8 / (1 - CONTAINER_OVERHEAD_RATIO))
+
+
+def test_size_factor_scales_only_the_video_part():
+    kwargs = dict(analysis_video_bytes=800_000, analysis_duration_sec=20.0, duration_sec=20.0, audio_kbps=64, **_ABR)
+
+    base = predict_output_bytes(size_factor=1.0, **kwargs)
+    calibrated = predict_output_bytes(size_factor=1.25, **kwargs)
+
+    assert calibrated - base == pytest.approx(200_000 / (1 - CONTAINER_OVERHEAD_RATIO), abs=1)
+
+
+def test_prediction_follows_a_retargeted_bitrate():
+    assert scale_prediction(3_000_000, predicted_total_kbps=600, total_kbps=450) == 2_250_000
+
+
+def test_analysis_fps_is_decimated():
+    policy = AnalysisPolicy(scale=0.5, fps_divisor=3, size_factor=1.0)
+
+    assert policy.analysis_fps(30.0) == 10.0
+    assert policy.pixel_rate_ratio() == 12.0
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_analysis_encode_is_downscaled_and_decimated(tmp_path, monkeypatch):
+    bg, fg = tmp_path / "bg.mp4", tmp_path / "fg.mp4"
+    for path, source in ((bg, "testsrc2=size=320x568:rate=30:duration=5"), (fg, "testsrc=size=128x128:rate=25:duration=4")):
+        subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i", source, str(path)], check=True)
+    seen = []
+
+    def _capture(cmd, what, **_):
+        seen.append(cmd)
+        subprocess.run(cmd, check=True, capture_output=True)
+        frames = subprocess.run(
+            ["ffmpeg", "-loglevel", "error", "-i", cmd[-1], "-f", "framemd5", "-"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        seen.append(frames)
+
+    monkeypatch.setattr(compose, "_run_ffmpeg", _capture)
+    size = compose._analysis_encode(
+        analysis_policy=AnalysisPolicy(scale=0.5, fps_divisor=2, size_factor=1.0),
+        bg_video_path=str(bg),
+        fg_video_path=str(fg),
+        output_dir=tmp_path,
+        target_duration=4.0,
+        bg_setpts_factor=0.8,
+        bg_fps=30.0,
+        scale_ratio=0.35,
+        margin_x=4,
+        margin_y=4,
+        encoder_profile=build_profiles(x264_preset="veryfast", x264_crf=23)["balanced"],
+        video_kbps=300,
+        thread_budget=None,
+    )
+
+    cmd, frames = seen
+    assert size > 0
+    assert cmd[cmd.index("-preset") + 1] == "ultrafast"
+    assert "#dimensions 0: 160x284" in frames
+    assert sum(1 for line in frames.splitlines() if not line.startswith("#")) == 60
+    assert not list(tmp_path.glob(".analysis_*"))
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+@pytest.mark.parametrize("video_kbps", [20_000, 400])
+def test_capped_crf_prediction_tracks_a_real_full_encode(tmp_path, monkeypatch, video_kbps):
+    # 20 Mbps leaves the CRF in charge; 400 kbps makes the cap bind in both encodes.
+    bg, fg = tmp_path / "bg.mp4", tmp_path / "fg.mp4"
+    for path, source in ((bg, "testsrc2=size=360x640:rate=30:duration=5"), (fg, "mandelbrot=size=128x128:rate=25")):
+        cmd = ["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i", source, "-t", "4"]
+        subprocess.run([*cmd, "-c:v", "libx264", "-preset", "ultrafast", str(path)], check=True)
+    monkeypatch.setattr(compose, "_run_ffmpeg", lambda cmd, what, **_: subprocess.run(cmd, check=True, capture_output=True))
+    profile = build_profiles(x264_preset="veryfast", x264_crf=23)["balanced"]
+    analysis_policy = AnalysisPolicy(scale=0.5, fps_divisor=2, size_factor=1.0)
+
+    def _encode(policy: AnalysisPolicy) -> int:
+        return compose._analysis_encode(
+            analysis_policy=policy,
+            bg_video_path=str(bg),
+            fg_video_path=str(fg),
+            output_dir=tmp_path,
+            target_duration=4.0,
+            bg_setpts_factor=0.8,
+            bg_fps=30.0,
+            scale_ratio=0.35,
+            margin_x=4,
+            margin_y=4,
+            encoder_profile=profile,
+            video_kbps=video_kbps,
+            thread_budget=None,
+        )
+
+    # Same preset as the analysis, so only resolution and fps differ.
+    full_bytes = _encode(AnalysisPolicy(scale=1.0, fps_divisor=1, size_factor=1.0))
+    predicted = predict_output_bytes(
+        analysis_video_bytes=_encode(analysis_policy),
+        analysis_duration_sec=4.0,
+        duration_sec=4.0,
+        audio_kbps=0,
+        size_factor=1.0,
+        rate_control=profile.rate_control,
+        pixel_rate_ratio=analysis_policy.pixel_rate_ratio(),
+        video_kbps=video_kbps,
+    )
+
+    # Within 40%; extrapolating the capped analysis bitrate unscaled was off by about 6x.
+    assert predicted * (1 - CONTAINER_OVERHEAD_RATIO) == pytest.approx(full_bytes, rel=0.4)
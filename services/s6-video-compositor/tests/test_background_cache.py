@@ -0,0 +1,71 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from video_compositor.background_cache import BackgroundCache
+
+
+def _entry(cache, name, size, mtime):
+    path = cache.root / f"{name}.mp4"
+    path.write_bytes(b"\0" * size)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_same_content_at_new_path_maps_to_same_entry(tmp_path):
+    cache = BackgroundCache(tmp_path / "cache", max_bytes=1024, crf=16)
+    first, second = tmp_path / "a.mp4", tmp_path / "b.mp4"
+    first.write_bytes(b"douyin-bytes")
+    second.write_bytes(b"douyin-bytes")
+
+    key = cache.source_hash(str(first))
+    assert key == cache.source_hash(str(second))
+    assert cache.entry_path(key, duration_sec=12.5, fps=30.0) != cache.entry_path(key, duration_sec=12.5, fps=25.0)
+    assert cache.entry_path(key, duration_sec=12.5, fps=30.0) != cache.entry_path(key, duration_sec=10.0, fps=30.0)
+
+
+def test_evicts_least_recently_used_until_under_cap(tmp_path):
+    cache = BackgroundCache(tmp_path, max_bytes=250, crf=16)
+    oldest = _entry(cache, "oldest", 100, 1_000)
+    middle = _entry(cache, "middle", 100, 2_000)
+    newest = _entry(cache, "newest", 100, 3_000)
+    (tmp_path / ".building.mp4").write_bytes(b"\0" * 500)
+
+    assert cache.evict() == [oldest]
+    assert middle.exists() and newest.exists()
+    assert (tmp_path / ".building.mp4").exists()
+
+
+def test_eviction_spares_the_entry_being_returned(tmp_path):
+    cache = BackgroundCache(tmp_path, max_bytes=50, crf=16)
+    older = _entry(cache, "older", 100, 1_000)
+    kept = _entry(cache, "kept", 100, 500)
+
+    assert cache.evict(keep=kept) == [older]
+    assert kept.exists()
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_remapped_background_is_built_once_and_reused(tmp_path):
+    source = tmp_path / "bg.mp4"
+    subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i", "testsrc2=size=160x284:rate=30:duration=6", str(source)],
+        check=True,
+    )
+    cache = BackgroundCache(tmp_path / "cache", max_bytes=64 * 1024 * 1024, crf=16)
+
+    first = cache.get_or_create(str(source), duration_sec=4.0, fps=25.0, setpts_factor=4.0 / 6.0)
+    second = cache.get_or_create(str(source), duration_sec=4.0, fps=25.0, setpts_factor=4.0 / 6.0)
+
+    assert first == second
+    assert (cache.hits, cache.misses) == (1, 1)
+    frames = subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-i", first, "-f", "framemd5", "-"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert sum(1 for line in frames.splitlines() if not line.startswith("#")) == 100
+    assert [path.name for path in (tmp_path / "cache").iterdir()] == [os.path.basename(first)]
@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+from video_compositor.concurrency import EncodeSlots, _cgroup_cpu_limit, available_cpus, plan_concurrency
+
+
+@pytest.mark.parametrize(
+    ("cpus", "max_concurrent", "min_threads", "expected"),
+    [
+        (8, 0, 2, (4, 2)),
+        (8, 0, 3, (2, 4)),
+        (8, 3, 2, (3, 2)),
+        (2, 4, 2, (2, 1)),
+        (1, 0, 2, (1, 1)),
+        (16, 1, 2, (1, 16)),
+    ],
+)
+def test_plan_never_oversubscribes_cpus(cpus, max_concurrent, min_threads, expected):
+    plan = plan_concurrency(cpus=cpus, max_concurrent_encodes=max_concurrent, min_threads_per_encode=min_threads)
+    assert (plan.max_concurrent_encodes, plan.threads_per_encode) == expected
+    assert plan.max_concurrent_encodes * plan.threads_per_encode <= cpus
+
+
+def test_cgroup_v2_quota(tmp_path):
+    (tmp_path / "cpu.max").write_text("250000 100000\n", encoding="utf-8")
+    assert _cgroup_cpu_limit(tmp_path) == 2.5
+
+    (tmp_path / "cpu.max").write_text("max 100000\n", encoding="utf-8")
+    assert _cgroup_cpu_limit(tmp_path) is None
+
+
+def test_cgroup_v1_quota(tmp_path):
+    (tmp_path / "cpu").mkdir()
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("300000\n", encoding="utf-8")
+    (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000\n", encoding="utf-8")
+    assert _cgroup_cpu_limit(tmp_path) == 3.0
+
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("-1\n", encoding="utf-8")
+    assert _cgroup_cpu_limit(tmp_path) is None
+
+
+def test_available_cpus_respects_quota(tmp_path):
+    (tmp_path / "cpu.max").write_text("50000 100000\n", encoding="utf-8")
+    assert available_cpus(tmp_path) == 1
+    assert available_cpus(tmp_path / "missing") >= 1
+
+
+def test_slots_bound_concurrent_encodes():
+    slots = EncodeSlots(plan_concurrency(cpus=4, max_concurrent_encodes=2, min_threads_per_encode=1))
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+    budgets = []
+
+    def encode():
+        nonlocal active, peak
+        with slots.acquire() as budget:
+            with lock:
+                active += 1
+                peak = max(peak, active)
+                budgets.append(budget.threads)
+            time.sleep(0.02)
+            with lock:
+                active -= 1
+
+    threads = [threading.Thread(target=encode) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak == 2
+    assert budgets == [2] * 6
+
+
+def test_thread_budget_args():
+    slots = EncodeSlots(plan_concurrency(cpus=6, max_concurrent_encodes=2, min_threads_per_encode=1))
+    with slots.acquire() as budget:
+        assert budget.input_args() == ["-threads", "3"]
+        assert budget.filter_args() == ["-filter_threads", "3", "-filter_complex_threads", "3"]
@@ -0,0 +1,98 @@
+import shutil
+import subprocess
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from video_compositor.overlay import OverlayCompositor, OverlayGeometry  # noqa: E402
+
+
+def test_geometry_matches_ffmpeg_scale_and_bottom_left_overlay():
+    geo = OverlayGeometry.compute(bg_size=(1280, 720), fg_size=(512, 512), scale_ratio=0.35, margin_x=20, margin_y=30)
+
+    assert (geo.scaled_width, geo.scaled_height) == (179, 179)
+    assert (geo.x, geo.y) == (20, 1280 - 179 - 30)
+
+
+def test_unscaled_foreground_is_pasted_exactly():
+    bg = np.zeros((40, 30, 3), dtype=np.uint8)
+    fg = np.arange(8 * 6 * 3, dtype=np.uint8).reshape(8, 6, 3)
+    compositor = OverlayCompositor(bg_size=(40, 30), fg_size=(8, 6), scale_ratio=1.0, margin_x=2, margin_y=3)
+
+    out = compositor.compose(bg, fg)
+
+    np.testing.assert_array_equal(out[29:37, 2:8], fg)
+    assert out[:29].sum() == 0 and out[37:].sum() == 0
+    assert bg.sum() == 0
+
+
+def test_flat_foreground_stays_flat_after_scaling():
+    bg = np.full((64, 64, 3), 10, dtype=np.uint8)
+    fg = np.full((32, 32, 3), 200, dtype=np.uint8)
+    compositor = OverlayCompositor(bg_size=(64, 64), fg_size=(32, 32), scale_ratio=0.35, margin_x=0, margin_y=0)
+
+    out = compositor.compose(bg, fg)
+
+    assert compositor.geometry.scaled_height == 11
+    np.testing.assert_array_equal(out[53:, :11], 200)
+    np.testing.assert_array_equal(out[:53], 10)
+    np.testing.assert_array_equal(out[53:, 11:], 10)
+
+
+def test_overlay_is_clipped_at_frame_edges():
+    bg = np.zeros((10, 10, 3), dtype=np.uint8)
+    fg = np.full((8, 8, 3), 255, dtype=np.uint8)
+    compositor = OverlayCompositor(bg_size=(10, 10), fg_size=(8, 8), scale_ratio=1.0, margin_x=6, margin_y=-4)
+
+    out = compositor.compose(bg, fg)
+
+    assert out[6:, 6:].min() == 255
+    assert out[:6].max() == 0 and out[:, :6].max() == 0
+
+
+def test_missing_foreground_passes_background_through_and_buffer_is_reused():
+    bg = np.random.default_rng(0).integers(0, 255, (16, 16, 3), dtype=np.uint8)
+    fg = np.zeros((8, 8, 3), dtype=np.uint8)
+    compositor = OverlayCompositor(bg_size=(16, 16), fg_size=(8, 8), scale_ratio=0.5, margin_x=1, margin_y=1)
+
+    first = compositor.compose(bg, fg)
+    second = compositor.compose(bg, None)
+
+    assert first is second
+    np.testing.assert_array_equal(second, bg)
+
+
+def test_rejects_frames_of_the_wrong_size():
+    compositor = OverlayCompositor(bg_size=(16, 16), fg_size=(8, 8), scale_ratio=0.5, margin_x=0, margin_y=0)
+
+    with pytest.raises(ValueError):
+        compositor.compose(np.zeros((8, 8, 3), dtype=np.uint8), None)
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_scaled_overlay_matches_ffmpeg_rgb_overlay(tmp_path):
+    bg_size, fg_size = (256, 144), (128, 128)
+    raw = ["-f", "rawvideo", "-pix_fmt", "rgb24"]
+    bg_path, fg_path = tmp_path / "bg.rgb", tmp_path / "fg.rgb"
+    for path, source, (height, width) in ((bg_path, "testsrc2", bg_size), (fg_path, "testsrc", fg_size)):
+        subprocess.run(
+            ["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i", f"{source}=size={width}x{height}"]
+            + ["-frames:v", "1", *raw, str(path)],
+            check=True,
+        )
+    result = subprocess.run(
+        ["ffmpeg", "-loglevel", "error", *raw, "-s", "144x256", "-i", str(bg_path), *raw, "-s", "128x128", "-i", str(fg_path)]
+        + ["-filter_complex", "[1:v]scale=iw*0.3500:ih*0.3500[fg];[0:v][fg]overlay=10:H-h-12:format=rgb[vout]"]
+        + ["-map", "[vout]", *raw, "-"],
+        capture_output=True,
+        check=True,
+    )
+    expected = np.frombuffer(result.stdout, dtype=np.uint8).reshape(*bg_size, 3)
+    bg = np.fromfile(bg_path, dtype=np.uint8).reshape(*bg_size, 3)
+    fg = np.fromfile(fg_path, dtype=np.uint8).reshape(*fg_size, 3)
+
+    out = OverlayCompositor(bg_size=bg_size, fg_size=fg_size, scale_ratio=0.35, margin_x=10, margin_y=12).compose(bg, fg)
+
+    mse = np.mean((out.astype(np.float64) - expected) ** 2)
+    assert 10 * np.log10(255**2 / mse) > 45
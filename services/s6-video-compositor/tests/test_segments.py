@@ -0,0 +1,156 @@
+import shutil
+import subprocess
+
+import pytest
+from media import overlay_filter_complex
+
+from video_compositor.compose import _encode_segment, compose_video
+from video_compositor.concurrency import ThreadBudget
+from video_compositor.encoder_profiles import build_profiles
+from video_compositor.segments import SegmentPolicy, plan_segments, seek_offset
+
+_requires_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+_requires_ffprobe = pytest.mark.skipif(
+    shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None,
+    reason="ffmpeg/ffprobe not installed",
+)
+
+
+def test_segments_are_whole_gops_and_cover_every_frame():
+    segments = plan_segments(total_frames=1000, segment_frames=310, gop=60)
+
+    assert [segment.start_frame for segment in segments] == [0, 300, 600, 900]
+    assert all(segment.frame_count == 300 for segment in segments[:-1])
+    assert sum(segment.frame_count for segment in segments) == 1000
+
+
+def test_short_tail_is_folded_into_previous_segment():
+    segments = plan_segments(total_frames=630, segment_frames=300, gop=60)
+
+    assert [(segment.start_frame, segment.frame_count) for segment in segments] == [(0, 300), (300, 330)]
+
+
+def test_policy_keeps_short_compositions_in_one_piece():
+    policy = SegmentPolicy(min_duration_sec=60, segment_duration_sec=20, gop_sec=2, workers=0)
+
+    assert policy.plan(duration_sec=45.0, fps=30.0) == []
+    assert len(policy.plan(duration_sec=90.0, fps=30.0)) == 5
+
+
+def test_seek_offset_is_whole_seconds_before_the_segment():
+    assert seek_offset(0.0) == 0.0
+    assert seek_offset(0.9) == 0.0
+    assert seek_offset(10.01) == 9.0
+    assert seek_offset(10.0) == 9.0
+
+
+def _lavfi(path, source, duration_sec):
+    subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i", f"{source}:duration={duration_sec}", str(path)],
+        check=True,
+    )
+
+
+def _frame_hashes(path):
+    result = subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-i", str(path), "-map", "0:v", "-f", "framemd5", "-"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return [line.rsplit(",", 1)[-1].strip() for line in result.stdout.splitlines() if not line.startswith("#")]
+
+
+@_requires_ffmpeg
+def test_segments_reproduce_the_one_piece_frames_exactly(tmp_path):
+    # 29.97 fps background slowed down to a 25 fps foreground: segment starts fall
+    # between source frames, the case where naive per-segment seeking drifts.
+    bg, fg = tmp_path / "bg.mp4", tmp_path / "fg.mp4"
+    _lavfi(bg, "testsrc2=size=160x284:rate=30000/1001", 5.1)
+    _lavfi(fg, "testsrc=size=64x64:rate=25", 7)
+    fps = 30000 / 1001
+    factor = 7 / 5.1
+    lossless = ["-c:v", "libx264", "-preset", "ultrafast", "-qp", "0"]
+    total_frames = int(round(7 * fps))
+
+    whole = tmp_path / "whole.mp4"
+    graph = overlay_filter_complex(
+        bg_setpts=f"PTS*{factor:.8f}",
+        fg_setpts="PTS-STARTPTS",
+        bg_fps=fps,
+        scale_ratio=0.5,
+        margin_x=4,
+        margin_y=4,
+    )
+    subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-i", str(bg), "-i", str(fg), "-filter_complex", graph]
+        + ["-map", "[vout]", "-frames:v", str(total_frames), "-fps_mode", "cfr", "-r", f"{fps:.6f}", *lossless]
+        + [str(whole)],
+        check=True,
+    )
+
+    pieces = []
+    for segment in plan_segments(total_frames=total_frames, segment_frames=64, gop=32):
+        piece = tmp_path / f"segment_{segment.index}.mp4"
+        _encode_segment(
+            segment=segment,
+            bg_video_path=str(bg),
+            fg_video_path=str(fg),
+            output_path=str(piece),
+            bg_setpts_factor=factor,
+            bg_fps=fps,
+            scale_ratio=0.5,
+            margin_x=4,
+            margin_y=4,
+            video_args=lossless,
+            gop=32,
+            thread_budget=ThreadBudget(threads=1),
+        )
+        pieces.extend(_frame_hashes(piece))
+
+    assert pieces == _frame_hashes(whole)
+
+
+def _probe_video(path):
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "v:0", "-show_entries", "frame=key_frame", "-of", "csv=p=0", str(path)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return [line.strip().rstrip(",") == "1" for line in result.stdout.splitlines() if line.strip()]
+
+
+@_requires_ffprobe
+def test_segment_parallel_output_matches_one_piece_encode(tmp_path):
+    bg, fg, tts = tmp_path / "bg.mp4", tmp_path / "fg.mp4", tmp_path / "tts.wav"
+    _lavfi(bg, "testsrc2=size=160x284:rate=30", 14)
+    _lavfi(fg, "testsrc=size=64x64:rate=25", 12)
+    _lavfi(tts, "sine=f=220", 12)
+    kwargs = dict(
+        bg_video_path=str(bg),
+        fg_video_path=str(fg),
+        tts_audio_path=str(tts),
+        scale_ratio=0.35,
+        margin_x=4,
+        margin_y=4,
+        encoder_profile=build_profiles(x264_preset="veryfast", x264_crf=23)["balanced"],
+        target_total_bitrate_mbps=0.6,
+        min_total_bitrate_mbps=0.2,
+        bitrate_step_kbps=50,
+        audio_bitrate_kbps=64,
+        max_output_size_mb=2,
+    )
+    policy = SegmentPolicy(min_duration_sec=0, segment_duration_sec=4, gop_sec=2, workers=2)
+
+    whole = compose_video(output_path=str(tmp_path / "whole.mp4"), **kwargs)
+    segmented = compose_video(output_path=str(tmp_path / "segmented.mp4"), segment_policy=policy, **kwargs)
+
+    assert whole.segment_count == 1
+    assert segmented.segment_count == 3
+    assert segmented.output_size_bytes <= 2 * 1024 * 1024
+    whole_keys = _probe_video(tmp_path / "whole.mp4")
+    segmented_keys = _probe_video(tmp_path / "segmented.mp4")
+    assert len(segmented_keys) == len(whole_keys) == 360
+    assert all(segmented_keys[start] for start in (0, 120, 240))
+    assert not list(tmp_path.glob(".*segmented*"))
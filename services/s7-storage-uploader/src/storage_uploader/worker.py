@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import json
-import os
 from pathlib import Path
 from typing import Any
 
@@ -164,8 +163,6 @@ def process(
     except Exception:
         job_logger.bind(event="job_failed").exception("Failed upload")
         raise
-    finally:
-        os.sync() if hasattr(os, "sync") else None
 
 
 logger.bind(event="worker_started", stage="s7").info(
@@ -38,6 +38,40 @@ class Settings(BaseSettings):
         description="NocoDB field name to update with final mp4 URL",
         validation_alias=AliasChoices("S8_UPDATE_FIELD_NAME", "update_field_name"),
     )
+    artifact_store_enabled: bool = Field(
+        False,
+        description="Release a record's artifacts and garbage-collect the store once NocoDB confirms the update",
+        validation_alias=AliasChoices("S8_ARTIFACT_STORE_ENABLED", "artifact_store_enabled"),
+    )
+    artifact_store_dir: str = Field(
+        "/data/artifacts",
+        description="Root of the shared artifact store",
+        validation_alias=AliasChoices("S8_ARTIFACT_STORE_DIR", "ARTIFACT_STORE_DIR", "artifact_store_dir"),
+    )
+    artifact_gc_grace_sec: float = Field(
+        3600.0,
+        description="Unreferenced objects younger than this are kept, so in-flight writes are never collected",
+        validation_alias=AliasChoices("S8_ARTIFACT_GC_GRACE_SEC", "artifact_gc_grace_sec"),
+        ge=0,
+    )
+    artifact_gc_every_records: int = Field(
+        50,
+        description="Run a full artifact GC after this many released records",
+        validation_alias=AliasChoices("S8_ARTIFACT_GC_EVERY_RECORDS", "artifact_gc_every_records"),
+        ge=1,
+    )
+    artifact_gc_interval_sec: float = Field(
+        600.0,
+        description="Run a full artifact GC at least this often while records are being released",
+        validation_alias=AliasChoices("S8_ARTIFACT_GC_INTERVAL_SEC", "artifact_gc_interval_sec"),
+        ge=0,
+    )
+    artifact_ref_max_age_sec: float = Field(
+        7 * 24 * 3600.0,
+        description="Release records whose references are older than this even if s8 never confirmed them (0 = never)",
+        validation_alias=AliasChoices("S8_ARTIFACT_REF_MAX_AGE_SEC", "artifact_ref_max_age_sec"),
+        ge=0,
+    )
     debug_log_payload: bool = Field(
         False,
         description="Enable verbose logging",
@@ -1,13 +1,13 @@
 from __future__ import annotations
 
 import json
-import os
 from typing import Any
 
 import dramatiq
 from core.logging import configure_service_logger, get_logger
 import requests
 from dramatiq.brokers.rabbitmq import RabbitmqBroker
+from storage import ArtifactStore, CollectSchedule
 
 from nocodb_updater.settings import get_settings
 
@@ -29,6 +29,20 @@ broker = RabbitmqBroker(url=settings.rabbitmq_url)
 dramatiq.set_broker(broker)
 broker.declare_queue(settings.current_queue, ensure=True)
 
+artifact_store = (
+    ArtifactStore(
+        settings.artifact_store_dir,
+        gc_grace_sec=settings.artifact_gc_grace_sec,
+        ref_max_age_sec=settings.artifact_ref_max_age_sec or None,
+    )
+    if settings.artifact_store_enabled
+    else None
+)
+collect_schedule = CollectSchedule(
+    every_records=settings.artifact_gc_every_records,
+    interval_sec=settings.artifact_gc_interval_sec,
+)
+
 
 def _update_record(*, settings: Any, record_id: int, table_id: str, public_mp4_url: str) -> None:
     endpoint = f"{settings.nocodb_base_url.rstrip('/')}/api/v2/tables/{table_id}/records"
@@ -50,6 +64,27 @@ def _update_record(*, settings: Any, record_id: int, table_id: str, public_mp4_u
         )
 
 
+def _release_artifacts(job_logger: Any, *, record_id: int, table_id: str) -> None:
+    # The record is confirmed: its intermediates (s2 source, s3 audio, s4/s6 videos) are no longer needed.
+    # Releasing is one rmtree; the full-store GC walk runs on `collect_schedule`, not per record.
+    # GC failures are logged, never retried; the next scheduled run collects again.
+    try:
+        released = artifact_store.release(table_id=table_id, record_id=record_id)
+        result = artifact_store.collect() if collect_schedule.record_released() else None
+    except Exception:
+        job_logger.bind(event="artifact_gc_failed").exception("Artifact release/GC failed")
+        return
+    job_logger.bind(event="artifacts_released", released_refs=released).info("Released record artifacts")
+    if result is not None:
+        job_logger.bind(
+            event="artifact_gc_completed",
+            removed_objects=result.removed_objects,
+            freed_bytes=result.freed_bytes,
+            kept_objects=result.kept_objects,
+            stale_records=result.stale_records,
+        ).info("Artifact GC complete")
+
+
 @dramatiq.actor(actor_name="s8_nocodb_updater.ping", queue_name=settings.current_queue)
 def ping() -> None:
     logger.bind(event="ping", stage="s8", queue=settings.current_queue).info("Worker ping")
@@ -91,11 +126,11 @@ def process(record_id: int, table_id: str, public_mp4_url: str) -> None:
             public_mp4_url=public_mp4_url,
         )
         job_logger.bind(event="nocodb_update_complete").info("NocoDB update complete")
+        if artifact_store is not None:
+            _release_artifacts(job_logger, record_id=record_id, table_id=table_id)
     except Exception:
         job_logger.bind(event="job_failed").exception("Failed NocoDB update")
         raise
-    finally:
-        os.sync() if hasattr(os, "sync") else None
 
 
 logger.bind(event="worker_started", stage="s8").info(